@@ -1,20 +1,39 @@
+import time
+
+# Antes de los imports: el tiempo de render incluye cargarlos
+INICIO = time.perf_counter()
+
 import os
-import re
 import io
+import tempfile
 import warnings
-import pdfplumber
-import pandas as pd
 import streamlit as st
-import openpyxl
-import datetime
 from datetime import datetime as dt
-import unicodedata
+from functools import partial
 from io import BytesIO
-from docx import Document
-from openpyxl.styles import PatternFill, Font
+
+# Solo módulos livianos: pandas, pdfplumber, openpyxl y python-docx se importan
+# dentro de cada herramienta, la primera vez que procesa algo
+from suite_operativa.cache import CacheResultados, hash_contenido
+from suite_operativa.filtrador import PREFIJOS
+from suite_operativa.metricas import COLUMNAS_METRICAS, Metricas
+from suite_operativa.polidata import MOTORES_PDF, motor_pdf_por_defecto, workers_por_defecto
+from suite_operativa.salidas import MIMES, formatos_disponibles
+from suite_operativa.trabajos import CANCELADO, ERROR, PENDIENTE, Trabajo, TrabajoCancelado
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
+# Líneas del filtrador TXT que se muestran en pantalla (la descarga las lleva todas)
+FILAS_VISTA_TXT = 1000
+# Filas de POLIDATA que se muestran en pantalla en el modo a disco
+FILAS_VISTA_PDF = 1000
+# Techo de RSS (MB) del modo a disco: por encima, las filas se vuelcan al llegar
+MEMORIA_MAX_MB = float(os.environ["SUITE_MEMORIA_MAX_MB"]) if os.environ.get("SUITE_MEMORIA_MAX_MB") else None
+# Cada cuántos segundos se actualiza el avance de un trabajo en curso
+INTERVALO_AVANCE = 0.5
+# Carpeta del servidor desde la que se pueden procesar lotes (sin ella solo se sube)
+CARPETA_LOTES = os.environ.get("SUITE_CARPETA_LOTES") or None
+
 # ---------------------------------------------------------
 # CONFIGURACIÓN DE PÁGINA
 # ---------------------------------------------------------
@@ -30,10 +49,195 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# ---------------------------------------------------------
+# CACHÉ DE RESULTADOS (compartida entre reruns y sesiones)
+# ---------------------------------------------------------
+@st.cache_resource
+def obtener_cache():
+    # SUITE_CACHE_DIR activa además la caché en disco
+    return CacheResultados(directorio=os.environ.get("SUITE_CACHE_DIR") or None)
+
+
+@st.cache_resource
+def obtener_cache_disco():
+    # Para el modo a disco: sin el nivel en memoria, que no respetaría SUITE_MEMORIA_MAX_MB
+    # (solo la caché en disco, si hay SUITE_CACHE_DIR)
+    directorio = os.environ.get("SUITE_CACHE_DIR") or None
+    return CacheResultados(max_memoria=0, directorio=directorio) if directorio else None
+
+
+cache = obtener_cache()
+cache_disco = obtener_cache_disco()
+
+
+@st.cache_resource
+def obtener_indice():
+    # Pólizas ya extraídas, solo con SUITE_INDICE_DB: el índice lo comparten
+    # todas las sesiones del servidor. Sin él POLIDATA procesa todo
+    ruta = os.environ.get("SUITE_INDICE_DB")
+    if not ruta:
+        return None
+    import sqlite3
+    from suite_operativa.indice import IndicePolizas
+
+    try:
+        return IndicePolizas(ruta)
+    except (OSError, sqlite3.Error, ValueError):
+        return None
+
+
+indice = obtener_indice()
+
+# ---------------------------------------------------------
+# RENDIMIENTO (tiempos por etapa y perfil opcional)
+# ---------------------------------------------------------
+perfilar = st.sidebar.checkbox("🔬 Perfilar con cProfile", key="perfilar", help="Agrega al panel de rendimiento el perfil de la ejecución (solo el proceso principal). Desactívalo después: perfilar hace más lento el proceso.")
+
+
+def panel_rendimiento(metricas, clave):
+    """Resumen por etapa, detalle por archivo y descarga de las métricas de una ejecución."""
+    import pandas as pd
+
+    with st.expander("⏱️ Rendimiento"):
+        resumen = pd.DataFrame(metricas.resumen())
+        st.dataframe(resumen.round(3), use_container_width=True)
+        st.caption("Las etapas en procesos paralelos suman el tiempo de cada proceso; «total» es el tiempo de reloj.")
+        st.dataframe(pd.DataFrame(metricas.mediciones, columns=COLUMNAS_METRICAS).round(3), use_container_width=True)
+        col_json, col_csv, col_prom = st.columns(3)
+        nombre = f"metricas_{metricas.herramienta}"
+        col_json.download_button("⬇️ JSON", metricas.a_json(), f"{nombre}.json", mime="application/json", key=f"{clave}_metricas_json")
+        col_csv.download_button("⬇️ CSV", metricas.a_csv(), f"{nombre}.csv", mime="text/csv", key=f"{clave}_metricas_csv")
+        col_prom.download_button("⬇️ Prometheus", metricas.a_prometheus(), f"{nombre}.prom", mime="text/plain", key=f"{clave}_metricas_prom")
+        if metricas.perfil:
+            st.write("**Perfil (cProfile, por tiempo acumulado):**")
+            st.code(metricas.perfil)
+
+
+# ---------------------------------------------------------
+# TRABAJOS EN SEGUNDO PLANO (un rerun no los reinicia)
+# ---------------------------------------------------------
+def lanzar_trabajo(clave, funcion, firma=None):
+    """Inicia `funcion(trabajo)` y lo guarda en la sesión; cancela el anterior de la misma clave."""
+    anterior = st.session_state.get(clave)
+    if anterior is not None:
+        anterior.cancelar()
+    st.session_state[clave] = Trabajo(funcion, firma).iniciar()
+
+
+def _avance(clave):
+    trabajo = st.session_state[clave]
+    if not trabajo.activo:
+        # Terminó: se ejecuta la app entera para mostrar el resultado
+        st.rerun()
+    if trabajo.cancelando:
+        texto = "Cancelando..."
+    elif trabajo.estado == PENDIENTE:
+        texto = "En cola..."
+    elif trabajo.total:
+        texto = f"{trabajo.mensaje} ({trabajo.hechos}/{trabajo.total}) · {trabajo.segundos:.0f} s"
+    else:
+        texto = f"Procesando... {trabajo.segundos:.0f} s"
+    st.progress(trabajo.fraccion, text=texto)
+    st.button("✖️ Cancelar", key=f"{clave}_cancelar", on_click=trabajo.cancelar, disabled=trabajo.cancelando)
+
+
+if hasattr(st, "fragment"):
+    # Mientras el trabajo corre solo se vuelve a dibujar su avance
+    _avance = st.fragment(run_every=INTERVALO_AVANCE)(_avance)
+
+
+def mostrar_trabajo(clave, firma=None):
+    """Devuelve el trabajo de `clave` si terminó bien; si sigue en curso muestra su avance.
+
+    Con `firma`, un trabajo lanzado con otras entradas se ignora.
+    """
+    trabajo = st.session_state.get(clave)
+    if trabajo is None or (firma is not None and trabajo.firma != firma):
+        return None
+    if trabajo.activo:
+        _avance(clave)
+    elif trabajo.estado == CANCELADO:
+        st.warning("⏹️ Proceso cancelado.")
+    elif trabajo.estado == ERROR:
+        st.error(f"❌ Error al procesar: {trabajo.error}")
+    else:
+        return trabajo
+    return None
+
+
+def firma_archivos(archivos):
+    return tuple(archivo.file_id for archivo in archivos)
+
+
+# ---------------------------------------------------------
+# ORIGEN DE LOS ARCHIVOS (subidos, un ZIP o una carpeta del servidor)
+# ---------------------------------------------------------
+ORIGEN_SUBIR, ORIGEN_ZIP, ORIGEN_CARPETA = "Subir archivos", "ZIP", "Carpeta del servidor"
+
+
+def elegir_entrada(clave, etiqueta, extension):
+    """Widgets del origen de los archivos; devuelve (entrada, firma).
+
+    La entrada es la lista de archivos subidos, el ZIP subido o la ruta de la
+    carpeta (None si todavía no hay nada). La carpeta solo se ofrece con
+    SUITE_CARPETA_LOTES y tiene que estar dentro de ella.
+    """
+    origenes = [ORIGEN_SUBIR, ORIGEN_ZIP] + ([ORIGEN_CARPETA] if CARPETA_LOTES else [])
+    origen = st.radio("Origen de los archivos", origenes, horizontal=True, key=f"{clave}_origen")
+    if origen == ORIGEN_SUBIR:
+        subidos = st.file_uploader(etiqueta, type=extension, accept_multiple_files=True, key=f"{clave}_uploader")
+        return subidos or None, firma_archivos(subidos or [])
+    if origen == ORIGEN_ZIP:
+        subido = st.file_uploader(f"Sube un ZIP con archivos .{extension}", type="zip", key=f"{clave}_zip")
+        return subido, (subido.file_id,) if subido else ()
+
+    from suite_operativa.entradas import resolver_carpeta
+
+    ruta = st.text_input(f"Carpeta (dentro de {CARPETA_LOTES})", key=f"{clave}_carpeta").strip()
+    if not ruta:
+        return None, ()
+    try:
+        carpeta = resolver_carpeta(ruta, CARPETA_LOTES)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return None, ()
+    return carpeta, (carpeta,)
+
+
+def lote_de(entrada, extension):
+    """Lote del ZIP o carpeta elegidos; None si la entrada son archivos subidos."""
+    if isinstance(entrada, list):
+        return None
+    from suite_operativa.entradas import Lote
+
+    return Lote(entrada, ("." + extension,))
+
+
+def mostrar_errores(errores):
+    if errores:
+        st.warning(f"⚠️ {len(errores)} archivo(s) dañados o ilegibles se omitieron; el resto se procesó.")
+        with st.expander("Archivos omitidos"):
+            st.write("\n".join(f"- **{nombre}**: {motivo}" for nombre, motivo in errores))
+
+
 # ---------------------------------------------------------
 # TABS (orden: POLIDATA, Cálculo de Primas, Normalizador, Filtrador TXT)
 # ---------------------------------------------------------
-tab1, tab2, tab3, tab4 = st.tabs([
+def crear_tabs(nombres):
+    """[(tab, abierta)]: solo la tab abierta procesa sus archivos en cada rerun.
+
+    Los widgets de todas las tabs se siguen dibujando para no perder lo subido
+    al cambiar de tab. Con Streamlit sin `on_change` en st.tabs todas cuentan
+    como abiertas.
+    """
+    try:
+        tabs = st.tabs(nombres, key="herramienta", on_change="rerun")
+    except TypeError:
+        return [(tab, True) for tab in st.tabs(nombres)]
+    return [(tab, tab.open) for tab in tabs]
+
+
+(tab1, ver_pdf), (tab2, ver_primas), (tab3, ver_norm), (tab4, ver_txt) = crear_tabs([
     "📄 POLIDATA (PDF)",
     "📊 CÁLCULO DE PRIMAS",
     "📝 NORMALIZADOR",
@@ -43,75 +247,253 @@ tab1, tab2, tab3, tab4 = st.tabs([
 # ==========================================================
 # TAB 1: POLIDATA
 # ==========================================================
+def ya_indexados(hashes, omitir):
+    """Posiciones de los PDFs que ya están en el índice (ninguna si no se omiten)."""
+    if indice is None or not omitir:
+        return set()
+    conocidos = indice.indexados(hashes)
+    return {i for i, h in enumerate(hashes) if h in conocidos}
+
+
+def indexar(nombre, hash_pdf, filas, metricas):
+    if indice is not None:
+        with metricas.etapa("indexar", len(filas), "filas", nombre):
+            indice.agregar(nombre, hash_pdf, filas)
+
+
+def procesar_polidata(archivos, workers, formato, motor, omitir, perfil, trabajo):
+    import pandas as pd
+    from suite_operativa.polidata import COLUMNAS_POLIDATA, iterar_pdfs
+    from suite_operativa.salidas import abrir_escritor
+
+    # Las filas se escriben en la salida a medida que termina cada archivo
+    metricas = Metricas("polidata")
+    all_rows = []
+    output = io.BytesIO()
+    with metricas.perfilar(perfil), metricas.etapa("total", len(archivos), "archivos"):
+        hashes = [hash_contenido(datos) for _, datos in archivos] if indice is not None else [None] * len(archivos)
+        omitidos = ya_indexados(hashes, omitir)
+        nuevos = [i for i in range(len(archivos)) if i not in omitidos]
+        lote = [archivos[i] for i in nuevos]
+
+        escritor = abrir_escritor(output, COLUMNAS_POLIDATA, formato)
+        filas_por_pdf = iterar_pdfs(lote, workers=workers, on_progress=trabajo.avance, cache=cache, metricas=metricas, motor=motor)
+        for i, filas in zip(nuevos, filas_por_pdf):
+            indexar(archivos[i][0], hashes[i], filas, metricas)
+            with metricas.etapa("escribir", len(filas), "filas"):
+                escritor.agregar(filas)
+            all_rows.extend(filas)
+        with metricas.etapa("guardar_salida"):
+            escritor.cerrar()
+        with metricas.etapa("dataframe", len(all_rows), "filas"):
+            df = pd.DataFrame(all_rows, columns=COLUMNAS_POLIDATA)
+    return output.getvalue(), df, len(df), [archivos[i][0] for i in sorted(omitidos)], [], metricas
+
+
+def _hash_archivo(ruta):
+    with open(ruta, "rb") as f:
+        return hash_contenido(f.read())
+
+
+def procesar_polidata_en_disco(entrada, workers, formato, motor, omitir, perfil, trabajo):
+    """Para lotes grandes: los PDFs y las filas van a disco y el reporte se arma desde ahí.
+
+    `entrada` son los PDFs subidos, un ZIP subido o la ruta de una carpeta del servidor.
+    """
+    import pandas as pd
+    from suite_operativa.almacen import AlmacenFilas
+    from suite_operativa.polidata import COLUMNAS_POLIDATA, contar_paginas, iterar_pdfs
+    from suite_operativa.salidas import abrir_escritor
+
+    metricas = Metricas("polidata")
+    errores = []
+    with tempfile.TemporaryDirectory(prefix="polidata_") as carpeta, \
+            AlmacenFilas(COLUMNAS_POLIDATA, carpeta, memoria_max_mb=MEMORIA_MAX_MB) as almacen, \
+            metricas.perfilar(perfil), metricas.etapa("total", unidad="archivos") as medicion_total:
+        lote = lote_de(entrada, "pdf")
+        if lote is None:
+            # Los procesos leen cada PDF del disco; getbuffer() no copia lo subido
+            nombres = [subido.name for subido in entrada]
+            hashes = [None] * len(entrada)
+            if indice is not None:
+                for k, subido in enumerate(entrada):
+                    with subido.getbuffer() as contenido:
+                        hashes[k] = hash_contenido(contenido)
+            omitidos = ya_indexados(hashes, omitir)
+            nuevos = [k for k in range(len(entrada)) if k not in omitidos]
+            archivos = []
+            with metricas.etapa("copiar_a_disco", len(nuevos), "archivos"):
+                for k in nuevos:
+                    ruta = os.path.join(carpeta, f"{k:05d}.pdf")
+                    with open(ruta, "wb") as f, entrada[k].getbuffer() as contenido:
+                        f.write(contenido)
+                    archivos.append((nombres[k], ruta))
+        else:
+            # ZIP o carpeta: los miembros se descomprimen de a uno y los que no abren se informan
+            with lote, metricas.etapa("preparar_lote", len(lote), "archivos"):
+                preparados, errores = lote.extraer(carpeta, validar=contar_paginas, on_progress=trabajo.avance)
+            nombres = [nombre for nombre, _ in preparados]
+            hashes = [_hash_archivo(ruta) for _, ruta in preparados] if indice is not None else [None] * len(preparados)
+            omitidos = ya_indexados(hashes, omitir)
+            nuevos = [k for k in range(len(preparados)) if k not in omitidos]
+            archivos = [preparados[k] for k in nuevos]
+        medicion_total["unidades"] = len(nombres)
+
+        filas_por_pdf = iterar_pdfs(archivos, workers=workers, on_progress=trabajo.avance, cache=cache_disco, metricas=metricas, motor=motor)
+        for k, filas in zip(nuevos, filas_por_pdf):
+            indexar(nombres[k], hashes[k], filas, metricas)
+            with metricas.etapa("guardar_filas", len(filas), "filas"):
+                almacen.agregar(filas)
+
+        destino = os.path.join(carpeta, f"Renovaciones{formato}")
+        with metricas.etapa("escribir", len(almacen), "filas"), abrir_escritor(destino, COLUMNAS_POLIDATA) as escritor:
+            almacen.volcar_en(escritor)
+        with open(destino, "rb") as f:
+            contenido = f.read()
+        df = pd.DataFrame(almacen.primeras(FILAS_VISTA_PDF), columns=COLUMNAS_POLIDATA)
+        n_filas = len(almacen)
+    return contenido, df, n_filas, [nombres[k] for k in sorted(omitidos)], errores, metricas
+
+
+def panel_indice(formato):
+    """Búsqueda sobre las pólizas acumuladas y exportación de las nuevas o cambiadas."""
+    resumen = indice.resumen()
+    with st.expander(f"📇 Pólizas indexadas: {resumen['polizas']} ({resumen['filas']} filas de {resumen['archivos']} PDFs)"):
+        col1, col2, col3, col4 = st.columns(4)
+        poliza = col1.text_input("Póliza", key="indice_poliza")
+        cliente = col2.text_input("Cliente (empieza con)", key="indice_cliente")
+        placa = col3.text_input("Placa", key="indice_placa")
+        vence = col4.date_input("Vence entre", value=[], key="indice_vence")
+        vence = list(vence) + [None] * (2 - len(vence))
+
+        # Sin filtros no se busca: pandas se carga recién cuando hay algo que mostrar
+        if poliza or cliente or placa or vence[0]:
+            import pandas as pd
+            from suite_operativa.polidata import COLUMNAS_POLIDATA
+
+            inicio = time.perf_counter()
+            filas, total = indice.buscar(poliza, cliente, placa, vence[0], vence[1], limite=FILAS_VISTA_PDF)
+            texto = f"{total} fila(s) en {(time.perf_counter() - inicio) * 1000:.0f} ms"
+            st.caption(texto + (f"; se muestran las primeras {len(filas)}." if total > len(filas) else "."))
+            st.dataframe(pd.DataFrame(filas, columns=COLUMNAS_POLIDATA), use_container_width=True)
+        else:
+            st.caption("Busca por póliza, cliente, placa o rango de vencimiento.")
+
+        # EXPORTACIÓN INCREMENTAL: solo lo nuevo o cambiado desde la última descarga
+        desde, hasta = indice.marca("app"), indice.secuencia()
+        if hasta <= desde:
+            st.caption("No hay pólizas nuevas ni cambiadas desde la última exportación.")
+            return
+        if st.button(f"📦 Preparar pólizas nuevas o cambiadas ({indice.cambiadas(desde, hasta)})", key="indice_preparar"):
+            from suite_operativa.polidata import COLUMNAS_POLIDATA
+            from suite_operativa.salidas import abrir_escritor
+
+            salida = io.BytesIO()
+            with abrir_escritor(salida, COLUMNAS_POLIDATA, formato) as escritor:
+                for filas in indice.filas_desde(desde, hasta):
+                    escritor.agregar(filas)
+            st.session_state["indice_exportacion"] = (salida.getvalue(), formato, desde, hasta)
+        exportacion = st.session_state.get("indice_exportacion")
+        if exportacion and exportacion[2] == desde:
+            contenido, formato_exportacion, _, hasta_exportacion = exportacion
+            # Al descargar se avanza la marca: la próxima exportación empieza desde aquí
+            st.download_button(
+                f"⬇️ Descargar nuevas o cambiadas ({formato_exportacion[1:].upper()})", contenido,
+                f"Renovaciones_nuevas{formato_exportacion}", mime=MIMES[formato_exportacion],
+                on_click=indice.marcar, args=("app", hasta_exportacion), key="indice_download",
+            )
+
+
 with tab1:
     st.title("📄 POLIDATA")
     st.caption("Extracción automática de datos desde PDF")
 
-    uploaded_files = st.file_uploader("Sube tus archivos PDF aquí", type="pdf", accept_multiple_files=True, key="pdf_uploader")
-
-    if uploaded_files:
-        all_rows = []
-        for uploaded_file in uploaded_files:
-            with pdfplumber.open(uploaded_file) as pdf:
-                text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-
-            poliza = re.search(r"(?:P\s*[ÓO]?\s*L\s*I\s*Z\s*A|P[ÓO]LIZA)\s*[:\-]?\s*(\d{4,})", text, re.IGNORECASE)
-            cliente = re.search(r"Cliente\s+([A-Z ,]+)", text)
-            vigencia = re.search(r"Vigencia\s+(\d{2}/\d{2}/\d{4} - \d{2}/\d{2}/\d{4})", text)
-
-            nro_poliza = poliza.group(1) if poliza else "SIN_POLIZA"
-            nombre_cliente = cliente.group(1).strip() if cliente else "SIN_CLIENTE"
-            rango_vigencia = vigencia.group(1) if vigencia else "SIN_VIGENCIA"
-
-            seccion_pattern = re.compile(r"(SECCION: \d{3} [A-ZÑÁÉÍÓÚ ]+)")
-            seccion_indices = [(m.start(), m.group()) for m in seccion_pattern.finditer(text)]
-            seccion_indices.append((len(text), None))
-
-            for i in range(len(seccion_indices) - 1):
-                sec = seccion_indices[i][1]
-                content = text[seccion_indices[i][0]:seccion_indices[i+1][0]]
-                lineas = content.split("\n")
-                for idx, line in enumerate(lineas):
-                    match = re.match(r"^(.*?)(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})$", line.strip())
-                    if match:
-                        item_texto = match.group(1).strip()
-
-                        # Extraer placa si existe en la línea (SECCION: 006 VEHICULOS)
-                        placa_match = re.search(r"PLACA:\s*([A-Z0-9\-]+)", item_texto, re.IGNORECASE)
-                        placa = placa_match.group(1).strip() if placa_match else ""
-
-                        # Si hay placa, la marca/modelo/año suelen estar en la línea siguiente
-                        marca = modelo = anio = ""
-                        if placa and idx + 1 < len(lineas):
-                            siguiente = lineas[idx + 1]
-                            marca_match = re.search(r"MARCA:\s*([^,]+)", siguiente, re.IGNORECASE)
-                            modelo_match = re.search(r"MODELO:\s*([^,]+)", siguiente, re.IGNORECASE)
-                            anio_match = re.search(r"A[ÑN]O:\s*(\d{4})", siguiente, re.IGNORECASE)
-                            marca = marca_match.group(1).strip() if marca_match else ""
-                            modelo = modelo_match.group(1).strip() if modelo_match else ""
-                            anio = anio_match.group(1).strip() if anio_match else ""
-
-                        all_rows.append([nro_poliza, nombre_cliente, rango_vigencia, sec, item_texto, placa, marca, modelo, anio, match.group(2), match.group(3)])
-
-        df = pd.DataFrame(all_rows, columns=["Póliza", "Cliente", "Vigencia", "Sección", "Ítem", "Placa", "Marca", "Modelo", "Año", "Valor Asegurado", "Prima Neta"])
-        st.success("✅ Archivos procesados correctamente")
-        st.dataframe(df, use_container_width=True)
-
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False)
-        st.download_button("⬇️ Descargar Excel", data=output.getvalue(), file_name="Renovaciones.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="polidata_download")
+    entrada_pdf, firma_entrada_pdf = elegir_entrada("pdf", "Sube tus archivos PDF aquí", "pdf")
+
+    workers_pdf = st.number_input("Procesos en paralelo (1 = en serie)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=workers_por_defecto(), step=1, key="pdf_workers")
+    formato_pdf = st.selectbox("Formato de descarga", formatos_disponibles(), key="pdf_formato")
+    motores_pdf = [m for m in MOTORES_PDF if m == "pdfplumber" or motor_pdf_por_defecto() == m]
+    motor_pdf = st.selectbox("Lector de PDF", motores_pdf, key="pdf_motor", help="pdfium es mucho más rápido; pdfplumber analiza el layout de cada página")
+    en_disco = st.checkbox(
+        "💾 Lote grande: PDFs y filas a disco", value=MEMORIA_MAX_MB is not None, key="pdf_disco",
+        help="Para campañas de cientos o miles de PDFs: la memoria no crece con el lote y en pantalla se muestran solo las primeras filas.",
+    )
+    omitir_indexados = indice is not None and st.checkbox(
+        "📇 Omitir PDFs ya indexados", value=False, key="pdf_omitir",
+        help="Los PDFs que ya se procesaron antes (mismo contenido) no se vuelven a extraer ni salen en la descarga; sus filas están en el índice.",
+    )
+
+    if entrada_pdf and ver_pdf:
+        # Se procesa al subir los archivos o cambiar las opciones; los reruns reusan el resultado
+        firma_pdf = (firma_entrada_pdf, int(workers_pdf), formato_pdf, motor_pdf, en_disco, omitir_indexados)
+        trabajo_pdf = st.session_state.get("trabajo_pdf")
+        reintentar = (
+            trabajo_pdf is not None and trabajo_pdf.firma == firma_pdf and trabajo_pdf.estado in (CANCELADO, ERROR)
+            and st.button("🔄 Procesar de nuevo", key="pdf_reintentar")
+        )
+        if trabajo_pdf is None or trabajo_pdf.firma != firma_pdf or reintentar:
+            if en_disco or not isinstance(entrada_pdf, list):
+                # Un ZIP o una carpeta siempre van por disco: no se cargan enteros en memoria
+                funcion_pdf = partial(procesar_polidata_en_disco, entrada_pdf, int(workers_pdf), formato_pdf, motor_pdf, omitir_indexados, perfilar)
+            else:
+                funcion_pdf = partial(procesar_polidata, [(f.name, f.getvalue()) for f in entrada_pdf], int(workers_pdf), formato_pdf, motor_pdf, omitir_indexados, perfilar)
+            lanzar_trabajo("trabajo_pdf", funcion_pdf, firma_pdf)
+
+        trabajo_pdf = mostrar_trabajo("trabajo_pdf", firma_pdf)
+        if trabajo_pdf:
+            contenido_pdf, df, n_filas_pdf, omitidos_pdf, errores_pdf, metricas_pdf = trabajo_pdf.resultado
+            st.success(f"✅ Archivos procesados correctamente ({trabajo_pdf.segundos:.1f} s)")
+            mostrar_errores(errores_pdf)
+            if omitidos_pdf:
+                st.info(f"📇 {len(omitidos_pdf)} PDF(s) ya estaban indexados y se omitieron: {', '.join(omitidos_pdf[:10])}{' ...' if len(omitidos_pdf) > 10 else ''}")
+            if n_filas_pdf > len(df):
+                st.caption(f"{n_filas_pdf} fila(s) extraídas; se muestran las primeras {len(df)}.")
+            st.dataframe(df, use_container_width=True)
+
+            st.download_button(f"⬇️ Descargar {formato_pdf[1:].upper()}", data=contenido_pdf, file_name=f"Renovaciones{formato_pdf}", mime=MIMES[formato_pdf], key="polidata_download")
+            panel_rendimiento(metricas_pdf, "polidata")
+
+    if indice is not None and ver_pdf:
+        panel_indice(formato_pdf)
 
 # ==========================================================
 # TAB 2: CÁLCULO DE PRIMAS
 # ==========================================================
+def procesar_primas(entrada, workers, zona, usuario, fecha_reporte, perfil, trabajo):
+    """`entrada` son los Excels subidos, un ZIP subido o la ruta de una carpeta del servidor."""
+    from suite_operativa.primas import calcular_primas, escribir_reporte, leer_lote, motor_por_defecto, validar_excel
+
+    metricas = Metricas("primas")
+    output = io.BytesIO()
+    errores = []
+    with tempfile.TemporaryDirectory(prefix="primas_") as carpeta, \
+            metricas.perfilar(perfil), metricas.etapa("total", unidad="archivos") as medicion_total:
+        lote = lote_de(entrada, "xlsx")
+        if lote is None:
+            archivos = [(archivo.name, archivo.getvalue()) for archivo in entrada]
+        else:
+            # Del ZIP se descomprime un Excel a la vez; los procesos los leen del disco
+            with lote, metricas.etapa("preparar_lote", len(lote), "archivos"):
+                archivos, errores = lote.extraer(carpeta, validar=validar_excel, on_progress=trabajo.avance)
+        medicion_total["unidades"] = len(archivos)
+        leidos, ilegibles = leer_lote(archivos, workers=workers, cache=cache, on_progress=trabajo.avance)
+        errores += ilegibles
+        # Cada lectura se mide en su proceso (0 s si vino de la caché)
+        for nombre, df_p, segundos in leidos:
+            metricas.registrar(f"leer_{motor_por_defecto()}", segundos, len(df_p), "filas", nombre)
+        trabajo.revisar()
+        with metricas.etapa("calcular", sum(len(df_p) for _, df_p, _ in leidos), "filas"):
+            df_resumen, df_no_validos = calcular_primas(((nombre, df_p) for nombre, df_p, _ in leidos), zona, usuario, fecha_reporte)
+        trabajo.revisar()
+        with metricas.etapa("escribir_reporte", len(df_resumen) + len(df_no_validos), "filas"):
+            escribir_reporte(df_resumen, df_no_validos, output)
+    return df_resumen, df_no_validos, output.getvalue(), errores, metricas
+
+
 with tab2:
     st.title("📊 Validación y Cálculo de Primas - Seguros 📊")
 
     zona = st.selectbox("Selecciona la zona", options=["Sur", "Norte"], index=0, key="primas_zona")
-    NETA = 0.00038 if zona == "Sur" else 0.00036
-    V_D_E = 0.03
-    V_IGV = 0.18
 
     usuarios = ["Sofi B", "Engel B", "User_01", "User_02"]
     usuario_seleccionado = st.selectbox("Selecciona tu usuario:", usuarios, key="primas_usuario")
@@ -119,249 +501,155 @@ with tab2:
     fecha_reporte = dt.now().strftime("%d/%m/%Y %H:%M:%S")
     st.write(f"📅 **Fecha del reporte:** {fecha_reporte}")
 
-    archivos = st.file_uploader("Sube tus archivos Excel", type=["xlsx"], accept_multiple_files=True, key="primas_uploader")
-
-    if st.button("Procesar archivos", key="primas_procesar") and archivos:
-
-        no_validos = []
-        resumen = []
-
-        def validar_documento(row):
-            tipo = str(row.get("Tipo de Documento", "")).strip().upper()
-            num = str(row.get("Número de Documento", "")).strip()
-            if tipo == "DNI":
-                return "DNI válido" if num.isdigit() and len(num) == 8 else "DNI inválido"
-            return "No es DNI"
-
-        for archivo in archivos:
-            nombre_archivo = archivo.name
-
-            df_p = pd.read_excel(archivo, dtype={"Número de Documento": str})
-            df_p.columns = df_p.columns.str.strip()
-            df_p = df_p.dropna(how="all")
-            df_p["fila_en_excel"] = df_p.index + 2
-
-            if df_p.empty:
-                resumen.append({"Archivo": nombre_archivo, "Poliza": "no declara"})
-                continue
-
-            for col in ["Tipo de Documento", "Número de Documento", "Capital Asegurado", "Prima"]:
-                if col not in df_p.columns:
-                    df_p[col] = pd.NA
-            if "Nombre Completo" not in df_p.columns:
-                df_p["Nombre Completo"] = pd.NA
-
-            df_p["validación documento"] = df_p.apply(validar_documento, axis=1)
-
-            df_no_validos = df_p[df_p["validación documento"] == "No es DNI"].copy()
-            df_no_validos["archivo_origen"] = nombre_archivo
-
-            columnas_finales = [
-                "Tipo de Documento", "Número de Documento", "Nombre Completo",
-                "validación documento", "archivo_origen", "fila_en_excel"
-            ]
-            for col in columnas_finales:
-                if col not in df_no_validos.columns:
-                    df_no_validos[col] = pd.NA
-            df_no_validos = df_no_validos[columnas_finales]
-
-            df_no_validos = df_no_validos[
-                df_no_validos["Número de Documento"].notna() &
-                df_no_validos["Número de Documento"].astype(str).str.strip().ne("") &
-                df_no_validos["Nombre Completo"].notna() &
-                df_no_validos["Nombre Completo"].astype(str).str.strip().ne("")
-            ]
-
-            if not df_no_validos.empty:
-                no_validos.append(df_no_validos)
-
-            ultima_es_subtotal = df_p.iloc[-1].astype(str).str.contains("TOTAL", case=False, na=False).any()
-
-            if ultima_es_subtotal and len(df_p) > 1:
-                ultima_fila = df_p.iloc[-1]
-                df_sin_ultima = df_p.iloc[:-1].copy()
-                sub_capital = ultima_fila.get("Capital Asegurado", "no declara")
-                sub_prima = ultima_fila.get("Prima", "no declara")
-            else:
-                df_sin_ultima = df_p.copy()
-                sub_capital = "no declara"
-                sub_prima = "no declara"
-
-            total_capital_num = df_sin_ultima["Capital Asegurado"].sum(min_count=1)
-
-            s = (df_sin_ultima["Prima"].astype(str)
-                 .str.replace('\u00A0', '', regex=False)
-                 .str.replace('\u202F', '', regex=False)
-                 .str.replace(' ', '', regex=False)
-                 .str.replace('S/', '', regex=False)
-                 .str.replace('s/', '', regex=False)
-                 .str.replace('.', '', regex=False)
-                 .str.replace(',', '.', regex=False))
-
-            total_prima_num = pd.to_numeric(s, errors="coerce").sum(min_count=1)
-
-            capital_num = pd.to_numeric(df_sin_ultima["Capital Asegurado"], errors="coerce")
-
-            prima_neta_reg = capital_num * NETA
-            d_e_reg = prima_neta_reg * V_D_E
-            igv_reg = (prima_neta_reg + d_e_reg) * V_IGV
-            total_reg = prima_neta_reg + d_e_reg + igv_reg
-
-            def red2(x):
-                return float(round(x, 2)) if pd.notna(x) else "no declara"
-
-            suma_prima_neta = red2(prima_neta_reg.sum(min_count=1))
-            suma_d_e = red2(d_e_reg.sum(min_count=1))
-            suma_igv = red2(igv_reg.sum(min_count=1))
-            suma_total = red2(total_reg.sum(min_count=1))
-
-            match = re.search(r'\d{10,}', nombre_archivo)
-            poliza = match.group(0) if match else "no declara"
-
-            resumen.append({
-                "Archivo": nombre_archivo,
-                "Poliza": poliza,
-                "Usuario": usuario_seleccionado,
-                "Zona": zona,
-                "Fecha_reporte": fecha_reporte,
-                "Cantidad_registros": len(df_sin_ultima),
-                "Total_capital": total_capital_num,
-                "Total_origen_col_H": sub_capital,
-                "Total_origen_col_J": sub_prima,
-                "prima_neta": suma_prima_neta,
-                "D_E": suma_d_e,
-                "IGV": suma_igv,
-                "TOTAL": suma_total
-            })
-
-        df_no_validos_final = pd.concat(no_validos, ignore_index=True) if no_validos else pd.DataFrame()
-        df_resumen = pd.DataFrame(resumen)
-
-        orden_cols = [
-            "Archivo", "Poliza", "Usuario", "Zona", "Fecha_reporte",
-            "Cantidad_registros", "Total_capital",
-            "Total_origen_col_H", "Total_origen_col_J",
-            "prima_neta", "D_E", "IGV", "TOTAL"
-        ]
-        df_resumen = df_resumen[orden_cols]
+    entrada_primas, firma_entrada_primas = elegir_entrada("primas", "Sube tus archivos Excel", "xlsx")
+
+    workers_primas = st.number_input("Procesos en paralelo para leer los Excel (1 = en serie)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=workers_por_defecto(), step=1, key="primas_workers")
+
+    firma_primas = (firma_entrada_primas, zona, usuario_seleccionado)
+    if st.button("Procesar archivos", key="primas_procesar") and entrada_primas and ver_primas:
+        lanzar_trabajo("trabajo_primas", partial(
+            procesar_primas, entrada_primas, int(workers_primas), zona, usuario_seleccionado, fecha_reporte, perfilar,
+        ), firma_primas)
+
+    trabajo_primas = mostrar_trabajo("trabajo_primas", firma_primas) if ver_primas else None
+    if trabajo_primas:
+        df_resumen, df_no_validos_final, contenido_primas, errores_primas, metricas_primas = trabajo_primas.resultado
+        mostrar_errores(errores_primas)
 
         st.subheader("Vista previa de datos")
         st.write("**Totales por archivo:**")
         st.dataframe(df_resumen)
         st.write("**No válidos:**")
         st.dataframe(df_no_validos_final)
-
-        output_primas = io.BytesIO()
-        with pd.ExcelWriter(output_primas, engine="openpyxl") as writer:
-            df_resumen.to_excel(writer, sheet_name="Totales por archivo", index=False)
-            df_no_validos_final.to_excel(writer, sheet_name="No válidos", index=False)
-
-            wb_primas = writer.book
-            fill = PatternFill(start_color="D53032", end_color="D53032", fill_type="solid")
-            font_white = Font(color="FFFFFF", bold=True)
-
-            hojas = ["Totales por archivo", "No válidos"]
-            for hoja in hojas:
-                ws = wb_primas[hoja]
-                for cell in ws[1]:
-                    cell.fill = fill
-                    cell.font = font_white
+        if df_resumen.attrs.get("capital_no_leido"):
+            st.warning(f"⚠️ {df_resumen.attrs['capital_no_leido']} celda(s) de Capital Asegurado no son un monto y quedaron fuera de las sumas.")
 
         st.success("✅ Proceso completado.")
         st.download_button(
             label="📥 Descargar reporte final",
-            data=output_primas.getvalue(),
+            data=contenido_primas,
             file_name="Resumen_Validacion.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             key="primas_download"
         )
+        panel_rendimiento(metricas_primas, "primas")
 
 # ==========================================================
 # TAB 3: NORMALIZADOR WORD Y EXCEL
 # ==========================================================
-
-COLUMNAS_EXCLUIDAS = [
-    "poliza", "nro_documento", "documento", "id", "ruc", "dni",
-    "nro_asegurados", "asegurados", "vigencia", "plazo", "ano", "periodo",
-    "nro", "ciiu_giro_del_negocio", "vigencia_inicio", "vigencia_termino",
-    "plazo_asegurar", "pisos", "sotanos", "recibo", "aseg", "fecha"
-]
-
-def normalizar(texto):
-    if pd.isna(texto):
-        return ""
-    texto = str(texto).strip().lower()
-    texto = unicodedata.normalize('NFKD', texto)
-    texto = texto.encode('ascii', 'ignore').decode('utf-8')
-    texto = re.sub(r"[ .\-\/]+", "_", texto)
-    texto = re.sub(r"[^a-z0-9_]", "", texto)
-    texto = re.sub(r"_+", "_", texto)
-    return texto.strip("_")
-
-
-def formatear_por_columna(val, nombre_columna):
-    if pd.isna(val) or str(val).strip() == "":
-        return ""
-    if isinstance(val, (datetime.datetime, datetime.date)):
-        return val.strftime("%d/%m/%Y")
-    val_str = str(val).strip()
-    if any(clave in nombre_columna for clave in COLUMNAS_EXCLUIDAS):
-        if val_str.endswith('.0'):
-            val_str = val_str[:-2]
-        if "-" in val_str and len(val_str) >= 10 and val_str[:4].isdigit():
+def combinar_documentos(word, excel, un_solo_word, columna_nombre, workers, perfil, trabajo):
+    from suite_operativa.combinador import compilar_plantilla, generar_documento_unico, generar_zip, leer_filas
+
+    metricas = Metricas("combinador")
+    salida = BytesIO()
+    with metricas.perfilar(perfil), metricas.etapa("total"):
+        with metricas.etapa("compilar_plantilla"):
+            plantilla = compilar_plantilla(word)
+        with metricas.etapa("leer_filas", unidad="filas") as medicion:
+            cabeceras, filas = leer_filas(excel)
+            medicion["unidades"] = len(filas)
+        trabajo.revisar()
+        if un_solo_word:
+            with metricas.etapa("documento_unico", len(filas), "documentos"):
+                n_docs = generar_documento_unico(plantilla, cabeceras, filas, salida)
+            nombre_salida, mime_salida = "documentos_combinados.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        else:
+            with metricas.etapa("zip", len(filas), "documentos"):
+                n_docs = generar_zip(
+                    plantilla, cabeceras, filas, salida,
+                    workers=workers, columna_nombre=columna_nombre, on_progress=trabajo.avance,
+                )
+            nombre_salida, mime_salida = "documentos.zip", "application/zip"
+    return n_docs, salida.getvalue(), nombre_salida, mime_salida, metricas
+
+
+def _revisando(filas, trabajo, cada=5000):
+    # Las filas del Excel se generan de a una: cada tanto se mira si se pidió cancelar
+    for k, fila in enumerate(filas):
+        if k % cada == 0:
+            trabajo.revisar()
+        yield fila
+
+
+def normalizar_archivos(word, excel, perfil, trabajo):
+    """Normaliza los tags del Word y limpia el Excel; `word` y `excel` son (nombre, bytes).
+
+    Devuelve (tags, Word normalizado o None, clave del Word, resultado del
+    Excel o None, clave del Excel, errores, métricas). Los resultados van a la
+    caché: otra sesión con los mismos archivos no los vuelve a procesar.
+    """
+    from docx import Document
+    from suite_operativa.normalizador import abrir_hoja, escribir_filtrado, filas_normalizadas, normalizar_word
+
+    (nombre_word, datos_word), (nombre_excel, datos_excel) = word, excel
+    errores = []
+    metricas = Metricas("normalizador")
+    with metricas.perfilar(perfil), metricas.etapa("total"):
+        trabajo.avance(nombre_word, 0, 2)
+
+        # WORD
+        clave_word = cache.clave("normalizador_word", datos_word)
+        resultado_word = cache.obtener(clave_word)
+
+        if resultado_word is not None:
+            tags_word, contenido_word = resultado_word
+            metricas.registrar("caché_word", 0.0, 1, "archivos", nombre_word)
+        else:
+            tags_word = set()
+            contenido_word = None
+            with metricas.etapa("word", unidad="párrafos", archivo=nombre_word) as medicion:
+                try:
+                    doc = Document(BytesIO(datos_word))
+                except Exception as e:
+                    errores.append(f"❌ No se pudo leer el archivo Word: {e}")
+                    doc = None
+
+                if doc:
+                    medicion["unidades"] = len(doc.paragraphs)
+                    try:
+                        tags_word = normalizar_word(doc)
+                    except Exception as e:
+                        errores.append(f"❌ Error al normalizar el Word: {e}")
+                    try:
+                        word_buffer = BytesIO()
+                        doc.save(word_buffer)
+                        contenido_word = word_buffer.getvalue()
+                    except Exception as e:
+                        errores.append(f"❌ Error al guardar el Word normalizado: {e}")
+            if contenido_word is not None and not errores:
+                cache.guardar(clave_word, (tags_word, contenido_word))
+        trabajo.avance(nombre_excel, 1, 2)
+
+        # EXCEL
+        clave_excel = cache.clave("normalizador", datos_excel, extra="|".join(sorted(tags_word)))
+        resultado_excel = cache.obtener(clave_excel)
+
+        if resultado_excel is not None:
+            metricas.registrar("caché_excel", 0.0, resultado_excel[4], "filas", nombre_excel)
+        else:
             try:
-                fecha_corta = val_str.split(" ")[0]
-                partes = fecha_corta.split("-")
-                if len(partes) == 3:
-                    return f"{partes[2]}/{partes[1]}/{partes[0]}"
-            except Exception:
-                pass
-        return val_str.upper()
-    try:
-        num = float(val)
-        return f"{num:,.2f}"
-    except ValueError:
-        return val_str.upper()
-
-
-def procesar_parrafo(paragraph):
-    full_text = "".join(run.text for run in paragraph.runs)
-    if "{{" not in full_text:
-        return
-    variables = re.findall(r"{{(.*?)}}", full_text)
-    for var in variables:
-        nueva = normalizar(var)
-        full_text = full_text.replace("{{" + var + "}}", "{{" + nueva + "}}")
-    index = 0
-    for run in paragraph.runs:
-        length = len(run.text)
-        run.text = full_text[index:index + length]
-        index += length
-
-
-def normalizar_word(doc):
-    for para in doc.paragraphs:
-        procesar_parrafo(para)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    procesar_parrafo(para)
-
-
-def extraer_tags_word(doc):
-    tags = set()
-    patron = re.compile(r"{{(.*?)}}")
-    for para in doc.paragraphs:
-        for var in patron.findall(para.text):
-            tags.add(normalizar(var))
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    for var in patron.findall(para.text):
-                        tags.add(normalizar(var))
-    return tags
+                ws = abrir_hoja(datos_excel)
+            except Exception as e:
+                errores.append(f"❌ No se pudo leer el archivo Excel: {e}")
+                ws = None
+
+            if ws is not None:
+                try:
+                    buffer = BytesIO()
+                    with metricas.etapa("excel", unidad="filas", archivo=nombre_excel) as medicion:
+                        filas = _revisando(filas_normalizadas(ws), trabajo)
+                        cabeceras, indices, vista, n_filas = escribir_filtrado(filas, tags_word, buffer)
+                        medicion["unidades"] = n_filas
+                    resultado_excel = (buffer.getvalue(), cabeceras, indices, vista, n_filas)
+                    cache.guardar(clave_excel, resultado_excel)
+                except TrabajoCancelado:
+                    raise
+                except Exception as e:
+                    errores.append(f"❌ Error al procesar los datos del Excel: {e}")
+                finally:
+                    ws.parent.close()
+        trabajo.avance(nombre_excel, 2, 2)
+    return tags_word, contenido_word, clave_word, resultado_excel, clave_excel, errores, metricas
 
 
 with tab3:
@@ -371,9 +659,7 @@ with tab3:
     word_file = st.file_uploader("📄 Subir Word", type=["docx"], key="word_uploader")
     excel_file = st.file_uploader("📊 Subir Excel", type=["xlsx"], key="excel_uploader")
 
-    if word_file and excel_file:
-        errores = []
-
+    if word_file and excel_file and ver_norm:
         if not word_file.name.endswith(".docx"):
             st.error("❌ El archivo Word debe ser formato .docx")
             st.stop()
@@ -381,164 +667,198 @@ with tab3:
             st.error("❌ El archivo Excel debe ser formato .xlsx")
             st.stop()
 
-        with st.spinner("Procesando archivos..."):
-
-            # WORD
-            try:
-                doc = Document(word_file)
-            except Exception as e:
-                errores.append(f"❌ No se pudo leer el archivo Word: {e}")
-                doc = None
-
-            tags_word = set()
-            word_buffer = None
-
-            if doc:
-                try:
-                    tags_word = extraer_tags_word(doc)
-                    normalizar_word(doc)
-                except Exception as e:
-                    errores.append(f"❌ Error al normalizar el Word: {e}")
-                try:
-                    word_buffer = BytesIO()
-                    doc.save(word_buffer)
-                except Exception as e:
-                    errores.append(f"❌ Error al guardar el Word normalizado: {e}")
-                    word_buffer = None
-
-            # EXCEL
-            try:
-                wb = openpyxl.load_workbook(excel_file)
-                sheet = wb.active
-            except Exception as e:
-                errores.append(f"❌ No se pudo leer el archivo Excel: {e}")
-                wb = None
-                sheet = None
-
+        # Se procesa al subir los archivos; los reruns reusan el resultado
+        firma_norm = (word_file.file_id, excel_file.file_id)
+        trabajo_norm = st.session_state.get("trabajo_norm")
+        reintentar = (
+            trabajo_norm is not None and trabajo_norm.firma == firma_norm and trabajo_norm.estado in (CANCELADO, ERROR)
+            and st.button("🔄 Procesar de nuevo", key="norm_reintentar")
+        )
+        if trabajo_norm is None or trabajo_norm.firma != firma_norm or reintentar:
+            lanzar_trabajo("trabajo_norm", partial(
+                normalizar_archivos, (word_file.name, word_file.getvalue()), (excel_file.name, excel_file.getvalue()), perfilar,
+            ), firma_norm)
+
+        trabajo_norm = mostrar_trabajo("trabajo_norm", firma_norm)
+        if trabajo_norm:
+            import pandas as pd
+
+            tags_word, contenido_word, clave_word, resultado_excel, clave_excel, errores, metricas_norm = trabajo_norm.resultado
+            errores = list(errores)
+            word_buffer = BytesIO(contenido_word) if contenido_word is not None else None
             excel_buffer = None
-            columnas_normalizadas = []
+            cabeceras = []
             indices_filtrados = []
+            vista = []
+
+            if resultado_excel is not None:
+                contenido, cabeceras, indices_filtrados, vista, _ = resultado_excel
+                if not indices_filtrados:
+                    errores.append("⚠️ Advertencia: Ninguna columna del Excel coincide con los tags del Word.")
+                excel_buffer = BytesIO(contenido)
+
+            # ERRORES
+            if errores:
+                st.markdown("---")
+                st.subheader("⚠️ Errores y advertencias")
+                for err in errores:
+                    if err.startswith("❌"):
+                        st.error(err)
+                    else:
+                        st.warning(err)
+                st.markdown("---")
 
-            if sheet:
-                try:
-                    for col_idx in range(1, sheet.max_column + 1):
-                        celda = sheet.cell(row=1, column=col_idx)
-                        nombre = normalizar(celda.value) if celda.value else f"col_{col_idx}"
-                        celda.value = nombre
-                        columnas_normalizadas.append(nombre)
-
-                    idx_nro = columnas_normalizadas.index("nro") + 1 if "nro" in columnas_normalizadas else None
-                    filas_a_borrar = []
-
-                    for row_idx in range(2, sheet.max_row + 1):
-                        if idx_nro:
-                            valor = str(sheet.cell(row=row_idx, column=idx_nro).value or "").strip()
-                            if valor == "" or valor == "0":
-                                filas_a_borrar.append(row_idx)
-                                continue
-                        for col_idx in range(1, sheet.max_column + 1):
-                            celda = sheet.cell(row=row_idx, column=col_idx)
-                            nombre_col = columnas_normalizadas[col_idx - 1]
-                            celda.value = formatear_por_columna(celda.value, nombre_col)
-
-                    for row_idx in reversed(filas_a_borrar):
-                        sheet.delete_rows(row_idx)
+            errores_criticos = [e for e in errores if e.startswith("❌")]
 
-                except Exception as e:
-                    errores.append(f"❌ Error al procesar los datos del Excel: {e}")
+            if not errores_criticos:
+                st.subheader("✅ Previsualización")
 
                 try:
-                    cabeceras = [sheet.cell(row=1, column=c).value for c in range(1, sheet.max_column + 1)]
-                    indices_filtrados = [i for i, cab in enumerate(cabeceras) if cab in tags_word]
-
-                    if not indices_filtrados:
-                        errores.append("⚠️ Advertencia: Ninguna columna del Excel coincide con los tags del Word.")
-
-                    wb_filtrado = openpyxl.Workbook()
-                    ws_filtrado = wb_filtrado.active
-
-                    for row_idx in range(1, sheet.max_row + 1):
-                        nueva_fila = [sheet.cell(row=row_idx, column=i + 1).value for i in indices_filtrados]
-                        ws_filtrado.append(nueva_fila)
-
-                    excel_buffer = BytesIO()
-                    wb_filtrado.save(excel_buffer)
-
+                    cabeceras_ordenadas = [cabeceras[i] for i in indices_filtrados]
+                    df_vista = pd.DataFrame(vista, columns=cabeceras_ordenadas)
+                    df_vista = df_vista.loc[:, ~df_vista.columns.duplicated()]
+                    if cabeceras:
+                        cols_mostrar = [c for c in cabeceras_ordenadas if c in df_vista.columns]
+
+                        if cols_mostrar:
+                            st.info(f"🔍 Mostrando {len(cols_mostrar)} columna(s) usadas en el Word: `{'`, `'.join(sorted(cols_mostrar))}`")
+                            st.dataframe(df_vista[cols_mostrar].head(5), use_container_width=True)
+                        else:
+                            st.warning("⚠️ No se encontraron columnas que coincidan con los tags del Word.")
                 except Exception as e:
-                    errores.append(f"❌ Error al generar el Excel filtrado: {e}")
-                    excel_buffer = None
-
-        # ERRORES
-        if errores:
-            st.markdown("---")
-            st.subheader("⚠️ Errores y advertencias")
-            for err in errores:
-                if err.startswith("❌"):
-                    st.error(err)
-                else:
-                    st.warning(err)
-            st.markdown("---")
+                    st.error(f"❌ Error al generar la previsualización: {e}")
 
-        errores_criticos = [e for e in errores if e.startswith("❌")]
+                if tags_word:
+                    with st.expander("🏷️ Tags detectados en el Word"):
+                        st.write(sorted(tags_word))
 
-        if not errores_criticos:
-            st.subheader("✅ Previsualización")
+                st.success("✅ Archivos listos para descargar")
 
-            try:
-                df_vista = pd.DataFrame(sheet.values)
-                if not df_vista.empty:
-                    df_vista.columns = df_vista.iloc[0]
-                    df_vista = df_vista[1:]
-                    df_vista = df_vista.loc[:, ~df_vista.columns.duplicated()]
-
-                    cabeceras_ordenadas = [sheet.cell(row=1, column=i + 1).value for i in indices_filtrados]
-                    cols_mostrar = [c for c in cabeceras_ordenadas if c in df_vista.columns]
-
-                    if cols_mostrar:
-                        st.info(f"🔍 Mostrando {len(cols_mostrar)} columna(s) usadas en el Word: `{'`, `'.join(sorted(cols_mostrar))}`")
-                        st.dataframe(df_vista[cols_mostrar].head(5), use_container_width=True)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if word_buffer:
+                        st.download_button("📄 Descargar Word", word_buffer.getvalue(), "word_normalizado.docx", key="norm_download_word")
                     else:
-                        st.warning("⚠️ No se encontraron columnas que coincidan con los tags del Word.")
-            except Exception as e:
-                st.error(f"❌ Error al generar la previsualización: {e}")
-
-            if tags_word:
-                with st.expander("🏷️ Tags detectados en el Word"):
-                    st.write(sorted(tags_word))
-
-            st.success("✅ Archivos listos para descargar")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                if word_buffer:
-                    st.download_button("📄 Descargar Word", word_buffer.getvalue(), "word_normalizado.docx", key="norm_download_word")
-                else:
-                    st.error("❌ Word no disponible para descarga.")
-            with col2:
-                if excel_buffer:
-                    st.download_button("📊 Descargar Excel", excel_buffer.getvalue(), "excel_limpio.xlsx", key="norm_download_excel")
-                else:
-                    st.error("❌ Excel no disponible para descarga.")
+                        st.error("❌ Word no disponible para descarga.")
+                with col2:
+                    if excel_buffer:
+                        st.download_button("📊 Descargar Excel", excel_buffer.getvalue(), "excel_limpio.xlsx", key="norm_download_excel")
+                    else:
+                        st.error("❌ Excel no disponible para descarga.")
+                panel_rendimiento(metricas_norm, "normalizador")
+
+                # COMBINACIÓN DE CORRESPONDENCIA
+                if word_buffer and excel_buffer and indices_filtrados:
+                    st.markdown("---")
+                    st.subheader("📨 Combinar correspondencia")
+                    salida_comb = st.radio("Salida", ["Un Word por fila (ZIP)", "Un solo Word"], horizontal=True, key="comb_salida")
+                    columna_nombre = st.selectbox("Nombre de cada archivo", ["(número de fila)"] + sorted({cabeceras[i] for i in indices_filtrados}), key="comb_nombre")
+                    workers_comb = st.number_input("Procesos en paralelo (1 = en serie)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=workers_por_defecto(), step=1, key="comb_workers")
+
+                    # El resultado queda ligado a los archivos normalizados y a las opciones
+                    firma_comb = (clave_word, clave_excel, salida_comb, columna_nombre)
+                    if st.button("Generar documentos", key="comb_generar"):
+                        lanzar_trabajo("trabajo_comb", partial(
+                            combinar_documentos, word_buffer.getvalue(), excel_buffer.getvalue(),
+                            salida_comb == "Un solo Word",
+                            None if columna_nombre == "(número de fila)" else columna_nombre,
+                            int(workers_comb), perfilar,
+                        ), firma_comb)
+
+                    trabajo_comb = mostrar_trabajo("trabajo_comb", firma_comb)
+                    if trabajo_comb:
+                        n_docs, contenido_comb, nombre_salida, mime_salida, metricas_comb = trabajo_comb.resultado
+                        st.success(f"✅ {n_docs} documento(s) generado(s)")
+                        st.download_button("📥 Descargar documentos", contenido_comb, nombre_salida, mime=mime_salida, key="comb_download")
+                        panel_rendimiento(metricas_comb, "combinador")
 
 # ==========================================================
 # TAB 4: FILTRADOR TXT
 # ==========================================================
+def filtrar_txt(entrada, prefijos, workers, formato, perfil, trabajo):
+    """`entrada` son los TXT subidos, un ZIP subido o la ruta de una carpeta del servidor."""
+    from suite_operativa.filtrador import filtrar_archivos
+    from suite_operativa.salidas import abrir_escritor
+
+    # Los TXT se filtran desde el disco, varios a la vez con workers > 1; las
+    # líneas van directo a la salida y en pantalla solo se muestran las primeras
+    metricas = Metricas("filtrador")
+    vista = []
+    n_lineas = 0
+    errores = []
+    output = io.BytesIO()
+    with tempfile.TemporaryDirectory(prefix="txt_") as carpeta, \
+            metricas.perfilar(perfil), metricas.etapa("total", unidad="archivos") as medicion_total:
+        lote = lote_de(entrada, "txt")
+        if lote is None:
+            # getbuffer() no copia lo subido
+            archivos = []
+            with metricas.etapa("copiar_a_disco", len(entrada), "archivos"):
+                for k, subido in enumerate(entrada):
+                    ruta = os.path.join(carpeta, f"{k:05d}.txt")
+                    with open(ruta, "wb") as f, subido.getbuffer() as contenido:
+                        f.write(contenido)
+                    archivos.append((subido.name, ruta))
+        else:
+            # Del ZIP se descomprime un TXT a la vez; los de una carpeta se leen donde están
+            with lote, metricas.etapa("preparar_lote", len(lote), "archivos"):
+                archivos, errores = lote.extraer(carpeta, on_progress=trabajo.avance)
+        medicion_total["unidades"] = len(archivos)
+        megabytes = sum(os.path.getsize(ruta) for _, ruta in archivos) / (1024 * 1024)
+        with metricas.etapa("filtrar_y_escribir", megabytes, "MB"), \
+                abrir_escritor(output, ["archivo", "linea"], formato) as escritor:
+            for nombre, lineas in filtrar_archivos(archivos, prefijos, workers, on_progress=trabajo.avance, errores=errores):
+                trabajo.revisar()
+                escritor.agregar((nombre, linea) for linea in lineas)
+                n_lineas += len(lineas)
+                if len(vista) < FILAS_VISTA_TXT:
+                    vista.extend((nombre, linea) for linea in lineas[:FILAS_VISTA_TXT - len(vista)])
+    return n_lineas, vista, output.getvalue(), errores, metricas
+
+
 with tab4:
     st.title("📄 Filtrar líneas (TXT)")
-    txt_archivos = st.file_uploader("Sube tus archivos .txt", type=["txt"], accept_multiple_files=True, key="txt_uploader")
-    prefijos = ('121', '101', '301', '203', '260')
-
-    if st.button("Procesar TXT", key="txt_procesar") and txt_archivos:
-        lineas_filtradas = []
-        for archivo in txt_archivos:
-            contenido = archivo.read().decode('utf-8', errors='ignore')
-            for linea in contenido.splitlines():
-                if linea.startswith(prefijos):
-                    lineas_filtradas.append({'archivo': archivo.name, 'linea': linea.strip()})
-
-        df_txt = pd.DataFrame(lineas_filtradas)
-        if not df_txt.empty:
-            st.dataframe(df_txt, use_container_width=True)
-            st.download_button("📥 Descargar CSV", data=df_txt.to_csv(index=False), file_name="filtrado.csv", mime="text/csv", key="txt_download")
+    entrada_txt, firma_entrada_txt = elegir_entrada("txt", "Sube tus archivos .txt", "txt")
+    prefijos_txt = st.text_input("Prefijos (separados por coma)", ",".join(PREFIJOS), key="txt_prefijos")
+    formato_txt = st.selectbox("Formato de descarga", formatos_disponibles(), key="txt_formato")
+    workers_txt = st.number_input("Procesos en paralelo para filtrar los TXT (1 = en serie)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=workers_por_defecto(), step=1, key="txt_workers")
+
+    prefijos = tuple(p.strip() for p in prefijos_txt.split(",") if p.strip())
+    firma_txt = (firma_entrada_txt, prefijos, formato_txt)
+    if st.button("Procesar TXT", key="txt_procesar") and entrada_txt and ver_txt:
+        lanzar_trabajo("trabajo_txt", partial(filtrar_txt, entrada_txt, prefijos, int(workers_txt), formato_txt, perfilar), firma_txt)
+
+    trabajo_txt = mostrar_trabajo("trabajo_txt", firma_txt) if ver_txt else None
+    if trabajo_txt:
+        import pandas as pd
+
+        n_lineas, vista_txt, contenido_txt, errores_txt, metricas_txt = trabajo_txt.resultado
+        mostrar_errores(errores_txt)
+        if n_lineas:
+            st.caption(f"{n_lineas} línea(s) encontradas; se muestran las primeras {len(vista_txt)}.")
+            st.dataframe(pd.DataFrame(vista_txt, columns=["archivo", "linea"]), use_container_width=True)
+            st.download_button(f"📥 Descargar {formato_txt[1:].upper()}", data=contenido_txt, file_name=f"filtrado{formato_txt}", mime=MIMES[formato_txt], key="txt_download")
         else:
             st.warning("No se encontraron líneas con los prefijos seleccionados.")
+        panel_rendimiento(metricas_txt, "txt")
+
+# ---------------------------------------------------------
+# TIEMPO DE RENDER
+# ---------------------------------------------------------
+@st.cache_resource
+def arranque():
+    # Compartido por el servidor: guarda la duración de la primera ejecución (en frío)
+    return {}
+
+
+segundos_render = time.perf_counter() - INICIO
+primer_render = arranque().setdefault("segundos", segundos_render)
+st.sidebar.caption(f"⏱️ Esta ejecución: {segundos_render * 1000:.0f} ms · primer render del servidor: {primer_render * 1000:.0f} ms")
+
+if not hasattr(st, "fragment") and any(
+    st.session_state.get(clave) is not None and st.session_state[clave].activo
+    for clave in ("trabajo_pdf", "trabajo_primas", "trabajo_norm", "trabajo_comb", "trabajo_txt")
+):
+    # Sin fragmentos el avance se refresca volviendo a ejecutar la app
+    time.sleep(INTERVALO_AVANCE)
+    st.rerun()
@@ -0,0 +1 @@
+"""Benchmarks de la Suite Operativa con datos sintéticos (ver ejecutar.py)."""
@@ -0,0 +1,460 @@
+"""Benchmarks de las cuatro herramientas, fuera de Streamlit.
+
+    python -m benchmarks                       # escala 1, todas las herramientas
+    python -m benchmarks --escala 10 --solo txt polidata
+
+Cada etapa corre en un proceso nuevo: el tiempo y la memoria pico (RSS) son
+solo de esa etapa. Los resultados se agregan a un archivo JSONL y se comparan
+con la corrida anterior de la misma escala.
+"""
+import argparse
+import gc
+import glob
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as dt
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks import generadores
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+DATOS = os.path.join(tempfile.gettempdir(), "suite_benchmarks")
+# Caída de rendimiento (unidades/s) respecto a la corrida anterior que se marca como regresión
+UMBRAL_REGRESION = 0.10
+
+HERRAMIENTAS = ("polidata", "primas", "normalizador", "txt", "app")
+
+
+# ---------------------------------------------------------
+# MEDICIÓN
+# ---------------------------------------------------------
+def _memoria_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _medir(funcion, *args):
+    gc.collect()
+    antes = _memoria_pico_mb()
+    inicio = time.perf_counter()
+    unidades = funcion(*args)
+    segundos = time.perf_counter() - inicio
+    despues = _memoria_pico_mb()
+    return {
+        "segundos": segundos,
+        "unidades": unidades,
+        "memoria_pico_mb": despues,
+        "memoria_extra_mb": None if antes is None else despues - antes,
+    }
+
+
+def _leer(rutas):
+    lista = []
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            lista.append((os.path.basename(ruta), f.read()))
+    return lista
+
+
+# ---------------------------------------------------------
+# ETAPAS (cada una prepara sus entradas y mide solo su parte)
+# ---------------------------------------------------------
+def polidata_extraer_texto(rutas, motor):
+    from suite_operativa import polidata
+
+    archivos = _leer(rutas)
+    # Se cuentan las páginas leídas, también las que se descartan por no tener datos
+    return _medir(lambda: sum(polidata._extraer(datos, motor=motor)[1] for _, datos in archivos))
+
+
+def polidata_parsear(rutas):
+    from suite_operativa import polidata
+
+    textos = ["\n".join(polidata.extraer_textos(datos)) for _, datos in _leer(rutas)]
+    paginas = sum(polidata.contar_paginas(datos) for _, datos in _leer(rutas))
+
+    def parsear():
+        for texto in textos:
+            polidata.parsear_texto(texto)
+        return paginas
+    return _medir(parsear)
+
+
+def polidata_lote(rutas, workers):
+    from suite_operativa import polidata
+
+    archivos = _leer(rutas)
+    paginas = sum(polidata.contar_paginas(datos) for _, datos in archivos)
+
+    def lote():
+        for _ in polidata.iterar_pdfs(archivos, workers=workers):
+            pass
+        return paginas
+    return _medir(lote)
+
+
+def polidata_escribir(rutas, formato):
+    from suite_operativa import polidata
+    from suite_operativa.salidas import abrir_escritor
+
+    filas = polidata.procesar_pdfs(_leer(rutas), workers=1)
+
+    def escribir():
+        with abrir_escritor(io.BytesIO(), polidata.COLUMNAS_POLIDATA, formato) as escritor:
+            escritor.agregar(filas)
+        return len(filas)
+    return _medir(escribir)
+
+
+def primas_leer(rutas, motor):
+    from suite_operativa import primas
+
+    archivos = _leer(rutas)
+    return _medir(lambda: sum(len(df_p) for _, df_p, _ in primas.leer_lote(archivos, workers=1, motor=motor)[0]))
+
+
+def primas_calcular(rutas):
+    from suite_operativa import primas
+
+    tablas = [(nombre, df_p) for nombre, df_p, _ in primas.leer_lote(_leer(rutas), workers=1)[0]]
+
+    def calcular():
+        primas.calcular_primas(tablas, "Sur", "benchmark", "01/01/2026 00:00:00")
+        return sum(len(df_p) for _, df_p in tablas)
+    return _medir(calcular)
+
+
+def primas_escribir(rutas):
+    from suite_operativa import primas
+
+    tablas = [(nombre, df_p) for nombre, df_p, _ in primas.leer_lote(_leer(rutas), workers=1)[0]]
+    df_resumen, df_no_validos = primas.calcular_primas(tablas, "Sur", "benchmark", "01/01/2026 00:00:00")
+
+    def escribir():
+        primas.escribir_reporte(df_resumen, df_no_validos, io.BytesIO())
+        return len(df_resumen) + len(df_no_validos)
+    return _medir(escribir)
+
+
+def primas_parsear_montos(n_celdas):
+    import pandas as pd
+    from suite_operativa.montos import parsear_montos
+
+    columna = pd.Series(generadores.montos_texto(n_celdas), dtype=object)
+    return _medir(lambda: len(parsear_montos(columna)[0]))
+
+
+def _tags(ruta_word):
+    from docx import Document
+    from suite_operativa import normalizador
+
+    return normalizador.extraer_tags_word(Document(ruta_word))
+
+
+def normalizador_word(ruta_word):
+    from docx import Document
+    from suite_operativa import normalizador
+
+    with open(ruta_word, "rb") as f:
+        datos = f.read()
+
+    def normalizar():
+        doc = Document(io.BytesIO(datos))
+        normalizador.normalizar_word(doc)
+        doc.save(io.BytesIO())
+        return len(doc.paragraphs)
+    return _medir(normalizar)
+
+
+def normalizador_excel(ruta_word, ruta_excel):
+    from suite_operativa import normalizador
+
+    tags = _tags(ruta_word)
+    with open(ruta_excel, "rb") as f:
+        datos = f.read()
+    return _medir(lambda: normalizador.normalizar_excel(datos, tags, io.BytesIO())[3])
+
+
+def _entradas_combinacion(ruta_word, ruta_excel, max_filas):
+    from docx import Document
+    from suite_operativa import combinador, normalizador
+
+    doc = Document(ruta_word)
+    tags = normalizador.normalizar_word(doc)
+    word = io.BytesIO()
+    doc.save(word)
+    excel = io.BytesIO()
+    with open(ruta_excel, "rb") as f:
+        normalizador.normalizar_excel(f.read(), tags, excel)
+    cabeceras, filas = combinador.leer_filas(excel.getvalue())
+    return combinador.compilar_plantilla(word.getvalue()), cabeceras, filas[:max_filas]
+
+
+def normalizador_combinar_zip(ruta_word, ruta_excel, max_filas, workers):
+    from suite_operativa import combinador
+
+    plantilla, cabeceras, filas = _entradas_combinacion(ruta_word, ruta_excel, max_filas)
+    return _medir(lambda: combinador.generar_zip(plantilla, cabeceras, filas, io.BytesIO(), workers=workers))
+
+
+def normalizador_combinar_docx(ruta_word, ruta_excel, max_filas):
+    from suite_operativa import combinador
+
+    plantilla, cabeceras, filas = _entradas_combinacion(ruta_word, ruta_excel, max_filas)
+    return _medir(lambda: combinador.generar_documento_unico(plantilla, cabeceras, filas, io.BytesIO()))
+
+
+def _megabytes(rutas):
+    return sum(os.path.getsize(r) for r in rutas) / (1024 * 1024)
+
+
+def txt_filtrar(rutas):
+    from suite_operativa import filtrador
+
+    def filtrar():
+        for ruta in rutas:
+            with open(ruta, "rb") as f:
+                for _ in filtrador.iterar_bloques(f):
+                    pass
+        return _megabytes(rutas)
+    return _medir(filtrar)
+
+
+def txt_filtrar_paralelo(rutas, workers):
+    from suite_operativa import filtrador
+
+    def filtrar():
+        for _ in filtrador.filtrar_archivos([(os.path.basename(r), r) for r in rutas], workers=workers):
+            pass
+        return _megabytes(rutas)
+    return _medir(filtrar)
+
+
+def app_primer_render():
+    from streamlit.testing.v1 import AppTest
+
+    # Proceso nuevo: incluye importar los módulos que carga app.py
+    app = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=120)
+
+    def render():
+        app.run()
+        return 1
+    return _medir(render)
+
+
+# ---------------------------------------------------------
+# DATOS DE ENTRADA
+# ---------------------------------------------------------
+def _generar(ruta, funcion, *args):
+    # Los datos de una escala se reutilizan entre corridas
+    if not os.path.exists(ruta):
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(funcion(*args))
+        os.replace(temporal, ruta)
+    return ruta
+
+
+def preparar_datos(directorio, escala, herramientas):
+    """Genera (si faltan) las entradas de cada herramienta; devuelve sus rutas."""
+    carpeta = os.path.join(directorio, f"escala_{escala:g}")
+    os.makedirs(carpeta, exist_ok=True)
+    datos = {}
+    if "polidata" in herramientas:
+        datos["pdfs"] = [
+            _generar(os.path.join(carpeta, f"poliza_{k:04d}.pdf"), generadores.pdf_poliza, 1_000_000 + k, 40 + (k % 5) * 20, k % 4, k)
+            for k in range(max(1, round(12 * escala)))
+        ]
+    if "primas" in herramientas:
+        datos["primas"] = [
+            _generar(os.path.join(carpeta, f"asegurados_{1234567890 + k}.xlsx"), generadores.excel_primas, max(1, round(5000 * escala)), k % 3 != 2, k)
+            for k in range(6)
+        ]
+    if "normalizador" in herramientas:
+        datos["word"] = _generar(os.path.join(carpeta, "plantilla.docx"), generadores.plantilla_word, 40)
+        # Plantilla larga (~200 páginas a escala 1) con muchas tablas, solo para normalizar el Word
+        datos["word_grande"] = _generar(
+            os.path.join(carpeta, "plantilla_grande.docx"), generadores.plantilla_word,
+            max(40, round(4000 * escala)), generadores.COLUMNAS_NORMALIZADOR, max(1, round(40 * escala)),
+        )
+        datos["excel"] = _generar(os.path.join(carpeta, "datos.xlsx"), generadores.excel_normalizador, max(1, round(10_000 * escala)))
+    if "txt" in herramientas:
+        datos["txt"] = []
+        for k in range(2):
+            ruta = os.path.join(carpeta, f"interfaz_{k}.txt")
+            if not os.path.exists(ruta):
+                generadores.escribir_txt(ruta + ".tmp", 64 * escala, semilla=k)
+                os.replace(ruta + ".tmp", ruta)
+            datos["txt"].append(ruta)
+    if "app" in herramientas:
+        datos["app"] = True
+    return datos
+
+
+def etapas(datos, escala, workers):
+    """(herramienta, etapa, unidad, función, argumentos) de cada medición."""
+    from suite_operativa.polidata import motor_pdf_por_defecto
+    from suite_operativa.primas import motor_por_defecto
+    from suite_operativa.salidas import formatos_disponibles
+
+    lista = []
+    if "pdfs" in datos:
+        pdfs = datos["pdfs"]
+        motores = sorted({"pdfplumber", motor_pdf_por_defecto()})
+        lista += [("polidata", f"extraer_texto_{motor}", "páginas", polidata_extraer_texto, (pdfs, motor)) for motor in motores]
+        lista += [
+            ("polidata", "parsear", "páginas", polidata_parsear, (pdfs,)),
+            ("polidata", f"lote_{workers}_procesos", "páginas", polidata_lote, (pdfs, workers)),
+        ]
+        lista += [("polidata", f"escribir{fmt}", "filas", polidata_escribir, (pdfs, fmt)) for fmt in formatos_disponibles()]
+    if "primas" in datos:
+        rutas = datos["primas"]
+        motores = sorted({"openpyxl", motor_por_defecto()})
+        lista += [("primas", f"leer_{motor}", "filas", primas_leer, (rutas, motor)) for motor in motores]
+        lista += [
+            ("primas", "calcular", "filas", primas_calcular, (rutas,)),
+            ("primas", "escribir_reporte", "filas", primas_escribir, (rutas,)),
+            ("primas", "parsear_montos", "celdas", primas_parsear_montos, (max(1, round(1_000_000 * escala)),)),
+        ]
+    if "word" in datos:
+        word, excel = datos["word"], datos["excel"]
+        max_filas = max(1, round(1000 * escala))
+        lista += [
+            ("normalizador", "word", "párrafos", normalizador_word, (word,)),
+            ("normalizador", "word_grande", "párrafos", normalizador_word, (datos["word_grande"],)),
+            ("normalizador", "excel", "filas", normalizador_excel, (word, excel)),
+            ("normalizador", f"combinar_zip_{workers}_procesos", "documentos", normalizador_combinar_zip, (word, excel, max_filas, workers)),
+            ("normalizador", "combinar_docx", "documentos", normalizador_combinar_docx, (word, excel, max_filas)),
+        ]
+    if "txt" in datos:
+        lista += [
+            ("txt", "filtrar", "MB", txt_filtrar, (datos["txt"],)),
+            ("txt", f"filtrar_{workers}_procesos", "MB", txt_filtrar_paralelo, (datos["txt"], workers)),
+        ]
+    if "app" in datos:
+        lista.append(("app", "primer_render", "renders", app_primer_render, ()))
+    return lista
+
+
+# ---------------------------------------------------------
+# RESULTADOS
+# ---------------------------------------------------------
+def _commit():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=RAIZ)
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def anteriores(ruta, escala):
+    """Último resultado de cada (herramienta, etapa) guardado para la misma escala."""
+    ultimos = {}
+    if not os.path.exists(ruta):
+        return ultimos
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue
+            if registro.get("escala") == escala:
+                ultimos[(registro["herramienta"], registro["etapa"])] = registro
+    return ultimos
+
+
+def _cambio(registro, anterior):
+    if not anterior or not anterior.get("por_segundo") or not registro["por_segundo"]:
+        return "", False
+    cambio = registro["por_segundo"] / anterior["por_segundo"] - 1
+    return f"{cambio:+.1%}", cambio < -UMBRAL_REGRESION
+
+
+def ejecutar(herramientas=HERRAMIENTAS, escala=1.0, workers=None, directorio=DATOS, resultados=RESULTADOS):
+    from suite_operativa.polidata import workers_por_defecto
+
+    workers = workers or max(2, workers_por_defecto())
+    print(f"Generando datos en {directorio} (escala {escala:g})...", file=sys.stderr)
+    datos = preparar_datos(directorio, escala, herramientas)
+    previos = anteriores(resultados, escala)
+    corrida = dt.now().isoformat(timespec="seconds")
+    commit = _commit()
+
+    registros = []
+    regresiones = 0
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'herramienta':<13}{'etapa':<28}{'segundos':>10}{'por segundo':>28}{'memoria':>11}{'vs anterior':>13}")
+    for herramienta, etapa, unidad, funcion, argumentos in etapas(datos, escala, workers):
+        # Un proceso nuevo por etapa: la memoria pico no arrastra la de etapas anteriores
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            medicion = pool.submit(funcion, *argumentos).result()
+        registro = {
+            "corrida": corrida,
+            "commit": commit,
+            "escala": escala,
+            "herramienta": herramienta,
+            "etapa": etapa,
+            "unidad": unidad,
+            "por_segundo": medicion["unidades"] / medicion["segundos"] if medicion["segundos"] else None,
+            "cpus": os.cpu_count(),
+            **medicion,
+        }
+        registros.append(registro)
+        cambio, regresion = _cambio(registro, previos.get((herramienta, etapa)))
+        regresiones += regresion
+        memoria = f"{registro['memoria_pico_mb']:.0f} MB" if registro["memoria_pico_mb"] is not None else "-"
+        print(f"{herramienta:<13}{etapa:<28}{registro['segundos']:>10.3f}"
+              f"{registro['por_segundo'] or 0:>14.1f} {unidad + '/s':<13}{memoria:>11}"
+              f"{cambio:>13}{'  REGRESIÓN' if regresion else ''}")
+
+    with open(resultados, "a", encoding="utf-8") as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    print(f"{len(registros)} medición(es) agregadas a {resultados}", file=sys.stderr)
+    return registros, regresiones
+
+
+def limpiar_datos(directorio=DATOS):
+    for ruta in glob.glob(os.path.join(directorio, "escala_*", "*")):
+        os.remove(ruta)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmarks de la Suite Operativa")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica el tamaño de las entradas (txt: 128 MB por unidad)")
+    parser.add_argument("--solo", nargs="+", choices=HERRAMIENTAS, default=list(HERRAMIENTAS))
+    parser.add_argument("-w", "--workers", type=int, help="Procesos para las etapas en paralelo")
+    parser.add_argument("--datos", default=DATOS, help="Carpeta de los datos generados")
+    parser.add_argument("--resultados", default=RESULTADOS, help="Archivo JSONL donde se acumulan los resultados")
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar los datos de entrada")
+    parser.add_argument("--estricto", action="store_true", help="Termina con error si hay regresiones")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.regenerar:
+        limpiar_datos(args.datos)
+    _, regresiones = ejecutar(args.solo, args.escala, args.workers, args.datos, args.resultados)
+    if regresiones and args.estricto:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Datos sintéticos para los benchmarks, con la forma de los archivos reales.
+
+Todo se genera con semilla fija: la misma escala produce los mismos archivos.
+Los PDFs se escriben a mano (texto Helvetica, sin dependencias extra).
+"""
+import io
+import random
+from datetime import date, timedelta
+
+from docx import Document
+from openpyxl import Workbook
+
+# ---------------------------------------------------------
+# PDF DE PÓLIZAS (POLIDATA)
+# ---------------------------------------------------------
+LINEAS_POR_PAGINA = 60
+
+MARCAS = ["TOYOTA", "HYUNDAI", "KIA", "NISSAN", "CHEVROLET", "SUZUKI", "VOLKSWAGEN"]
+SECCIONES = ["001 INCENDIO", "003 ROBO Y ASALTO", "004 RESPONSABILIDAD CIVIL", "006 VEHICULOS"]
+CLIENTES = ["ACME SERVICIOS, SAC", "INVERSIONES DEL SUR, SA", "TRANSPORTES ANDINOS, SRL", "COMERCIAL NORTE, EIRL"]
+
+
+def _monto(r, maximo):
+    return f"{r.uniform(10, maximo):,.2f}"
+
+
+def lineas_poliza(poliza, n_items, paginas_extra=0, semilla=0):
+    """Líneas de texto de una póliza: cabecera, secciones con ítems y cláusulas."""
+    r = random.Random(semilla)
+    inicio = date(2025, 1, 1) + timedelta(days=r.randint(0, 364))
+    fin = inicio.replace(year=inicio.year + 1)
+    lineas = [
+        f"POLIZA: {poliza}",
+        f"Cliente {r.choice(CLIENTES)}",
+        f"Vigencia {inicio:%d/%m/%Y} - {fin:%d/%m/%Y}",
+    ]
+    por_seccion = max(1, n_items // len(SECCIONES))
+    for seccion in SECCIONES:
+        lineas.append(f"SECCION: {seccion}")
+        lineas.append("Descripcion del riesgo Valor Asegurado Prima Neta")
+        for i in range(por_seccion):
+            if seccion.endswith("VEHICULOS"):
+                placa = f"{r.choice('ABCDEFGHJK')}{r.choice('ABCDEFGHJK')}{r.choice('XYZ')}-{r.randint(100, 999)}"
+                lineas.append(f"Vehiculo {i + 1} PLACA: {placa} {_monto(r, 150_000)} {_monto(r, 5_000)}")
+                lineas.append(f"MARCA: {r.choice(MARCAS)}, MODELO: MODELO {r.randint(1, 40)}, AÑO: {r.randint(2010, 2025)}")
+            else:
+                lineas.append(f"Item {i + 1} local {r.randint(1, 99)} {_monto(r, 2_000_000)} {_monto(r, 20_000)}")
+        lineas.append("Deducible 10% del siniestro, minimo US$ 150.00")
+    for p in range(paginas_extra):
+        for k in range(LINEAS_POR_PAGINA):
+            lineas.append(f"Condiciones generales clausula {p + 1}.{k + 1}: el asegurado se obliga a cumplir")
+    return lineas
+
+
+def _escapar_pdf(texto):
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_desde_lineas(lineas, lineas_por_pagina=LINEAS_POR_PAGINA):
+    """PDF mínimo válido con las líneas en Helvetica (WinAnsi), `lineas_por_pagina` por página."""
+    paginas = [lineas[i:i + lineas_por_pagina] for i in range(0, len(lineas), lineas_por_pagina)] or [[]]
+    n = len(paginas)
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(n)), n)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, pagina in enumerate(paginas):
+        # ' pasa a la línea siguiente (según TL) y escribe el texto
+        flujo = "\n".join(["BT /F1 9 Tf 12 TL 40 800 Td"] + [f"({_escapar_pdf(l)}) '" for l in pagina] + ["ET"])
+        flujo = flujo.encode("cp1252", errors="replace")
+        objetos.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        ).encode())
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for k, cuerpo in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n" % k + cuerpo + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b"%010d 00000 n \n" % posicion
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+def pdf_poliza(poliza, n_items=60, paginas_extra=2, semilla=0):
+    return pdf_desde_lineas(lineas_poliza(poliza, n_items, paginas_extra, semilla))
+
+
+# ---------------------------------------------------------
+# EXCEL DE ASEGURADOS (PRIMAS)
+# ---------------------------------------------------------
+COLUMNAS_PRIMAS = [
+    "N°", "Tipo de Documento", "Número de Documento", "Nombre Completo",
+    "Fecha de Nacimiento", "Capital Asegurado", "Tasa", "Prima", "Observaciones",
+]
+NOMBRES = ["JUAN PEREZ", "ANA TORRES", "LUIS QUISPE", "MARIA ROJAS", "CARLOS DIAZ", "ROSA FLORES"]
+
+
+def excel_primas(n_filas, total=True, semilla=0):
+    """Libro de asegurados con la fila TOTAL al final (rotulada en la columna N°)."""
+    r = random.Random(semilla)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Asegurados")
+    ws.append(COLUMNAS_PRIMAS)
+    suma_capital = suma_prima = 0.0
+    for i in range(n_filas):
+        tipo = r.choices(["DNI", "CE", "PAS", None], weights=[85, 8, 5, 2])[0]
+        if tipo == "DNI":
+            # ~5% con largo incorrecto
+            numero = str(r.randint(10**7, 10**8 - 1)) if r.random() > 0.05 else str(r.randint(10**5, 10**6))
+        else:
+            numero = str(r.randint(10**6, 10**10))
+        capital = round(r.uniform(5_000, 250_000), 2)
+        prima = round(capital * 0.00038, 2)
+        suma_capital += capital
+        suma_prima += prima
+        ws.append([
+            i + 1, tipo, numero, r.choice(NOMBRES), date(1960, 1, 1) + timedelta(days=r.randint(0, 15000)),
+            capital, 0.00038, prima, r.choice(["", "", "", "Alta nueva", "Renovación"]),
+        ])
+    if total:
+        ws.append(["TOTAL", None, None, None, None, round(suma_capital, 2), None, round(suma_prima, 2), None])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def montos_texto(n, semilla=0):
+    """Columna de montos escritos a mano: S/, coma o punto decimal, NBSP y alguna celda que no es monto."""
+    r = random.Random(semilla)
+    montos = []
+    for _ in range(n):
+        texto = f"{r.uniform(1, 2_000_000):,.2f}"
+        forma = r.random()
+        if forma < 0.4:
+            texto = "S/ " + texto.replace(",", " ").replace(".", ",").replace(" ", ".")
+        elif forma < 0.5:
+            texto = texto.replace(",", "\u00a0")
+        elif forma < 0.51:
+            texto = r.choice(["", "pendiente", "-"])
+        montos.append(texto)
+    return montos
+
+
+# ---------------------------------------------------------
+# WORD CON TAGS Y EXCEL (NORMALIZADOR)
+# ---------------------------------------------------------
+COLUMNAS_NORMALIZADOR = [
+    "Nro", "Póliza", "Nombre Completo", "Nro. Documento", "Vigencia Inicio", "Vigencia Término",
+    "Suma Asegurada", "Prima Neta", "Dirección", "Giro del Negocio", "Observaciones", "Col Sin Tag",
+]
+
+
+def plantilla_word(n_parrafos=40, columnas=COLUMNAS_NORMALIZADOR, n_tablas=1):
+    """Word con {{tags}} sin normalizar, algunos partidos entre runs, tablas (con una anidada), cabecera y pie."""
+    tags = [c for c in columnas if c != "Col Sin Tag"]
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Certificado de la póliza {{Póliza}}"
+    doc.sections[0].footer.paragraphs[0].text = "{{Nombre Completo}} - {{Nro. Documento}}"
+    for i in range(n_parrafos):
+        tag = tags[i % len(tags)]
+        p = doc.add_paragraph(f"Cláusula {i + 1}. Se deja constancia de que ")
+        if i % 3 == 0:
+            # Tag partido en dos runs, como suele quedar al editar en Word
+            mitad = len(tag) // 2
+            p.add_run("{{" + tag[:mitad])
+            p.add_run(tag[mitad:] + "}}").bold = True
+        else:
+            p.add_run("{{" + tag + "}}")
+        p.add_run(" forma parte integrante del presente certificado.")
+    for _ in range(n_tablas):
+        tabla = doc.add_table(rows=len(tags), cols=2)
+        for fila, tag in zip(tabla.rows, tags):
+            fila.cells[0].text = tag
+            fila.cells[1].text = "{{" + tag + "}}"
+        anidada = tabla.rows[-1].cells[1].add_table(rows=1, cols=2)
+        anidada.rows[0].cells[0].text = "{{Giro del Negocio}}"
+        anidada.rows[0].cells[1].text = "{{Suma Asegurada}}"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def excel_normalizador(n_filas, columnas=COLUMNAS_NORMALIZADOR, semilla=0):
+    """Excel con cabeceras sin normalizar; ~3% de filas con Nro vacío o 0 (se descartan)."""
+    r = random.Random(semilla)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Datos")
+    ws.append(columnas)
+    for i in range(n_filas):
+        inicio = date(2025, 1, 1) + timedelta(days=r.randint(0, 364))
+        nro = i + 1 if r.random() > 0.03 else r.choice([0, None, ""])
+        fila = {
+            "Nro": nro,
+            "Póliza": r.randint(10**9, 10**10),
+            "Nombre Completo": r.choice(NOMBRES).title(),
+            "Nro. Documento": float(r.randint(10**7, 10**8 - 1)),
+            "Vigencia Inicio": inicio,
+            "Vigencia Término": f"{inicio.year + 1}-{inicio.month:02d}-{inicio.day:02d} 00:00:00",
+            "Suma Asegurada": round(r.uniform(1_000, 5_000_000), 2),
+            "Prima Neta": r.choice([round(r.uniform(50, 20_000), 2), "por definir"]),
+            "Dirección": f"Av. Principal {r.randint(1, 999)}, Lima",
+            "Giro del Negocio": r.choice(["comercio", "industria", "servicios"]),
+            "Observaciones": r.choice(["", None, "renovación"]),
+            "Col Sin Tag": r.random(),
+        }
+        ws.append([fila.get(c) for c in columnas])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------
+# TXT DE INTERFACES (FILTRADOR)
+# ---------------------------------------------------------
+PREFIJOS_OTROS = ("000", "100", "122", "200", "261", "300", "999")
+
+
+def escribir_txt(ruta, megabytes, proporcion=0.05, prefijos=("121", "101", "301", "203", "260"), semilla=0):
+    """Escribe un TXT de interfaz de ~`megabytes` MB con líneas CRLF de ancho fijo.
+
+    Una `proporcion` de las líneas empieza con alguno de `prefijos`. Las líneas
+    salen de un conjunto precalculado para poder generar varios GB rápido.
+    """
+    r = random.Random(semilla)
+    conjunto = []
+    for i in range(20_000):
+        prefijo = r.choice(prefijos) if r.random() < proporcion else r.choice(PREFIJOS_OTROS)
+        cuerpo = f"{r.randint(0, 10**12):013d}{r.choice(NOMBRES):<30}{r.uniform(0, 10**6):>15.2f}{i:08d}"
+        conjunto.append((prefijo + cuerpo + "\r\n").encode("ascii"))
+    objetivo = int(megabytes * 1024 * 1024)
+    escritos = 0
+    with open(ruta, "wb") as f:
+        while escritos < objetivo:
+            bloque = b"".join(r.choices(conjunto, k=10_000))
+            f.write(bloque)
+            escritos += len(bloque)
+    return escritos
@@ -0,0 +1 @@
+"""Lógica de procesamiento de la Suite Operativa, independiente de Streamlit."""
@@ -0,0 +1,3 @@
+from suite_operativa.cli import main
+
+main()
@@ -0,0 +1,99 @@
+"""Filas en disco para lotes que no caben en memoria.
+
+AlmacenFilas junta las filas en memoria y las vuelca por lotes a una base
+SQLite temporal (sin dependencias extra); el reporte final se arma leyéndolas
+de nuevo por lotes, en el orden en que llegaron.
+"""
+import os
+import sqlite3
+import tempfile
+
+from suite_operativa.metricas import memoria_mb
+
+FILAS_POR_LOTE = 5000
+
+
+class AlmacenFilas:
+    """Tabla de `columnas` en un archivo SQLite temporal que se borra al cerrar.
+
+    Las filas pendientes se vuelcan al llegar a `filas_por_lote` o, con
+    `memoria_max_mb`, en cuanto el proceso supera ese RSS.
+    """
+
+    def __init__(self, columnas, directorio=None, filas_por_lote=FILAS_POR_LOTE, memoria_max_mb=None):
+        self.columnas = list(columnas)
+        self.filas_por_lote = filas_por_lote
+        self.memoria_max_mb = memoria_max_mb
+        self.volcados = 0
+        self._pendientes = []
+        self._guardadas = 0
+        descriptor, self.ruta = tempfile.mkstemp(prefix="filas_", suffix=".sqlite", dir=directorio)
+        os.close(descriptor)
+        self._db = sqlite3.connect(self.ruta)
+        # Es un archivo temporal: no hace falta diario ni sincronizar con el disco
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(f"CREATE TABLE filas ({', '.join(f'c{i}' for i in range(len(self.columnas)))})")
+        self._insertar = f"INSERT INTO filas VALUES ({', '.join('?' * len(self.columnas))})"
+
+    def agregar(self, filas):
+        self._pendientes.extend(filas)
+        if len(self._pendientes) >= self.filas_por_lote or self.sobre_limite():
+            self.volcar()
+
+    def sobre_limite(self):
+        if self.memoria_max_mb is None:
+            return False
+        actual = memoria_mb()
+        return actual is not None and actual > self.memoria_max_mb
+
+    def volcar(self):
+        if not self._pendientes:
+            return
+        self._db.executemany(self._insertar, self._pendientes)
+        self._db.commit()
+        self._guardadas += len(self._pendientes)
+        self._pendientes = []
+        self.volcados += 1
+
+    def __len__(self):
+        return self._guardadas + len(self._pendientes)
+
+    # -----------------------------------------------------
+    # LECTURA
+    # -----------------------------------------------------
+    def iterar(self, lote=None):
+        """Lotes de filas (tuplas) en el orden en que se agregaron."""
+        self.volcar()
+        cursor = self._db.execute("SELECT * FROM filas ORDER BY rowid")
+        while True:
+            filas = cursor.fetchmany(lote or self.filas_por_lote)
+            if not filas:
+                return
+            yield filas
+
+    def primeras(self, n):
+        self.volcar()
+        return self._db.execute("SELECT * FROM filas ORDER BY rowid LIMIT ?", (n,)).fetchall()
+
+    def volcar_en(self, escritor):
+        """Pasa todas las filas a un escritor de salidas.py; devuelve cuántas."""
+        n = 0
+        for filas in self.iterar():
+            escritor.agregar(filas)
+            n += len(filas)
+        return n
+
+    def cerrar(self):
+        self._pendientes = []
+        self._db.close()
+        try:
+            os.remove(self.ruta)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Subir la versión de un tipo invalida sus resultados guardados
+VERSIONES = {
+    "polidata": "3",
+    "primas": "2",
+    "normalizador": "4",
+    "normalizador_word": "2",
+}
+
+MAX_MEMORIA = 256 * 1024 * 1024
+MAX_DISCO = 2 * 1024 * 1024 * 1024
+
+
+def hash_contenido(datos, extra=""):
+    h = hashlib.sha256(datos)
+    if extra:
+        h.update(b"\0" + extra.encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """Caché LRU de resultados por archivo, en memoria y opcionalmente en disco.
+
+    La clave es el tipo de proceso, su versión y el hash del contenido; los valores
+    se guardan serializados, así que cada lectura devuelve una copia independiente.
+    """
+
+    def __init__(self, max_memoria=MAX_MEMORIA, directorio=None, max_disco=MAX_DISCO):
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self.directorio = directorio
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def clave(tipo, datos, extra=""):
+        # `extra` distingue resultados que dependen de algo más que el archivo (p. ej. los tags del Word)
+        return f"{tipo}-v{VERSIONES[tipo]}-{hash_contenido(datos, extra)}"
+
+    # -----------------------------------------------------
+    # MEMORIA
+    # -----------------------------------------------------
+    def _guardar_memoria(self, clave, blob):
+        if len(blob) > self.max_memoria:
+            return
+        with self._lock:
+            anterior = self._memoria.pop(clave, None)
+            if anterior is not None:
+                self._bytes_memoria -= len(anterior)
+            self._memoria[clave] = blob
+            self._bytes_memoria += len(blob)
+            while self._bytes_memoria > self.max_memoria:
+                _, expulsado = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(expulsado)
+
+    def _leer_memoria(self, clave):
+        with self._lock:
+            blob = self._memoria.get(clave)
+            if blob is not None:
+                self._memoria.move_to_end(clave)
+            return blob
+
+    # -----------------------------------------------------
+    # DISCO
+    # -----------------------------------------------------
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + ".pkl")
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                blob = f.read()
+            os.utime(ruta)
+        except OSError:
+            return None
+        return blob
+
+    def _guardar_disco(self, clave, blob):
+        if not self.directorio:
+            return
+        try:
+            fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(temporal, self._ruta(clave))
+            self._recortar_disco()
+        except OSError:
+            pass
+
+    def _recortar_disco(self):
+        entradas = []
+        total = 0
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith(".pkl"):
+                info = entrada.stat()
+                entradas.append((info.st_mtime, info.st_size, entrada.path))
+                total += info.st_size
+        # Se eliminan primero los usados hace más tiempo
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_disco:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
+
+    # -----------------------------------------------------
+    # API
+    # -----------------------------------------------------
+    def obtener(self, clave, defecto=None):
+        blob = self._leer_memoria(clave)
+        if blob is None:
+            blob = self._leer_disco(clave)
+            if blob is not None:
+                self._guardar_memoria(clave, blob)
+        if blob is None:
+            self.fallos += 1
+            return defecto
+        self.aciertos += 1
+        return pickle.loads(blob)
+
+    def guardar(self, clave, valor):
+        blob = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        self._guardar_memoria(clave, blob)
+        self._guardar_disco(clave, blob)
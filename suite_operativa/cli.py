@@ -0,0 +1,295 @@
+"""Procesamiento por lotes sin Streamlit.
+
+    python -m suite_operativa polidata pdfs/ -o Renovaciones.xlsx --indice
+    python -m suite_operativa indice --cliente acme --vence-desde 2026-01-01 -o acme.xlsx
+    python -m suite_operativa primas "excels/*.xlsx" -o Resumen_Validacion.xlsx --zona Norte
+    python -m suite_operativa txt interfaces/ -o filtrado.parquet
+    python -m suite_operativa normalizar --word plantilla.docx --excel datos.xlsx -d salida/
+    python -m suite_operativa combinar --word plantilla.docx --excel datos.xlsx -o certificados.zip
+
+Todos los comandos aceptan --metricas (tiempos por etapa en .json, .csv o
+.prom) y --perfil (informe de cProfile por la salida de errores).
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+from datetime import datetime as dt
+
+from docx import Document
+
+from suite_operativa import combinador, filtrador, normalizador, polidata, primas
+from suite_operativa.cache import hash_contenido
+from suite_operativa.indice import IndicePolizas, ruta_por_defecto
+from suite_operativa.metricas import FORMATOS_METRICAS, Metricas
+from suite_operativa.polidata import COLUMNAS_POLIDATA, MOTORES_PDF, iterar_pdfs, workers_por_defecto
+from suite_operativa.salidas import abrir_escritor, guardar_tabla
+
+
+# ---------------------------------------------------------
+# ENTRADAS Y SALIDAS
+# ---------------------------------------------------------
+def expandir_entradas(entradas, extension):
+    """Archivos con `extension` a partir de rutas, carpetas (recursivo) o globs."""
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas.extend(glob.glob(os.path.join(entrada, "**", "*" + extension), recursive=True))
+        elif glob.has_magic(entrada):
+            rutas.extend(glob.glob(entrada, recursive=True))
+        else:
+            rutas.append(entrada)
+    vistos = set()
+    resultado = []
+    for ruta in rutas:
+        if ruta.lower().endswith(extension) and ruta not in vistos:
+            vistos.add(ruta)
+            resultado.append(ruta)
+    return sorted(resultado)
+
+
+def leer_archivo(ruta):
+    with open(ruta, "rb") as f:
+        return os.path.basename(ruta), f.read()
+
+
+def _progreso(nombre, hechos, total):
+    print(f"[{hechos}/{total}] {nombre}", file=sys.stderr)
+
+
+# ---------------------------------------------------------
+# COMANDOS
+# ---------------------------------------------------------
+def comando_polidata(args, metricas):
+    rutas = expandir_entradas(args.entradas, ".pdf")
+    motor = args.motor or polidata.motor_pdf_por_defecto()
+
+    # Con --indice los PDFs ya indexados se saltan y los nuevos se agregan
+    indice = None
+    hashes = [None] * len(rutas)
+    if args.indice:
+        indice = IndicePolizas(args.indice)
+        for k, ruta in enumerate(rutas):
+            hashes[k] = hash_contenido(leer_archivo(ruta)[1])
+        conocidos = indice.indexados(hashes)
+        nuevos = [k for k, h in enumerate(hashes) if h not in conocidos]
+        if len(nuevos) < len(rutas):
+            print(f"{len(rutas) - len(nuevos)} PDF(s) ya indexados, se omiten", file=sys.stderr)
+        rutas, hashes = [rutas[k] for k in nuevos], [hashes[k] for k in nuevos]
+
+    n_filas = 0
+    with abrir_escritor(args.salida, COLUMNAS_POLIDATA) as escritor:
+        # Se pasan rutas: cada proceso lee su PDF y el lote no se carga entero en memoria
+        filas_por_pdf = iterar_pdfs(((os.path.basename(r), r) for r in rutas), workers=args.workers, on_progress=_progreso, metricas=metricas, motor=motor)
+        for ruta, hash_pdf, filas in zip(rutas, hashes, filas_por_pdf):
+            if indice is not None:
+                with metricas.etapa("indexar", len(filas), "filas", os.path.basename(ruta)):
+                    indice.agregar(os.path.basename(ruta), hash_pdf, filas)
+            with metricas.etapa("escribir", len(filas), "filas"):
+                escritor.agregar(filas)
+            n_filas += len(filas)
+    print(f"{len(rutas)} PDF(s), {n_filas} fila(s) -> {args.salida}")
+
+    if args.validar:
+        # Referencia: pdfplumber leyendo todas las páginas, sin descartar ninguna
+        distintos = 0
+        for ruta in rutas:
+            nombre, datos = leer_archivo(ruta)
+            with metricas.etapa("validar", unidad="filas", archivo=nombre) as medicion:
+                filas, filas_ref, diferencias = polidata.comparar_motores(datos, motor)
+                medicion["unidades"] = len(filas_ref)
+            if diferencias:
+                distintos += 1
+                print(f"{nombre}: {len(filas)} fila(s) con {motor}, {len(filas_ref)} con pdfplumber", file=sys.stderr)
+                for origen, fila in diferencias[:10]:
+                    print(f"  solo {origen}: {fila}", file=sys.stderr)
+        print(f"Validación: {distintos} de {len(rutas)} PDF(s) con diferencias")
+
+
+def comando_indice(args, metricas):
+    indice = IndicePolizas(args.db)
+    with abrir_escritor(args.salida, COLUMNAS_POLIDATA) as escritor:
+        if args.nuevas:
+            with metricas.etapa("exportar_nuevas", unidad="filas") as medicion:
+                medicion["unidades"] = n_filas = indice.exportar_nuevas(escritor, args.marca)
+            print(f"{n_filas} fila(s) nuevas o cambiadas desde la última exportación '{args.marca}' -> {args.salida}")
+            return
+        with metricas.etapa("buscar", unidad="filas") as medicion:
+            filas, total = indice.buscar(args.poliza, args.cliente, args.placa, args.vence_desde, args.vence_hasta, limite=args.limite)
+            medicion["unidades"] = len(filas)
+        escritor.agregar(filas)
+    print(f"{len(filas)} de {total} fila(s) -> {args.salida}")
+
+
+def comando_primas(args, metricas):
+    rutas = expandir_entradas(args.entradas, ".xlsx")
+    motor = args.motor or primas.motor_por_defecto()
+    leidos, errores = primas.leer_lote((leer_archivo(r) for r in rutas), workers=args.workers, motor=motor)
+    for nombre, motivo in errores:
+        print(f"{nombre}: se omite, {motivo}", file=sys.stderr)
+    for nombre, df_p, segundos in leidos:
+        print(f"{nombre}: {len(df_p)} fila(s) en {segundos:.3f} s", file=sys.stderr)
+        metricas.registrar(f"leer_{motor}", segundos, len(df_p), "filas", nombre)
+    tablas = [(nombre, df_p) for nombre, df_p, _ in leidos]
+    fecha_reporte = dt.now().strftime("%d/%m/%Y %H:%M:%S")
+    with metricas.etapa("calcular", sum(len(df_p) for _, df_p in tablas), "filas"):
+        df_resumen, df_no_validos = primas.calcular_primas(tablas, args.zona, args.usuario, fecha_reporte)
+
+    base, extension = os.path.splitext(args.salida)
+    with metricas.etapa("escribir_reporte", len(df_resumen) + len(df_no_validos), "filas"):
+        if extension.lower() == ".xlsx":
+            primas.escribir_reporte(df_resumen, df_no_validos, args.salida)
+        else:
+            guardar_tabla(df_resumen, args.salida)
+            guardar_tabla(df_no_validos, f"{base}_no_validos{extension}")
+    if df_resumen.attrs.get("capital_no_leido"):
+        print(f"{df_resumen.attrs['capital_no_leido']} celda(s) de Capital Asegurado no son un monto", file=sys.stderr)
+    print(f"{len(leidos)} Excel(s), {len(df_no_validos)} no válido(s) -> {args.salida}")
+
+
+def comando_txt(args, metricas):
+    rutas = expandir_entradas(args.entradas, ".txt")
+    prefijos = tuple(p.strip() for p in args.prefijos.split(",") if p.strip())
+    n_lineas = 0
+    megabytes = sum(os.path.getsize(r) for r in rutas) / (1024 * 1024)
+    errores = []
+    archivos = [(os.path.basename(r), r) for r in rutas]
+    with metricas.etapa("filtrar_y_escribir", megabytes, "MB"), abrir_escritor(args.salida, ["archivo", "linea"]) as escritor:
+        for nombre, lineas in filtrador.filtrar_archivos(archivos, prefijos, args.workers, errores=errores):
+            escritor.agregar((nombre, linea) for linea in lineas)
+            n_lineas += len(lineas)
+    for nombre, motivo in errores:
+        print(f"{nombre}: se omite, {motivo}", file=sys.stderr)
+    print(f"{len(rutas) - len(errores)} TXT, {n_lineas} línea(s) -> {args.salida}")
+
+
+def comando_normalizar(args, metricas):
+    os.makedirs(args.directorio, exist_ok=True)
+    with metricas.etapa("word", unidad="párrafos", archivo=os.path.basename(args.word)) as medicion:
+        doc = Document(args.word)
+        tags_word = normalizador.normalizar_word(doc)
+        doc.save(os.path.join(args.directorio, "word_normalizado.docx"))
+        medicion["unidades"] = len(doc.paragraphs)
+
+    with open(args.excel, "rb") as f:
+        datos = f.read()
+    excluidas = [c.strip() for c in args.excluidas.split(",") if c.strip()]
+    destino = os.path.join(args.directorio, "excel_limpio.xlsx")
+    with metricas.etapa("excel", unidad="filas", archivo=os.path.basename(args.excel)) as medicion:
+        _, indices, _, n_filas = normalizador.normalizar_excel(datos, tags_word, destino, excluidas=excluidas)
+        medicion["unidades"] = n_filas
+    if not indices:
+        print("Advertencia: ninguna columna del Excel coincide con los tags del Word.", file=sys.stderr)
+    print(f"{len(tags_word)} tag(s), {len(indices)} columna(s), {n_filas} fila(s) -> {args.directorio}")
+
+
+def comando_combinar(args, metricas):
+    with metricas.etapa("normalizar"):
+        doc = Document(args.word)
+        tags_word = normalizador.normalizar_word(doc)
+        word = io.BytesIO()
+        doc.save(word)
+
+        excel = io.BytesIO()
+        with open(args.excel, "rb") as f:
+            normalizador.normalizar_excel(f.read(), tags_word, excel)
+    with metricas.etapa("leer_filas", unidad="filas") as medicion:
+        cabeceras, filas = combinador.leer_filas(excel.getvalue())
+        medicion["unidades"] = len(filas)
+    with metricas.etapa("compilar_plantilla"):
+        plantilla = combinador.compilar_plantilla(word.getvalue())
+    faltantes = set(plantilla.tags) - set(cabeceras)
+    if faltantes:
+        print(f"Advertencia: tags sin columna en el Excel: {', '.join(sorted(faltantes))}", file=sys.stderr)
+
+    if args.salida.lower().endswith(".docx"):
+        with metricas.etapa("documento_unico", len(filas), "documentos"):
+            n_docs = combinador.generar_documento_unico(plantilla, cabeceras, filas, args.salida)
+    else:
+        with metricas.etapa("zip", len(filas), "documentos"):
+            n_docs = combinador.generar_zip(plantilla, cabeceras, filas, args.salida, workers=args.workers, columna_nombre=args.nombre)
+    print(f"{n_docs} documento(s) -> {args.salida}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="suite_operativa", description="Suite Operativa por lotes (sin Streamlit)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument("--metricas", help="Guarda los tiempos por etapa en .json, .csv o .prom (Prometheus)")
+    comunes.add_argument("--perfil", action="store_true", help="Perfila la ejecución con cProfile (solo el proceso principal)")
+
+    p = sub.add_parser("polidata", parents=[comunes], help="Extrae coberturas de PDFs de pólizas")
+    p.add_argument("entradas", nargs="+", help="PDFs, carpetas o globs")
+    p.add_argument("-o", "--salida", default="Renovaciones.xlsx", help=".xlsx, .csv o .parquet")
+    p.add_argument("--motor", choices=MOTORES_PDF, help="Lector de texto del PDF (por defecto pdfium si está instalado)")
+    p.add_argument("--validar", action="store_true", help="Compara las filas de cada PDF con las de pdfplumber leyendo todas las páginas")
+    p.add_argument("--indice", nargs="?", const=ruta_por_defecto(), help="Índice SQLite de pólizas: omite los PDFs ya indexados y agrega los nuevos")
+    p.add_argument("-w", "--workers", type=int, default=workers_por_defecto())
+    p.set_defaults(funcion=comando_polidata)
+
+    p = sub.add_parser("indice", parents=[comunes], help="Busca en el índice de pólizas o exporta las nuevas o cambiadas")
+    p.add_argument("--db", default=ruta_por_defecto(), help="Archivo SQLite del índice (por defecto SUITE_INDICE_DB o ~/.suite_operativa)")
+    p.add_argument("-o", "--salida", default="polizas.csv", help=".xlsx, .csv o .parquet")
+    p.add_argument("--poliza", default="", help="Prefijo del número de póliza")
+    p.add_argument("--cliente", default="", help="Prefijo del cliente (sin distinguir mayúsculas)")
+    p.add_argument("--placa", default="")
+    p.add_argument("--vence-desde", help="aaaa-mm-dd")
+    p.add_argument("--vence-hasta", help="aaaa-mm-dd")
+    p.add_argument("--limite", type=int, default=100_000)
+    p.add_argument("--nuevas", action="store_true", help="Exporta solo las pólizas nuevas o cambiadas desde la última exportación y avanza la marca")
+    p.add_argument("--marca", default="cli", help="Nombre de la marca de --nuevas (una por destino)")
+    p.set_defaults(funcion=comando_indice)
+
+    p = sub.add_parser("primas", parents=[comunes], help="Valida asegurados y calcula primas")
+    p.add_argument("entradas", nargs="+", help="Excels, carpetas o globs")
+    p.add_argument("-o", "--salida", default="Resumen_Validacion.xlsx", help=".xlsx, .csv o .parquet")
+    p.add_argument("--zona", choices=sorted(primas.TASAS_NETA), default="Sur")
+    p.add_argument("--usuario", default="CLI")
+    p.add_argument("--motor", choices=["calamine", "openpyxl"], help="Lector de Excel (por defecto calamine si está instalado)")
+    p.add_argument("-w", "--workers", type=int, default=workers_por_defecto())
+    p.set_defaults(funcion=comando_primas)
+
+    p = sub.add_parser("txt", parents=[comunes], help="Filtra líneas de TXT por prefijo")
+    p.add_argument("entradas", nargs="+", help="TXT, carpetas o globs")
+    p.add_argument("-o", "--salida", default="filtrado.csv", help=".xlsx, .csv o .parquet")
+    p.add_argument("--prefijos", default=",".join(filtrador.PREFIJOS), help="Separados por coma")
+    p.add_argument("-w", "--workers", type=int, default=workers_por_defecto())
+    p.set_defaults(funcion=comando_txt)
+
+    p = sub.add_parser("normalizar", parents=[comunes], help="Normaliza tags del Word y cabeceras del Excel")
+    p.add_argument("--word", required=True)
+    p.add_argument("--excel", required=True)
+    p.add_argument("-d", "--directorio", default=".")
+    p.add_argument("--excluidas", default=",".join(normalizador.COLUMNAS_EXCLUIDAS),
+                   help="Claves de columnas sin formato numérico, separadas por coma")
+    p.set_defaults(funcion=comando_normalizar)
+
+    p = sub.add_parser("combinar", parents=[comunes], help="Genera un Word por fila del Excel (ZIP) o uno solo con todas")
+    p.add_argument("--word", required=True)
+    p.add_argument("--excel", required=True)
+    p.add_argument("-o", "--salida", default="documentos.zip", help=".zip (un .docx por fila) o .docx (un solo documento)")
+    p.add_argument("--nombre", help="Columna con el nombre de cada archivo del ZIP (por defecto el número de fila)")
+    p.add_argument("-w", "--workers", type=int, default=workers_por_defecto())
+    p.set_defaults(funcion=comando_combinar)
+
+    return parser
+
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.metricas and os.path.splitext(args.metricas)[1].lower() not in FORMATOS_METRICAS:
+        parser.error("--metricas debe terminar en .json, .csv o .prom")
+    metricas = Metricas(args.comando)
+    with metricas.perfilar(args.perfil), metricas.etapa("total"):
+        args.funcion(args, metricas)
+    if args.metricas:
+        metricas.exportar(args.metricas)
+    if metricas.perfil:
+        print(metricas.perfil, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
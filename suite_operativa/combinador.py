@@ -0,0 +1,281 @@
+"""Combinación de correspondencia: un documento Word por fila del Excel limpio.
+
+La plantilla se compila una sola vez: cada {{tag}} queda entero dentro de un
+w:t y las partes XML del .docx se guardan como texto fijo intercalado con los
+nombres de los tags. Rellenar una fila es entonces unir cadenas, sin volver a
+abrir el Word.
+"""
+import io
+import re
+import struct
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from suite_operativa.normalizador import PARTES_CON_TAGS, abrir_hoja, normalizar, normalizar_word
+from suite_operativa.polidata import workers_por_defecto
+from suite_operativa.trabajos import contexto_procesos
+
+DOCUMENTO = "word/document.xml"
+
+FILAS_POR_TAREA = 32
+SALTO_DE_PAGINA = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+# En el XML un tag consolidado no contiene marcas
+_TAG_XML = re.compile(r"{{([^{}<>]*)}}")
+# Un tag también puede estar en un atributo (texto alternativo, tooltip): se escapan las comillas
+_ENTIDADES = {'"': "&quot;", "'": "&apos;"}
+# Caracteres que XML 1.0 no admite (celdas con \x0b de Alt+Enter, por ejemplo): los
+# saltos verticales pasan a espacio y el resto se quita
+_FUERA_DE_XML = {c: None for c in [*range(0x20), 0xFFFE, 0xFFFF, *range(0xD800, 0xE000)] if c not in (0x09, 0x0A, 0x0D)}
+_FUERA_DE_XML.update({0x0B: " ", 0x0C: " "})
+
+
+# ---------------------------------------------------------
+# COMPILACIÓN DE LA PLANTILLA
+# ---------------------------------------------------------
+def _segmentos(xml):
+    """[texto, tag, texto, tag, ..., texto] con los tags ya normalizados."""
+    partes = _TAG_XML.split(xml)
+    partes[1::2] = [normalizar(tag) for tag in partes[1::2]]
+    return partes
+
+
+def _comprimir(nombre, datos):
+    """Entrada de ZIP ya comprimida: (nombre, crc, datos comprimidos, tamaño original)."""
+    compresor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return nombre, zlib.crc32(datos), compresor.compress(datos) + compresor.flush(), len(datos)
+
+
+def _armar_zip(entradas):
+    """Bytes de un ZIP con entradas de _comprimir (sin volver a comprimir nada).
+
+    Las partes fijas de la plantilla se comprimen una sola vez; cada documento
+    solo comprime las que llevan tags.
+    """
+    locales = []
+    central = []
+    posicion = 0
+    for nombre, crc, datos, tamano in entradas:
+        nombre_b = nombre.encode("utf-8")
+        banderas = 0 if nombre.isascii() else 0x800
+        # Fecha fija (1980-01-01): el mismo contenido genera los mismos bytes
+        local = struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, banderas, zipfile.ZIP_DEFLATED, 0, 0x21,
+                            crc, len(datos), tamano, len(nombre_b), 0)
+        central.append(struct.pack("<4s6H3L5H2L", b"PK\x01\x02", 20, 20, banderas, zipfile.ZIP_DEFLATED, 0, 0x21,
+                                   crc, len(datos), tamano, len(nombre_b), 0, 0, 0, 0, 0, posicion) + nombre_b)
+        locales += [local, nombre_b, datos]
+        posicion += len(local) + len(nombre_b) + len(datos)
+    directorio = b"".join(central)
+    fin = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, len(central), len(central), len(directorio), posicion, 0)
+    return b"".join(locales) + directorio + fin
+
+
+def _rellenar(segmentos, valores):
+    partes = list(segmentos)
+    for i in range(1, len(partes), 2):
+        valor = valores.get(partes[i])
+        partes[i] = "{{" + partes[i] + "}}" if valor is None else escape(valor.translate(_FUERA_DE_XML), _ENTIDADES)
+    return "".join(partes)
+
+
+class PlantillaWord:
+    """Plantilla .docx compilada; se puede enviar a otros procesos.
+
+    `entradas` son las partes del .docx en su orden original; las que tienen
+    tags están además en `segmentos`. El cuerpo del documento se guarda aparte
+    para combinar todas las filas en un solo Word.
+    """
+
+    def __init__(self, entradas, segmentos, cuerpo):
+        self.entradas = entradas
+        self.segmentos = segmentos
+        self.cuerpo = cuerpo
+        self.comprimidas = {nombre: _comprimir(nombre, datos) for nombre, datos in entradas if nombre not in segmentos}
+
+    @property
+    def tags(self):
+        return sorted({tag for partes in self.segmentos.values() for tag in partes[1::2]})
+
+    def _partes(self, valores):
+        for nombre, datos in self.entradas:
+            if nombre in self.segmentos:
+                datos = _rellenar(self.segmentos[nombre], valores).encode("utf-8")
+            yield nombre, datos
+
+    def renderizar(self, valores):
+        """Bytes del .docx con los tags reemplazados por `valores` ({tag: texto}).
+
+        Los tags sin valor se dejan tal cual.
+        """
+        return _armar_zip([
+            self.comprimidas[nombre] if nombre in self.comprimidas
+            else _comprimir(nombre, _rellenar(self.segmentos[nombre], valores).encode("utf-8"))
+            for nombre, _ in self.entradas
+        ])
+
+    def combinar(self, lista_valores, destino):
+        """Un solo .docx con una copia del cuerpo por cada elemento, separadas por salto de página.
+
+        Cabeceras y pies de página se rellenan con los valores del primero.
+        """
+        primeros = lista_valores[0] if lista_valores else {}
+        inicio, cuerpo, fin = self.cuerpo
+        with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+            for nombre, datos in self._partes(primeros):
+                if nombre != DOCUMENTO:
+                    zf.writestr(nombre, datos)
+                    continue
+                with zf.open(nombre, "w") as f:
+                    f.write(inicio.encode("utf-8"))
+                    for k, valores in enumerate(lista_valores):
+                        if k:
+                            f.write(SALTO_DE_PAGINA.encode("utf-8"))
+                        f.write(_rellenar(cuerpo, valores).encode("utf-8"))
+                    f.write(fin.encode("utf-8"))
+
+
+def compilar_plantilla(datos):
+    """Compila un .docx (bytes), normalmente la salida de normalizar_word."""
+    doc = Document(io.BytesIO(datos))
+    # Cada tag queda entero en el w:t donde empieza, también dentro de hipervínculos,
+    # controles de contenido y marcas de revisión; tabulaciones y saltos no se tocan
+    normalizar_word(doc)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    entradas = []
+    segmentos = {}
+    with zipfile.ZipFile(buffer) as zf:
+        for nombre in zf.namelist():
+            contenido = zf.read(nombre)
+            entradas.append((nombre, contenido))
+            if PARTES_CON_TAGS.search(nombre):
+                texto = contenido.decode("utf-8")
+                if "{{" in texto:
+                    segmentos[nombre] = _segmentos(texto)
+                if nombre == DOCUMENTO:
+                    xml = texto
+
+    # El cuerpo va de <w:body> a la última <w:sectPr> (propiedades de sección del documento)
+    apertura = xml.index(">", xml.index("<w:body")) + 1
+    cierre = xml.rfind("<w:sectPr")
+    if cierre < apertura:
+        cierre = xml.rindex("</w:body>")
+    cuerpo = (xml[:apertura], _segmentos(xml[apertura:cierre]), xml[cierre:])
+    return PlantillaWord(entradas, segmentos, cuerpo)
+
+
+# ---------------------------------------------------------
+# FILAS DEL EXCEL
+# ---------------------------------------------------------
+def leer_filas(datos):
+    """(cabeceras, filas) del Excel limpio; las celdas vacías quedan como ""."""
+    ws = abrir_hoja(datos)
+    try:
+        filas = ws.iter_rows(values_only=True)
+        cabeceras = [str(c) if c is not None else "" for c in next(filas, ())]
+        return cabeceras, [["" if v is None else str(v) for v in fila] for fila in filas]
+    finally:
+        ws.parent.close()
+
+
+def valores_por_fila(cabeceras, filas):
+    """{tag: valor} de cada fila; con cabeceras repetidas vale la primera."""
+    columnas = {}
+    for i, cabecera in enumerate(cabeceras):
+        columnas.setdefault(cabecera, i)
+    return [{tag: fila[i] for tag, i in columnas.items() if i < len(fila)} for fila in filas]
+
+
+def nombres_documentos(lista_valores, columna=None):
+    """Nombre de archivo de cada documento: el valor de `columna` o el número de fila."""
+    ancho = len(str(len(lista_valores)))
+    nombres = []
+    usados = set()
+    for k, valores in enumerate(lista_valores, start=1):
+        base = re.sub(r'[\\/:*?"<>|\s]+', "_", valores.get(columna, "")).strip("._") if columna else ""
+        base = base or str(k).zfill(ancho)
+        nombre = base
+        repeticion = 1
+        while nombre in usados:
+            repeticion += 1
+            nombre = f"{base}_{repeticion}"
+        usados.add(nombre)
+        nombres.append(nombre + ".docx")
+    return nombres
+
+
+# ---------------------------------------------------------
+# GENERACIÓN (serie o en paralelo)
+# ---------------------------------------------------------
+_PLANTILLA = None
+
+
+def _iniciar_proceso(plantilla):
+    # La plantilla se envía una vez por proceso, no con cada tarea
+    global _PLANTILLA
+    _PLANTILLA = plantilla
+
+
+def _renderizar_bloque(bloque):
+    return [_PLANTILLA.renderizar(valores) for valores in bloque]
+
+
+def renderizar_documentos(plantilla, lista_valores, workers=None):
+    """Genera los bytes de cada .docx en orden; con workers > 1 se reparten por bloques.
+
+    Como mucho hay 2 bloques por proceso en curso, así la memoria no crece con
+    la cantidad de filas. Si el pool no está disponible se sigue en serie.
+    """
+    if workers is None:
+        workers = workers_por_defecto()
+    bloques = [lista_valores[i:i + FILAS_POR_TAREA] for i in range(0, len(lista_valores), FILAS_POR_TAREA)]
+    hechos = 0
+    if workers > 1 and len(bloques) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_procesos(), initializer=_iniciar_proceso, initargs=(plantilla,)) as pool:
+                en_curso = deque()
+                siguiente = 0
+                try:
+                    while hechos < len(bloques):
+                        while siguiente < len(bloques) and len(en_curso) < 2 * workers:
+                            en_curso.append(pool.submit(_renderizar_bloque, bloques[siguiente]))
+                            siguiente += 1
+                        documentos = en_curso.popleft().result()
+                        hechos += 1
+                        yield from documentos
+                finally:
+                    # Si se corta a mitad (cancelación) no se renderiza lo que quedó en cola
+                    pool.shutdown(wait=True, cancel_futures=True)
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            pass
+    for bloque in bloques[hechos:]:
+        for valores in bloque:
+            yield plantilla.renderizar(valores)
+
+
+def generar_zip(plantilla, cabeceras, filas, destino, workers=None, columna_nombre=None, on_progress=None):
+    """Escribe en `destino` (ruta o buffer) un ZIP con un .docx por fila; devuelve cuántos."""
+    lista_valores = valores_por_fila(cabeceras, filas)
+    nombres = nombres_documentos(lista_valores, columna_nombre)
+    # Los .docx ya están comprimidos: se guardan sin volver a comprimir
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf:
+        documentos = renderizar_documentos(plantilla, lista_valores, workers)
+        for k, (nombre, docx) in enumerate(zip(nombres, documentos), start=1):
+            zf.writestr(nombre, docx)
+            if on_progress:
+                on_progress(nombre, k, len(nombres))
+    return len(nombres)
+
+
+def generar_documento_unico(plantilla, cabeceras, filas, destino):
+    """Escribe en `destino` un solo .docx con todas las filas; devuelve cuántas."""
+    lista_valores = valores_por_fila(cabeceras, filas)
+    plantilla.combinar(lista_valores, destino)
+    return len(lista_valores)
@@ -0,0 +1,136 @@
+"""Lotes desde un ZIP o una carpeta del servidor, en lugar de subir archivo por archivo.
+
+Lote lista los archivos sin leerlos. Los miembros del ZIP se descomprimen de a
+uno (a disco, o por bloques mientras se leen), así el lote nunca está entero en
+memoria. Un miembro dañado (CRC incorrecto, truncado, cifrado o con un método
+de compresión no soportado) o un archivo que el lector no puede abrir se
+informa en la lista de errores y el resto del lote sigue.
+"""
+import os
+import shutil
+import zipfile
+import zlib
+
+# Lo que puede lanzar un miembro del ZIP al descomprimirse (RuntimeError: cifrado)
+ERRORES_ZIP = (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError)
+
+TAMANO_COPIA = 1024 * 1024
+
+
+def _elegible(nombre, extensiones):
+    # Se ignoran carpetas, ocultos y la basura de macOS (__MACOSX/, ._archivo)
+    base = nombre.rsplit("/", 1)[-1]
+    return bool(base) and not base.startswith(".") and "__MACOSX/" not in nombre and base.lower().endswith(extensiones)
+
+
+def resolver_carpeta(ruta, raiz):
+    """Ruta real de `ruta` (absoluta o relativa a `raiz`); ValueError si sale de `raiz` o no existe."""
+    raiz = os.path.realpath(raiz)
+    carpeta = os.path.realpath(os.path.join(raiz, ruta))
+    if os.path.commonpath([raiz, carpeta]) != raiz:
+        raise ValueError(f"La carpeta debe estar dentro de {raiz}")
+    if not os.path.isdir(carpeta):
+        raise ValueError(f"No existe la carpeta {carpeta}")
+    return carpeta
+
+
+class Lote:
+    """Archivos con `extensiones` de un ZIP (ruta o archivo abierto) o de una carpeta (ruta), en orden alfabético."""
+
+    def __init__(self, fuente, extensiones):
+        self.extensiones = tuple(e.lower() for e in extensiones)
+        self._zip = None
+        if isinstance(fuente, (str, os.PathLike)) and os.path.isdir(fuente):
+            self._miembros = []
+            for raiz, carpetas, nombres in os.walk(fuente):
+                carpetas.sort()
+                for nombre in sorted(nombres):
+                    ruta = os.path.join(raiz, nombre)
+                    relativo = os.path.relpath(ruta, fuente).replace(os.sep, "/")
+                    if _elegible(relativo, self.extensiones):
+                        self._miembros.append((relativo, ruta, os.path.getsize(ruta)))
+        else:
+            # BadZipFile si la fuente no es un ZIP: ahí no hay lote que procesar
+            self._zip = zipfile.ZipFile(fuente)
+            infos = sorted(
+                (info for info in self._zip.infolist() if not info.is_dir() and _elegible(info.filename, self.extensiones)),
+                key=lambda info: info.filename,
+            )
+            self._miembros = [(info.filename, info, info.file_size) for info in infos]
+
+    def __len__(self):
+        return len(self._miembros)
+
+    @property
+    def nombres(self):
+        return [nombre for nombre, _, _ in self._miembros]
+
+    def tamano(self, i):
+        """Tamaño en bytes del archivo `i` (descomprimido)."""
+        return self._miembros[i][2]
+
+    def abrir(self, i):
+        """El archivo `i` abierto en binario; del ZIP se descomprime mientras se lee (puede lanzar ERRORES_ZIP)."""
+        _, origen, _ = self._miembros[i]
+        return self._zip.open(origen) if self._zip is not None else open(origen, "rb")
+
+    def extraer(self, carpeta, validar=None, on_progress=None):
+        """Deja cada archivo en disco y lo valida; devuelve (archivos, errores).
+
+        `archivos` es [(nombre, ruta)] de los que se pueden procesar y `errores`
+        [(nombre, motivo)] de los que no. Los miembros del ZIP se descomprimen de
+        a uno en `carpeta`; los de una carpeta se usan donde están. `validar(ruta)`
+        abre el archivo con el lector de la herramienta: si falla, se descarta.
+        """
+        archivos, errores = [], []
+        for i, (nombre, origen, _) in enumerate(self._miembros):
+            if on_progress:
+                on_progress(f"Preparando {nombre}", i, len(self))
+            if self._zip is None:
+                ruta = origen
+            else:
+                # Nombre plano y único: los del ZIP pueden repetirse en subcarpetas
+                ruta = os.path.join(carpeta, f"{i:05d}{os.path.splitext(nombre)[1].lower()}")
+                try:
+                    with self._zip.open(origen) as entrada, open(ruta, "wb") as salida:
+                        shutil.copyfileobj(entrada, salida, TAMANO_COPIA)
+                except ERRORES_ZIP as e:
+                    errores.append((nombre, f"no se pudo descomprimir: {e}"))
+                    _borrar(ruta)
+                    continue
+            motivo = _validar(ruta, validar)
+            if motivo:
+                errores.append((nombre, motivo))
+                if self._zip is not None:
+                    _borrar(ruta)
+                continue
+            archivos.append((nombre, ruta))
+        return archivos, errores
+
+    def cerrar(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+
+
+def _validar(ruta, validar):
+    if validar is None:
+        return None
+    try:
+        validar(ruta)
+    except Exception as e:
+        # Cada lector lanza sus propias excepciones: cualquiera cuenta como archivo dañado
+        return f"no se puede abrir: {str(e) or type(e).__name__}"
+    return None
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
@@ -0,0 +1,194 @@
+"""Filtrado de líneas de TXT por prefijo, en streaming sobre bytes.
+
+Los archivos se leen por bloques; solo se decodifican las líneas que empiezan
+con algún prefijo, así la memoria no depende del tamaño del archivo.
+"""
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from suite_operativa.trabajos import contexto_procesos
+
+PREFIJOS = ('121', '101', '301', '203', '260')
+
+TAMANO_BLOQUE = 8 * 1024 * 1024
+# Líneas por lote al releer los resultados de un proceso
+LINEAS_POR_LOTE = 50_000
+
+# \r que no forma parte de un \r\n (saltos de línea al estilo Mac antiguo)
+_CR_SUELTO = re.compile(rb"\r(?!\n)")
+
+
+class FiltroPrefijos:
+    """Prefijos preparados una sola vez para comparar contra líneas en bytes.
+
+    Si todos tienen el mismo largo (el caso habitual) basta con buscar el
+    inicio de la línea en un conjunto; si no, se usa startswith con la tupla.
+    """
+
+    def __init__(self, prefijos=PREFIJOS):
+        self.prefijos = tuple(p.encode("utf-8") for p in prefijos)
+        largos = {len(p) for p in self.prefijos}
+        self._largo = largos.pop() if len(largos) == 1 else None
+        self._conjunto = frozenset(self.prefijos)
+
+    def filtrar(self, lineas):
+        if not self.prefijos:
+            return []
+        if self._largo is not None:
+            largo, conjunto = self._largo, self._conjunto
+            return [linea for linea in lineas if linea[:largo] in conjunto]
+        prefijos = self.prefijos
+        return [linea for linea in lineas if linea.startswith(prefijos)]
+
+
+def _decodificar(lineas):
+    if not lineas:
+        return []
+    return [linea.strip() for linea in b"\n".join(lineas).decode("utf-8", errors="ignore").split("\n")]
+
+
+def iterar_bloques(archivo, prefijos=PREFIJOS, tamano_bloque=TAMANO_BLOQUE):
+    """Genera, por cada bloque leído de `archivo` (binario), la lista de líneas que coinciden.
+
+    Los saltos de línea pueden ser \\n, \\r\\n o \\r. `prefijos` puede ser un
+    FiltroPrefijos ya armado.
+    """
+    filtro = prefijos if isinstance(prefijos, FiltroPrefijos) else FiltroPrefijos(prefijos)
+    resto = b""
+    while True:
+        bloque = archivo.read(tamano_bloque)
+        if not bloque:
+            break
+        while bloque.endswith(b"\r"):
+            # Un \r\n no debe quedar partido entre dos bloques
+            siguiente = archivo.read(1)
+            if not siguiente:
+                break
+            bloque += siguiente
+        bloque = resto + bloque
+        # Con \r\n basta partir por \n: el \r final se quita al decodificar
+        if _CR_SUELTO.search(bloque):
+            bloque = bloque.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        lineas = bloque.split(b"\n")
+        # La última puede estar cortada: se completa con el bloque siguiente
+        resto = lineas.pop()
+        coincidentes = _decodificar(filtro.filtrar(lineas))
+        if coincidentes:
+            yield coincidentes
+    coincidentes = _decodificar(filtro.filtrar([resto])) if resto else []
+    if coincidentes:
+        yield coincidentes
+
+
+# ---------------------------------------------------------
+# VARIOS ARCHIVOS (serie o en paralelo)
+# ---------------------------------------------------------
+def _motivo(error):
+    return f"no se puede leer: {error}"
+
+
+def _filtrar_a_temporal(ruta, prefijos):
+    """Filtra `ruta` y deja las líneas en un temporal; devuelve (temporal, None) o (None, motivo)."""
+    fd, temporal = tempfile.mkstemp(prefix="filtrado_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as salida, open(ruta, "rb") as f:
+            for lineas in iterar_bloques(f, prefijos):
+                salida.write("\n".join(lineas) + "\n")
+    except OSError as e:
+        # Un archivo ilegible no corta el pool: se informa y se sigue con el resto
+        os.remove(temporal)
+        return None, _motivo(e)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return temporal, None
+
+
+def _leer_temporal(temporal):
+    try:
+        with open(temporal, encoding="utf-8", newline="\n") as f:
+            lote = []
+            for linea in f:
+                lote.append(linea[:-1])
+                if len(lote) >= LINEAS_POR_LOTE:
+                    yield lote
+                    lote = []
+            if lote:
+                yield lote
+    finally:
+        os.remove(temporal)
+
+
+def _temporales_en_paralelo(rutas, prefijos, workers):
+    """Genera, en orden, (temporal, motivo) de cada archivo filtrado en el pool."""
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_procesos()) as pool:
+        futuros = [pool.submit(_filtrar_a_temporal, ruta, tuple(prefijos)) for ruta in rutas]
+        entregados = 0
+        try:
+            for futuro in futuros:
+                yield futuro.result()
+                entregados += 1
+        finally:
+            # Si se corta antes de terminar, se borran los temporales no entregados
+            pool.shutdown(wait=True, cancel_futures=True)
+            for futuro in futuros[entregados:]:
+                if futuro.done() and not futuro.cancelled() and futuro.exception() is None and futuro.result()[0]:
+                    try:
+                        os.remove(futuro.result()[0])
+                    except OSError:
+                        pass
+
+
+def filtrar_archivos(archivos, prefijos=PREFIJOS, workers=1, on_progress=None, errores=None):
+    """Genera (nombre, líneas) de cada (nombre, ruta) en disco, en orden y por lotes.
+
+    Con workers > 1 cada proceso filtra un archivo entero y escribe lo que
+    encuentra en un temporal, que luego se relee por lotes: la memoria queda
+    acotada aunque haya muchas coincidencias. Si el pool no está disponible se
+    sigue en serie con los archivos que falten. Con `errores` (una lista) los
+    archivos que no se pueden leer se agregan como (nombre, motivo) y el lote
+    sigue; sin ella el error corta el lote.
+    """
+    archivos = list(archivos)
+    hechos = 0
+
+    def terminado(nombre, motivo=None):
+        nonlocal hechos
+        hechos += 1
+        if motivo is not None:
+            if errores is None:
+                raise OSError(f"{nombre}: {motivo}")
+            errores.append((nombre, motivo))
+        if on_progress:
+            on_progress(nombre, hechos, len(archivos))
+
+    if workers > 1 and len(archivos) > 1:
+        temporales = _temporales_en_paralelo([ruta for _, ruta in archivos], prefijos, workers)
+        try:
+            while hechos < len(archivos):
+                try:
+                    temporal, motivo = next(temporales)
+                except (BrokenProcessPool, OSError, NotImplementedError):
+                    break
+                nombre = archivos[hechos][0]
+                if temporal is not None:
+                    for lineas in _leer_temporal(temporal):
+                        yield nombre, lineas
+                terminado(nombre, motivo)
+        finally:
+            temporales.close()
+    filtro = FiltroPrefijos(prefijos)
+    for nombre, ruta in archivos[hechos:]:
+        motivo = None
+        try:
+            with open(ruta, "rb") as f:
+                for lineas in iterar_bloques(f, filtro):
+                    yield nombre, lineas
+        except OSError as e:
+            if errores is None:
+                raise
+            motivo = _motivo(e)
+        terminado(nombre, motivo)
@@ -0,0 +1,270 @@
+"""Índice persistente de las pólizas extraídas por POLIDATA (SQLite local).
+
+Guarda los PDFs ya procesados (por hash de contenido) y las filas de cada
+póliza en cada PDF, con índices para buscar por póliza, cliente, placa y
+vencimiento. Una póliza puede venir en varios PDFs (renovaciones, endosos): las
+filas de cada uno se conservan. Cada póliza nueva o con filas distintas recibe
+un número de secuencia creciente: la exportación incremental devuelve las que
+cambiaron desde la última marca.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime as dt
+
+# Subirla si cambia la forma de las tablas: un índice de otra versión no se abre
+VERSION_ESQUEMA = 1
+
+# Columnas de COLUMNAS_POLIDATA en la tabla `filas`, en el mismo orden
+CAMPOS = ["poliza", "cliente", "vigencia", "seccion", "item", "placa", "marca", "modelo", "anio", "valor_asegurado", "prima_neta"]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    hash TEXT PRIMARY KEY,
+    nombre TEXT,
+    indexado TEXT,
+    filas INTEGER
+);
+CREATE TABLE IF NOT EXISTS polizas (
+    clave TEXT,
+    hash TEXT,
+    poliza TEXT,
+    huella TEXT,
+    secuencia INTEGER,
+    PRIMARY KEY (clave, hash)
+);
+CREATE TABLE IF NOT EXISTS filas (
+    clave TEXT,
+    hash TEXT,
+    poliza TEXT COLLATE NOCASE,
+    cliente TEXT COLLATE NOCASE,
+    vigencia TEXT,
+    vence TEXT,
+    seccion TEXT,
+    item TEXT,
+    placa TEXT COLLATE NOCASE,
+    marca TEXT,
+    modelo TEXT,
+    anio TEXT,
+    valor_asegurado REAL,
+    prima_neta REAL
+);
+CREATE TABLE IF NOT EXISTS marcas (
+    nombre TEXT PRIMARY KEY,
+    secuencia INTEGER
+);
+CREATE INDEX IF NOT EXISTS filas_clave ON filas(clave, hash);
+CREATE INDEX IF NOT EXISTS filas_poliza ON filas(poliza);
+CREATE INDEX IF NOT EXISTS filas_cliente ON filas(cliente);
+CREATE INDEX IF NOT EXISTS filas_placa ON filas(placa);
+CREATE INDEX IF NOT EXISTS filas_vence ON filas(vence);
+CREATE INDEX IF NOT EXISTS polizas_secuencia ON polizas(secuencia);
+"""
+
+VIGENCIA = re.compile(r"\d{2}/\d{2}/\d{4} - (\d{2})/(\d{2})/(\d{4})")
+
+
+def ruta_por_defecto():
+    return os.environ.get("SUITE_INDICE_DB") or os.path.join(os.path.expanduser("~"), ".suite_operativa", "polizas.sqlite")
+
+
+def vencimiento(vigencia):
+    """Fin de la vigencia 'dd/mm/aaaa - dd/mm/aaaa' en ISO (aaaa-mm-dd); None si no tiene ese formato."""
+    match = VIGENCIA.match(vigencia or "")
+    return f"{match.group(3)}-{match.group(2)}-{match.group(1)}" if match else None
+
+
+def _clave(poliza, hash_archivo):
+    # Las filas sin número de póliza no se mezclan entre archivos
+    return poliza if poliza != "SIN_POLIZA" else f"SIN_POLIZA:{hash_archivo[:16]}"
+
+
+class IndicePolizas:
+    """Índice en el archivo SQLite `ruta` (se crea si no existe).
+
+    Cada operación abre su propia conexión, así se puede usar desde varios
+    hilos y sesiones de Streamlit a la vez.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or ruta_por_defecto()
+        carpeta = os.path.dirname(os.path.abspath(self.ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        with self._conectar() as conexion:
+            version = conexion.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, VERSION_ESQUEMA):
+                raise ValueError(f"El índice {self.ruta} es de otra versión ({version}); bórrelo para reconstruirlo")
+            conexion.executescript(ESQUEMA)
+            conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        # WAL: las búsquedas no esperan a que termine una escritura
+        conexion.execute("PRAGMA journal_mode=WAL")
+        return _Conexion(conexion)
+
+    # -----------------------------------------------------
+    # ARCHIVOS
+    # -----------------------------------------------------
+    def indexados(self, hashes):
+        """Los hashes de `hashes` que ya están en el índice."""
+        hashes = list(hashes)
+        conocidos = set()
+        with self._conectar() as conexion:
+            # SQLite limita la cantidad de parámetros por consulta
+            for i in range(0, len(hashes), 500):
+                parte = hashes[i:i + 500]
+                consulta = f"SELECT hash FROM archivos WHERE hash IN ({', '.join('?' * len(parte))})"
+                conocidos.update(h for (h,) in conexion.execute(consulta, parte))
+        return conocidos
+
+    def agregar(self, nombre, hash_archivo, filas):
+        """Indexa las filas de un PDF; devuelve las claves de póliza nuevas o que cambiaron.
+
+        Solo se reemplazan las filas que este mismo PDF había dejado antes; las
+        de la misma póliza en otros PDFs se conservan. Una póliza que ya estaba
+        con exactamente las mismas filas (el mismo PDF con otro nombre, o
+        reimpreso) no cambia ni vuelve a exportarse.
+        """
+        grupos = {}
+        for fila in filas:
+            grupos.setdefault(_clave(fila[0], hash_archivo), []).append(list(fila))
+
+        cambiadas = []
+        with self._conectar() as conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?)",
+                (hash_archivo, nombre, dt.now().isoformat(timespec="seconds"), len(filas)),
+            )
+            secuencia = conexion.execute("SELECT COALESCE(MAX(secuencia), 0) + 1 FROM polizas").fetchone()[0]
+            for clave, filas_poliza in grupos.items():
+                huella = _huella(filas_poliza)
+                igual = conexion.execute("SELECT 1 FROM polizas WHERE clave = ? AND huella = ?", (clave, huella)).fetchone()
+                if igual is not None:
+                    continue
+                conexion.execute("DELETE FROM filas WHERE clave = ? AND hash = ?", (clave, hash_archivo))
+                conexion.executemany(
+                    f"INSERT INTO filas (clave, hash, vence, {', '.join(CAMPOS)}) VALUES (?, ?, ?, {', '.join('?' * len(CAMPOS))})",
+                    [(clave, hash_archivo, vencimiento(fila[2]), *fila) for fila in filas_poliza],
+                )
+                conexion.execute(
+                    "INSERT OR REPLACE INTO polizas VALUES (?, ?, ?, ?, ?)",
+                    (clave, hash_archivo, filas_poliza[0][0], huella, secuencia),
+                )
+                cambiadas.append(clave)
+        return cambiadas
+
+    # -----------------------------------------------------
+    # BÚSQUEDA
+    # -----------------------------------------------------
+    def buscar(self, poliza="", cliente="", placa="", vence_desde=None, vence_hasta=None, limite=1000):
+        """(filas, total) de las que cumplen todos los filtros dados.
+
+        Póliza, cliente y placa se buscan por prefijo sin distinguir mayúsculas
+        (usan los índices; % sirve de comodín). El vencimiento es un rango de
+        fechas ISO o date. Las filas vienen en el orden de COLUMNAS_POLIDATA.
+        """
+        condiciones, parametros = [], []
+        for campo, valor in (("poliza", poliza), ("cliente", cliente), ("placa", placa)):
+            if valor and valor.strip():
+                condiciones.append(f"{campo} LIKE ?")
+                parametros.append(valor.strip() + "%")
+        if vence_desde:
+            condiciones.append("vence >= ?")
+            parametros.append(str(vence_desde))
+        if vence_hasta:
+            condiciones.append("vence <= ?")
+            parametros.append(str(vence_hasta))
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with self._conectar() as conexion:
+            total = conexion.execute(f"SELECT COUNT(*) FROM filas {donde}", parametros).fetchone()[0]
+            filas = conexion.execute(
+                f"SELECT {', '.join(CAMPOS)} FROM filas {donde} ORDER BY rowid LIMIT ?", parametros + [limite],
+            ).fetchall()
+        return filas, total
+
+    def resumen(self):
+        """Cantidad de archivos, pólizas (distintas) y filas indexadas."""
+        with self._conectar() as conexion:
+            return {
+                nombre: conexion.execute(f"SELECT {conteo} FROM {tabla}").fetchone()[0]
+                for nombre, conteo, tabla in (
+                    ("archivos", "COUNT(*)", "archivos"),
+                    ("polizas", "COUNT(DISTINCT clave)", "polizas"),
+                    ("filas", "COUNT(*)", "filas"),
+                )
+            }
+
+    # -----------------------------------------------------
+    # EXPORTACIÓN INCREMENTAL
+    # -----------------------------------------------------
+    def secuencia(self):
+        with self._conectar() as conexion:
+            return conexion.execute("SELECT COALESCE(MAX(secuencia), 0) FROM polizas").fetchone()[0]
+
+    def marca(self, nombre):
+        """Secuencia hasta la que ya se exportó con la marca `nombre` (0 si nunca)."""
+        with self._conectar() as conexion:
+            fila = conexion.execute("SELECT secuencia FROM marcas WHERE nombre = ?", (nombre,)).fetchone()
+        return fila[0] if fila else 0
+
+    def marcar(self, nombre, secuencia):
+        with self._conectar() as conexion:
+            conexion.execute("INSERT OR REPLACE INTO marcas VALUES (?, ?)", (nombre, secuencia))
+
+    def cambiadas(self, secuencia, hasta=None):
+        """Cuántas pólizas son nuevas o cambiaron en (secuencia, hasta]."""
+        with self._conectar() as conexion:
+            return conexion.execute(
+                "SELECT COUNT(DISTINCT clave) FROM polizas WHERE secuencia > ? AND secuencia <= ?",
+                (secuencia, self.secuencia() if hasta is None else hasta),
+            ).fetchone()[0]
+
+    def filas_desde(self, secuencia, hasta=None, lote=5000):
+        """Lotes con las filas de las pólizas nuevas o cambiadas en (secuencia, hasta]."""
+        with self._conectar() as conexion:
+            cursor = conexion.execute(
+                f"SELECT {', '.join('f.' + c for c in CAMPOS)} FROM polizas p JOIN filas f ON f.clave = p.clave AND f.hash = p.hash "
+                "WHERE p.secuencia > ? AND p.secuencia <= ? ORDER BY p.secuencia, f.rowid",
+                (secuencia, self.secuencia() if hasta is None else hasta),
+            )
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    return
+                yield filas
+
+    def exportar_nuevas(self, escritor, nombre):
+        """Escribe las pólizas nuevas o cambiadas desde la marca `nombre` y la avanza; devuelve cuántas filas."""
+        hasta = self.secuencia()
+        n = 0
+        for filas in self.filas_desde(self.marca(nombre), hasta):
+            escritor.agregar(filas)
+            n += len(filas)
+        self.marcar(nombre, hasta)
+        return n
+
+
+def _huella(filas):
+    return hashlib.sha256(json.dumps(filas, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class _Conexion:
+    """Conexión que confirma (o deshace) y se cierra al salir del with."""
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def __enter__(self):
+        return self._conexion
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            if tipo is None:
+                self._conexion.commit()
+            else:
+                self._conexion.rollback()
+        finally:
+            self._conexion.close()
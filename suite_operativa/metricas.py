@@ -0,0 +1,165 @@
+"""Tiempos, cantidades y memoria por etapa de cada herramienta.
+
+Cada medición es una fila (etapa, archivo, segundos, unidades, memoria); el
+resumen las agrupa por etapa. Se exporta a JSON, CSV o texto de Prometheus.
+"""
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATOS_METRICAS = (".json", ".csv", ".prom", ".txt")
+COLUMNAS_METRICAS = ["etapa", "archivo", "segundos", "unidades", "unidad", "memoria_mb", "memoria_delta_mb"]
+
+
+def memoria_mb():
+    """RSS actual del proceso en MB (el pico si no se puede leer el actual); None si no hay forma."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+class Metricas:
+    """Mediciones de una ejecución de `herramienta`.
+
+    Las etapas que corren en otros procesos se agregan con `registrar`, con el
+    tiempo que midió el proceso (la suma puede superar al tiempo total).
+    """
+
+    def __init__(self, herramienta):
+        self.herramienta = herramienta
+        self.mediciones = []
+        self.perfil = None
+
+    def registrar(self, etapa, segundos, unidades=0, unidad="", archivo="", memoria=None, delta=None):
+        self.mediciones.append({
+            "etapa": etapa,
+            "archivo": archivo,
+            "segundos": segundos,
+            "unidades": unidades,
+            "unidad": unidad,
+            "memoria_mb": memoria,
+            "memoria_delta_mb": delta,
+        })
+
+    @contextmanager
+    def etapa(self, nombre, unidades=0, unidad="", archivo=""):
+        """Mide el bloque; la medición se puede completar dentro (p. ej. medicion["unidades"] = n)."""
+        medicion = {"unidades": unidades}
+        antes = memoria_mb()
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        finally:
+            segundos = time.perf_counter() - inicio
+            despues = memoria_mb()
+            delta = None if antes is None or despues is None else despues - antes
+            self.registrar(nombre, segundos, medicion["unidades"], unidad, archivo, despues, delta)
+
+    @contextmanager
+    def perfilar(self, activo=True, lineas=40):
+        """Perfila el bloque con cProfile (solo este proceso) y guarda el informe en `perfil`."""
+        if not activo:
+            yield
+            return
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(lineas)
+            self.perfil = texto.getvalue()
+
+    # -----------------------------------------------------
+    # RESUMEN
+    # -----------------------------------------------------
+    def resumen(self):
+        """Una fila por etapa, en el orden en que aparecieron."""
+        etapas = {}
+        for m in self.mediciones:
+            fila = etapas.setdefault(m["etapa"], {
+                "etapa": m["etapa"], "mediciones": 0, "segundos": 0.0,
+                "unidades": 0, "unidad": m["unidad"], "memoria_pico_mb": None,
+            })
+            fila["mediciones"] += 1
+            fila["segundos"] += m["segundos"]
+            fila["unidades"] += m["unidades"] or 0
+            if m["memoria_mb"] is not None:
+                fila["memoria_pico_mb"] = max(fila["memoria_pico_mb"] or 0, m["memoria_mb"])
+        for fila in etapas.values():
+            fila["por_segundo"] = fila["unidades"] / fila["segundos"] if fila["segundos"] and fila["unidades"] else None
+        return list(etapas.values())
+
+    # -----------------------------------------------------
+    # EXPORTACIÓN
+    # -----------------------------------------------------
+    def a_json(self):
+        return json.dumps({
+            "herramienta": self.herramienta,
+            "resumen": self.resumen(),
+            "mediciones": self.mediciones,
+        }, ensure_ascii=False, indent=2)
+
+    def a_csv(self):
+        salida = io.StringIO()
+        escritor = csv.DictWriter(salida, ["herramienta"] + COLUMNAS_METRICAS, lineterminator="\n")
+        escritor.writeheader()
+        for m in self.mediciones:
+            escritor.writerow({"herramienta": self.herramienta, **m})
+        return salida.getvalue()
+
+    def a_prometheus(self):
+        """Formato de texto de Prometheus (para un textfile collector o un push)."""
+        series = [
+            ("suite_etapa_segundos", "Segundos acumulados por etapa", "segundos"),
+            ("suite_etapa_unidades", "Unidades procesadas por etapa", "unidades"),
+            ("suite_etapa_mediciones", "Mediciones (archivos o bloques) por etapa", "mediciones"),
+            ("suite_etapa_memoria_mb", "RSS máximo observado al terminar la etapa", "memoria_pico_mb"),
+        ]
+        resumen = self.resumen()
+        lineas = []
+        for nombre, ayuda, campo in series:
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+            for fila in resumen:
+                if fila[campo] is None:
+                    continue
+                etiquetas = f'herramienta="{_etiqueta(self.herramienta)}",etapa="{_etiqueta(fila["etapa"])}"'
+                lineas.append(f"{nombre}{{{etiquetas}}} {fila[campo]:g}")
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, destino):
+        """Escribe las métricas en `destino` según su extensión: .json, .csv o .prom/.txt."""
+        extension = os.path.splitext(destino)[1].lower()
+        if extension not in FORMATOS_METRICAS:
+            raise ValueError(f"Formato de métricas no soportado: {extension or destino} (use .json, .csv o .prom)")
+        if extension == ".json":
+            texto = self.a_json()
+        elif extension == ".csv":
+            texto = self.a_csv()
+        else:
+            texto = self.a_prometheus()
+        with open(destino, "w", encoding="utf-8", newline="") as f:
+            f.write(texto)
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,169 @@
+"""Lectura de montos escritos como texto: "S/ 1.234,56", "1,234.56", "1 234,56".
+
+Un solo lector para todas las herramientas. Las columnas se convierten en
+bloque con pyarrow.compute (sin un bucle de Python por celda; sin pyarrow,
+celda por celda) y los valores sueltos con `monto`, con la misma expresión:
+
+- se ignoran los espacios (también NBSP y el espacio fino) y el símbolo S/ (o S/.);
+- los miles se agrupan de a tres con punto o coma y el otro signo es el decimal;
+- sin agrupación de miles, el punto o la coma final es el decimal. Un separador
+  seguido de exactamente tres dígitos agrupa miles (1.234 y 1,234 son 1234),
+  salvo que la parte entera sea 0 (0.125).
+"""
+import importlib.util
+import re
+
+# Clases explícitas, iguales para re (celda por celda) y RE2 (pyarrow): en re, \d y
+# \s aceptan también dígitos y espacios Unicode que RE2 no acepta
+_DIGITO = "[0-9]"
+_ESPACIO = "[ \t\r\n\u00a0\u202f]"
+# Espacios (también NBSP y el espacio fino) y el símbolo de soles
+RUIDO = re.compile(f"{_ESPACIO}+|[Ss]/\\.?")
+# Parte entera agrupada de a tres: con punto (1.234.567) o con coma (1,234,567)
+_MILES_PUNTO = rf"[1-9]{_DIGITO}{{0,2}}(?:\.{_DIGITO}{{3}})+"
+_MILES_COMA = rf"[1-9]{_DIGITO}{{0,2}}(?:,{_DIGITO}{{3}})+"
+# Signo, parte entera y decimales; una alternativa por convención, en este orden de prioridad
+MONTO = re.compile(
+    rf"^(?P<signo>-?)(?:"
+    rf"(?P<entero_es>{_MILES_PUNTO})(?:,(?P<decimal_es>{_DIGITO}+))?"
+    rf"|(?P<entero_us>{_MILES_COMA})(?:\.(?P<decimal_us>{_DIGITO}+))?"
+    rf"|(?P<entero>{_DIGITO}+)(?:[.,](?P<decimal>{_DIGITO}+))?"
+    rf")$"
+)
+# Montos válidos cuya coma es decimal: agrupados con punto, o sin agrupar con coma
+# (salvo que la coma agrupe miles: 1,234)
+_COMA_DECIMAL = rf"^-?(?:{_MILES_PUNTO}(?:,{_DIGITO}+)?|{_DIGITO}+,{_DIGITO}+)$"
+_AGRUPADO_COMA = rf"^-?{_MILES_COMA}(?:\.{_DIGITO}+)?$"
+
+
+def _limpiar(texto):
+    return RUIDO.sub("", texto)
+
+
+def monto(valor, centavos=False):
+    """Un valor suelto como float (o centavos exactos, int); None si está vacío o no es un monto."""
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        if valor != valor:
+            return None
+        return int(round(valor * 100)) if centavos else float(valor)
+    match = MONTO.match(_limpiar(str(valor)))
+    if not match:
+        return None
+    grupos = match.groupdict()
+    entero = (grupos["entero_es"] or grupos["entero_us"] or grupos["entero"]).replace(".", "").replace(",", "")
+    decimal = grupos["decimal_es"] or grupos["decimal_us"] or grupos["decimal"] or ""
+    if centavos:
+        # Redondeo a favor del centavo siguiente desde 0.005, sin pasar por float
+        total = int(entero) * 100 + int((decimal + "00")[:2]) + (len(decimal) > 2 and decimal[2] >= "5")
+        return -total if grupos["signo"] else total
+    return float(f"{grupos['signo']}{entero}.{decimal or '0'}")
+
+
+# ---------------------------------------------------------
+# COLUMNAS
+# ---------------------------------------------------------
+def parsear_montos(valores, centavos=False):
+    """Convierte una columna (Series o lista) de montos; devuelve (Series, no_leidas).
+
+    El resultado es float64, o Int64 con centavos exactos si `centavos`; las
+    celdas vacías y las que no son un monto quedan NaN/NA. `no_leidas` cuenta
+    solo estas últimas: celdas con algo escrito que no se pudo leer.
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    tipo = "Int64" if centavos else "float64"
+    if is_numeric_dtype(serie.dtype) and not is_bool_dtype(serie.dtype):
+        return _desde_numeros(serie, centavos), 0
+    con_arrow = importlib.util.find_spec("pyarrow") is not None
+    if con_arrow and serie.dtype == object:
+        # Una columna solo de texto (y vacías) pasa entera a pyarrow sin mirar el tipo de cada celda
+        import pyarrow as pa
+        try:
+            textos = pa.array(serie, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        else:
+            return _desde_textos_arrow(textos, serie.index, centavos)
+
+    # Los números que ya vienen como número no pasan por el texto
+    presentes = serie.notna()
+    if serie.dtype == object:
+        tipos = serie.map(type)
+        es_numero = tipos.isin((int, float, np.int64, np.float64)) & presentes
+        es_texto = tipos.eq(str)
+    else:
+        es_numero = pd.Series(False, index=serie.index)
+        es_texto = presentes
+    # Fechas, booleanos y demás tampoco son montos
+    no_leidas = int((presentes & ~es_numero & ~es_texto).sum())
+
+    resultado = pd.Series(pd.NA if centavos else np.nan, index=serie.index, dtype=tipo)
+    if es_numero.any():
+        resultado[es_numero] = _desde_numeros(serie[es_numero].astype("float64"), centavos)
+    if es_texto.any():
+        textos = serie[es_texto]
+        if con_arrow:
+            import pyarrow as pa
+            convertidos, fallidas = _desde_textos_arrow(pa.array(textos, type=pa.string(), from_pandas=True), textos.index, centavos)
+        else:
+            convertidos = textos.map(lambda valor: monto(valor, centavos))
+            fallidas = int((convertidos.isna() & textos.map(_limpiar).ne("")).sum())
+            convertidos = convertidos.astype(tipo)
+        resultado[es_texto] = convertidos
+        no_leidas += fallidas
+    return resultado, no_leidas
+
+
+def _desde_numeros(numeros, centavos):
+    numeros = numeros.astype("float64")
+    return (numeros * 100).round().astype("Int64") if centavos else numeros
+
+
+def _desde_textos_arrow(textos, indice, centavos):
+    # Toda la columna en C++ (pyarrow.compute, expresiones RE2): solo búsquedas de
+    # patrón y reemplazos literales, que son mucho más rápidos que extraer grupos
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    limpios = pc.replace_substring_regex(textos, RUIDO.pattern, "")
+    validos = pc.match_substring_regex(limpios, MONTO.pattern)
+    coma_decimal = pc.and_(
+        pc.match_substring_regex(limpios, _COMA_DECIMAL), pc.invert(pc.match_substring_regex(limpios, _AGRUPADO_COMA)),
+    )
+    # Todos a "-1234.56": se quitan los separadores de miles y el decimal pasa a punto
+    normales = pc.if_else(
+        coma_decimal,
+        pc.replace_substring(pc.replace_substring(limpios, ".", ""), ",", "."),
+        pc.replace_substring(limpios, ",", ""),
+    )
+    normales = pc.if_else(validos, normales, pa.scalar(None, pa.string()))
+    fallidas = pc.sum(pc.and_(pc.invert(validos), pc.not_equal(limpios, ""))).as_py() or 0
+
+    if not centavos:
+        valores = pc.cast(normales, pa.float64())
+        return pd.Series(valores.to_numpy(zero_copy_only=False), index=indice, dtype="float64"), fallidas
+
+    # Centavos exactos desde el texto, sin pasar por float
+    con_punto = pc.if_else(pc.match_substring(normales, "."), normales, pc.binary_join_element_wise(normales, ".", ""))
+    partes = pc.split_pattern(con_punto, ".", max_splits=1)
+    entero, decimal = pc.list_element(partes, 0), pc.list_element(partes, 1)
+    negativo = pc.starts_with(entero, "-")
+    relleno = pc.binary_join_element_wise(decimal, "000", "")
+    valores = pc.add(
+        pc.add(
+            pc.multiply(pc.cast(pc.replace_substring(entero, "-", ""), pa.int64()), 100),
+            pc.cast(pc.utf8_slice_codeunits(relleno, 0, 2), pa.int64()),
+        ),
+        # Redondeo a favor del centavo siguiente desde 0.005
+        pc.cast(pc.greater_equal(pc.utf8_slice_codeunits(relleno, 2, 3), "5"), pa.int64()),
+    )
+    valores = pc.if_else(negativo, pc.negate(valores), valores)
+    enteros = pc.fill_null(valores, 0).to_numpy(zero_copy_only=False)
+    nulos = pc.is_null(valores).to_numpy(zero_copy_only=False)
+    return pd.Series(pd.arrays.IntegerArray(enteros, nulos), index=indice), fallidas
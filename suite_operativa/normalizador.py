@@ -0,0 +1,316 @@
+import datetime
+import io
+import re
+import unicodedata
+from bisect import bisect_right
+
+import openpyxl
+import pandas as pd
+from docx.oxml.ns import qn
+
+from suite_operativa.montos import monto
+
+COLUMNAS_EXCLUIDAS = [
+    "poliza", "nro_documento", "documento", "id", "ruc", "dni",
+    "nro_asegurados", "asegurados", "vigencia", "plazo", "ano", "periodo",
+    "nro", "ciiu_giro_del_negocio", "vigencia_inicio", "vigencia_termino",
+    "plazo_asegurar", "pisos", "sotanos", "recibo", "aseg", "fecha"
+]
+# Columnas de dinero: su texto se lee con montos.py ("S/ 1.234,56"). Las
+# excluidas tienen prioridad y siguen siendo identificadores.
+COLUMNAS_MONTO = ["prima", "monto", "importe", "capital", "deducible"]
+
+
+def normalizar(texto):
+    if pd.isna(texto):
+        return ""
+    texto = str(texto).strip().lower()
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = texto.encode('ascii', 'ignore').decode('utf-8')
+    texto = re.sub(r"[ .\-\/]+", "_", texto)
+    texto = re.sub(r"[^a-z0-9_]", "", texto)
+    texto = re.sub(r"_+", "_", texto)
+    return texto.strip("_")
+
+
+def _formatear(val, es_identificador):
+    if pd.isna(val) or str(val).strip() == "":
+        return ""
+    if isinstance(val, (datetime.datetime, datetime.date)):
+        return val.strftime("%d/%m/%Y")
+    val_str = str(val).strip()
+    if es_identificador:
+        return _identificador(val_str)
+    try:
+        num = float(val)
+        return f"{num:,.2f}"
+    except ValueError:
+        return val_str.upper()
+
+
+def _identificador(val_str):
+    if val_str.endswith('.0'):
+        val_str = val_str[:-2]
+    if "-" in val_str and len(val_str) >= 10 and val_str[:4].isdigit():
+        try:
+            fecha_corta = val_str.split(" ")[0]
+            partes = fecha_corta.split("-")
+            if len(partes) == 3:
+                return f"{partes[2]}/{partes[1]}/{partes[0]}"
+        except Exception:
+            pass
+    return val_str.upper()
+
+
+def es_identificador(nombre_columna, excluidas=COLUMNAS_EXCLUIDAS):
+    return any(clave in nombre_columna for clave in excluidas)
+
+
+def es_monto(nombre_columna, montos=COLUMNAS_MONTO):
+    return any(clave in nombre_columna for clave in montos)
+
+
+# ---------------------------------------------------------
+# PLAN DE FORMATO: un formateador por columna
+# ---------------------------------------------------------
+# Los tipos que entrega openpyxl (None, str, int, float) van por un camino
+# directo; el resto pasa por _formatear, con el mismo resultado.
+def formato_identificador(val):
+    tipo = type(val)
+    if tipo is str:
+        val_str = val.strip()
+        if not val_str:
+            return ""
+    elif tipo is int:
+        val_str = str(val)
+    elif tipo is float:
+        if val != val:
+            return ""
+        val_str = str(val)
+    elif val is None:
+        return ""
+    else:
+        return _formatear(val, True)
+    return _identificador(val_str)
+
+
+def formato_general(val):
+    tipo = type(val)
+    if tipo is str:
+        val_str = val.strip()
+        if not val_str:
+            return ""
+        try:
+            return f"{float(val):,.2f}"
+        except ValueError:
+            return val_str.upper()
+    if tipo is int or tipo is float:
+        if val != val:
+            return ""
+        return f"{float(val):,.2f}"
+    if val is None:
+        return ""
+    return _formatear(val, False)
+
+
+def formato_monto(val):
+    if type(val) is str:
+        val_str = val.strip()
+        if not val_str:
+            return ""
+        # Acepta "S/ 1.234,56", "1 234.5" y demás formatos de montos.py
+        num = monto(val_str)
+        return f"{num:,.2f}" if num is not None else val_str.upper()
+    return formato_general(val)
+
+
+def plan_formato(cabeceras, excluidas=None):
+    """Formateador de cada columna según su cabecera normalizada, decidido una sola vez.
+
+    Las columnas que contienen alguna clave de `excluidas` (por defecto
+    COLUMNAS_EXCLUIDAS) se tratan como identificadores: sin formato numérico.
+    Las de COLUMNAS_MONTO leen además los montos escritos como texto.
+    """
+    if excluidas is None:
+        claves = COLUMNAS_EXCLUIDAS
+    else:
+        claves = [c for c in (normalizar(e) for e in excluidas) if c]
+    return [
+        formato_identificador if es_identificador(nombre, claves)
+        else formato_monto if es_monto(nombre)
+        else formato_general
+        for nombre in cabeceras
+    ]
+
+
+# ---------------------------------------------------------
+# WORD: tags en una pasada por el XML
+# ---------------------------------------------------------
+# Partes del .docx donde se buscan tags
+PARTES_CON_TAGS = re.compile(r"word/(document|header\d*|footer\d*)\.xml$")
+
+_TAG = re.compile(r"{{(.*?)}}")
+_W_P = qn("w:p")
+_W_T = qn("w:t")
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _parrafo(t):
+    # El w:p más cercano: el w:r puede estar dentro de un hipervínculo, un
+    # control de contenido o una marca de revisión
+    padre = t.getparent()
+    while padre is not None and padre.tag != _W_P:
+        padre = padre.getparent()
+    return padre
+
+
+def _textos_por_parrafo(raiz):
+    """{w:p: [w:t, ...]} de toda la parte en un solo recorrido (tablas anidadas y cuadros de texto incluidos)."""
+    parrafos = {}
+    for t in raiz.iter(_W_T):
+        parrafos.setdefault(_parrafo(t), []).append(t)
+    return parrafos
+
+
+def _normalizar_textos(elementos, tags, modificar):
+    textos = [t.text or "" for t in elementos]
+    completo = "".join(textos)
+    if "{{" not in completo:
+        return
+    coincidencias = list(_TAG.finditer(completo))
+    for m in coincidencias:
+        tags.add(normalizar(m.group(1)))
+    if not modificar or not coincidencias:
+        return
+
+    # Cada tag queda entero (y normalizado) en el w:t donde empieza; el resto
+    # del texto se queda en su w:t, con su formato
+    inicios = []
+    posicion = 0
+    for texto in textos:
+        inicios.append(posicion)
+        posicion += len(texto)
+    nuevos = [[] for _ in textos]
+
+    def repartir(desde, hasta):
+        for k, inicio in enumerate(inicios):
+            fin = inicio + len(textos[k])
+            if fin > desde and inicio < hasta:
+                nuevos[k].append(completo[max(desde, inicio):min(hasta, fin)])
+
+    anterior = 0
+    for m in coincidencias:
+        repartir(anterior, m.start())
+        nuevos[bisect_right(inicios, m.start()) - 1].append("{{" + normalizar(m.group(1)) + "}}")
+        anterior = m.end()
+    repartir(anterior, len(completo))
+
+    for t, texto, nuevo in zip(elementos, textos, nuevos):
+        nuevo = "".join(nuevo)
+        if nuevo != texto:
+            t.text = nuevo
+            if nuevo != nuevo.strip():
+                t.set(_XML_SPACE, "preserve")
+
+
+def _procesar_word(doc, modificar):
+    tags = set()
+    for parte in doc.part.package.iter_parts():
+        if PARTES_CON_TAGS.search(str(parte.partname)):
+            for elementos in _textos_por_parrafo(parte.element).values():
+                _normalizar_textos(elementos, tags, modificar)
+    return tags
+
+
+def normalizar_word(doc):
+    """Normaliza los {{tags}} del documento, cabeceras y pies de página; devuelve los tags normalizados.
+
+    Un solo recorrido del XML de cada parte: encuentra también los tags
+    partidos entre runs y los de tablas anidadas.
+    """
+    return _procesar_word(doc, modificar=True)
+
+
+def extraer_tags_word(doc):
+    """Tags normalizados del documento, sin modificarlo."""
+    return _procesar_word(doc, modificar=False)
+
+
+# ---------------------------------------------------------
+# EXCEL: normalización en streaming
+# ---------------------------------------------------------
+def abrir_hoja(datos):
+    """Hoja activa en modo read-only; hay que cerrar el libro (`hoja.parent.close()`) al terminar."""
+    wb = openpyxl.load_workbook(io.BytesIO(datos), read_only=True)
+    ws = wb.active
+    # Algunos programas escriben un <dimension> desactualizado (p. ej. "A1"): no
+    # se usa, y las filas salen con las celdas que tienen (como hace pandas)
+    ws.reset_dimensions()
+    return ws
+
+
+def filas_normalizadas(ws, excluidas=None):
+    """Genera la cabecera normalizada y luego cada fila conservada, ya formateada.
+
+    Se descartan al vuelo las filas con `nro` vacío o 0, sin cargar la hoja entera.
+    `excluidas` reemplaza a COLUMNAS_EXCLUIDAS (ver plan_formato).
+    """
+    filas = ws.iter_rows(values_only=True)
+    cabecera = next(filas, ())
+    # El ancho lo da la cabecera; las filas más cortas se completan con vacías
+    ancho = len(cabecera)
+
+    columnas_normalizadas = [
+        normalizar(valor) if valor else f"col_{col_idx}"
+        for col_idx, valor in enumerate(cabecera, start=1)
+    ]
+    yield columnas_normalizadas
+
+    idx_nro = columnas_normalizadas.index("nro") if "nro" in columnas_normalizadas else None
+    plan = plan_formato(columnas_normalizadas, excluidas)
+    relleno = (None,) * ancho
+    for fila in filas:
+        if len(fila) < ancho:
+            fila = tuple(fila) + relleno[len(fila):]
+        if idx_nro is not None:
+            valor = str(fila[idx_nro] or "").strip()
+            if valor == "" or valor == "0":
+                continue
+        yield [formato(valor) for formato, valor in zip(plan, fila)]
+
+
+def indices_en_tags(cabeceras, tags):
+    return [i for i, cab in enumerate(cabeceras) if cab in tags]
+
+
+def escribir_filtrado(filas, tags, destino, n_vista=5):
+    """Escribe en un libro write-only solo las columnas cuyo nombre está en `tags`.
+
+    `filas` es la salida de filas_normalizadas. Devuelve (cabeceras, indices,
+    primeras `n_vista` filas filtradas, cantidad de filas de datos).
+    """
+    filas = iter(filas)
+    cabeceras = next(filas)
+    indices = indices_en_tags(cabeceras, tags)
+
+    wb_filtrado = openpyxl.Workbook(write_only=True)
+    ws_filtrado = wb_filtrado.create_sheet()
+    ws_filtrado.append([cabeceras[i] for i in indices])
+    vista = []
+    n_filas = 0
+    for fila in filas:
+        nueva_fila = [fila[i] for i in indices]
+        ws_filtrado.append(nueva_fila)
+        if n_filas < n_vista:
+            vista.append(nueva_fila)
+        n_filas += 1
+    wb_filtrado.save(destino)
+    return cabeceras, indices, vista, n_filas
+
+
+def normalizar_excel(datos, tags, destino, n_vista=5, excluidas=None):
+    ws = abrir_hoja(datos)
+    try:
+        return escribir_filtrado(filas_normalizadas(ws, excluidas), tags, destino, n_vista)
+    finally:
+        ws.parent.close()
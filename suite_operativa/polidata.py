@@ -0,0 +1,427 @@
+import importlib.util
+import io
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from suite_operativa.montos import monto
+from suite_operativa.trabajos import contexto_procesos
+
+COLUMNAS_POLIDATA = [
+    "Póliza", "Cliente", "Vigencia", "Sección", "Ítem", "Placa",
+    "Marca", "Modelo", "Año", "Valor Asegurado", "Prima Neta"
+]
+
+# PDFs con más páginas que esto se reparten por bloques entre los procesos
+PAGINAS_POR_BLOQUE = 16
+
+
+def workers_por_defecto():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+# ---------------------------------------------------------
+# EXTRACCIÓN DE TEXTO
+# ---------------------------------------------------------
+# pdfium (pypdfium2) lee el texto sin análisis de layout; pdfplumber queda como
+# alternativa y referencia. Se importan al abrir el primer PDF.
+MOTORES_PDF = ("pdfium", "pdfplumber")
+
+# pdfium no admite llamadas desde varios hilos a la vez (trabajos de la app)
+_LOCK_PDFIUM = threading.Lock()
+
+
+def pdfium_disponible():
+    # pypdfium2 se instala con pdfplumber (>= 0.10)
+    return importlib.util.find_spec("pypdfium2") is not None
+
+
+def motor_pdf_por_defecto():
+    return "pdfium" if pdfium_disponible() else "pdfplumber"
+
+
+# `datos` puede ser el contenido del PDF o su ruta: con rutas, cada proceso lee
+# el archivo del disco y el lote no tiene que estar entero en memoria
+def _es_ruta(datos):
+    return isinstance(datos, (str, os.PathLike))
+
+
+def _fuente(datos):
+    return datos if _es_ruta(datos) else io.BytesIO(datos)
+
+
+def _contenido(datos):
+    if not _es_ruta(datos):
+        return datos
+    with open(datos, "rb") as f:
+        return f.read()
+
+
+def contar_paginas(datos):
+    if pdfium_disponible():
+        import pypdfium2 as pdfium
+
+        with _LOCK_PDFIUM:
+            pdf = pdfium.PdfDocument(datos)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    import pdfplumber
+
+    with pdfplumber.open(_fuente(datos)) as pdf:
+        return len(pdf.pages)
+
+
+def _paginas_pdfium(datos, inicio=0, fin=None):
+    """[(número, texto)] de las páginas [inicio, fin)."""
+    import pypdfium2 as pdfium
+
+    paginas = []
+    with _LOCK_PDFIUM:
+        pdf = pdfium.PdfDocument(datos)
+        try:
+            for i in range(inicio, len(pdf) if fin is None else min(fin, len(pdf))):
+                pagina = pdf[i]
+                texto_pagina = pagina.get_textpage()
+                paginas.append((i, texto_pagina.get_text_bounded().replace("\r\n", "\n")))
+                texto_pagina.close()
+                pagina.close()
+        finally:
+            pdf.close()
+    return paginas
+
+
+def _paginas_pdfplumber(datos, inicio=0, fin=None, solo=None):
+    """Como _paginas_pdfium; con `solo` se analizan únicamente esas páginas."""
+    import pdfplumber
+
+    paginas = []
+    with pdfplumber.open(_fuente(datos)) as pdf:
+        for i, page in enumerate(pdf.pages[inicio:fin], start=inicio):
+            if solo is None or i in solo:
+                paginas.append((i, page.extract_text() or ""))
+            page.close()
+    return paginas
+
+
+def _extraer(datos, inicio=0, fin=None, motor=None, descartar=True):
+    """(textos, páginas leídas) de las páginas [inicio, fin).
+
+    Con `descartar`, las páginas sin cabecera, secciones ni montos (condiciones
+    generales, anexos) no pasan al parseo. Con pdfplumber y pdfium instalado,
+    pdfium decide antes qué páginas vale la pena analizar.
+    """
+    motor = motor or motor_pdf_por_defecto()
+    if motor == "pdfium":
+        paginas = _paginas_pdfium(datos, inicio, fin)
+        leidas = len(paginas)
+    elif motor == "pdfplumber":
+        solo = None
+        if descartar and pdfium_disponible():
+            previas = _paginas_pdfium(datos, inicio, fin)
+            solo = {i for (i, _), usar in zip(previas, _PARSER.relevantes([texto for _, texto in previas])) if usar}
+            leidas = len(previas)
+            # Ya se eligieron con el texto de pdfium
+            descartar = False
+        paginas = _paginas_pdfplumber(datos, inicio, fin, solo)
+        if solo is None:
+            leidas = len(paginas)
+    else:
+        raise ValueError(f"Motor de PDF desconocido: {motor} (use {' o '.join(MOTORES_PDF)})")
+    if descartar:
+        paginas = [pagina for pagina, usar in zip(paginas, _PARSER.relevantes([texto for _, texto in paginas])) if usar]
+    textos = [texto for _, texto in paginas if texto]
+    return textos, leidas
+
+
+def extraer_textos(datos, inicio=0, fin=None, motor=None, descartar=True):
+    """Texto de las páginas [inicio, fin) del PDF; cada página se extrae una sola vez."""
+    return _extraer(datos, inicio, fin, motor, descartar)[0]
+
+
+def _extraer_con_tiempo(datos, inicio=0, fin=None, motor=None):
+    inicio_reloj = time.perf_counter()
+    textos, leidas = _extraer(datos, inicio, fin, motor)
+    return textos, leidas, time.perf_counter() - inicio_reloj
+
+
+# ---------------------------------------------------------
+# PARSEO DE UNA PÓLIZA
+# ---------------------------------------------------------
+class ParserPolidata:
+    """Parser de pólizas con los patrones compilados una sola vez.
+
+    Recorre el texto en una pasada: salta de sección en sección y de línea en
+    línea por índices, sin copiar el contenido de cada sección.
+    """
+
+    POLIZA = re.compile(r"(?:P\s*[ÓO]?\s*L\s*I\s*Z\s*A|P[ÓO]LIZA)\s*[:\-]?\s*(\d{4,})", re.IGNORECASE)
+    CLIENTE = re.compile(r"Cliente\s+([A-Z ,]+)")
+    VIGENCIA = re.compile(r"Vigencia\s+(\d{2}/\d{2}/\d{4} - \d{2}/\d{2}/\d{4})")
+    SECCION = re.compile(r"(SECCION: \d{3} [A-ZÑÁÉÍÓÚ ]+)")
+    _MONTO = r"\d{1,3}(?:,\d{3})*\.\d{2}"
+    # Equivale a ^(.*?)(monto)\s+(monto)$: la búsqueda devuelve el primer inicio posible
+    MONTOS = re.compile(rf"({_MONTO})\s+({_MONTO})$")
+    PLACA = re.compile(r"PLACA:\s*([A-Z0-9\-]+)", re.IGNORECASE)
+    MARCA = re.compile(r"MARCA:\s*([^,]+)", re.IGNORECASE)
+    MODELO = re.compile(r"MODELO:\s*([^,]+)", re.IGNORECASE)
+    ANIO = re.compile(r"A[ÑN]O:\s*(\d{4})", re.IGNORECASE)
+    # Para descartar páginas, los mismos patrones del parseo: una página en la
+    # que no aparece ninguno no le aporta nada. Que alguna línea termine en dos
+    # montos se busca empezando por "d.dd" (acepta lo mismo y es más rápido); los
+    # patrones con IGNORECASE, sin la bandera sobre el texto en mayúsculas
+    MONTOS_PAGINA = re.compile(rf"\d\.\d{{2}}\s+{_MONTO}\s*$", re.MULTILINE)
+    PATRONES_PAGINA = (SECCION, MONTOS_PAGINA, CLIENTE, VIGENCIA)
+    PATRONES_PAGINA_MAYUSCULAS = tuple(re.compile(patron.pattern) for patron in (POLIZA, MARCA, MODELO, ANIO))
+
+    def cabecera(self, text):
+        poliza = self.POLIZA.search(text)
+        cliente = self.CLIENTE.search(text)
+        vigencia = self.VIGENCIA.search(text)
+        return (
+            poliza.group(1) if poliza else "SIN_POLIZA",
+            cliente.group(1).strip() if cliente else "SIN_CLIENTE",
+            vigencia.group(1) if vigencia else "SIN_VIGENCIA",
+        )
+
+    def relevante(self, texto):
+        """Si la página puede aportar filas o datos de cabecera al parseo."""
+        if any(patron.search(texto) for patron in self.PATRONES_PAGINA):
+            return True
+        mayusculas = texto.upper()
+        return any(patron.search(mayusculas) for patron in self.PATRONES_PAGINA_MAYUSCULAS)
+
+    def relevantes(self, textos):
+        """Qué páginas pueden aportar al parseo, en orden.
+
+        Además de las relevantes, la que sigue a una página que termina en la
+        línea de una placa: su primera línea es la de marca, modelo y año.
+        """
+        marcas = []
+        tras_placa = False
+        for texto in textos:
+            marcas.append(tras_placa or self.relevante(texto))
+            if texto:
+                # Las páginas vacías no llegan al parseo: no cortan la continuidad
+                ultima = texto.rpartition("\n")[2].strip()
+                tras_placa = bool(self.MONTOS.search(ultima) and self.PLACA.search(ultima))
+        return marcas
+
+    def _vehiculo(self, siguiente):
+        marca_match = self.MARCA.search(siguiente)
+        modelo_match = self.MODELO.search(siguiente)
+        anio_match = self.ANIO.search(siguiente)
+        return (
+            marca_match.group(1).strip() if marca_match else "",
+            modelo_match.group(1).strip() if modelo_match else "",
+            anio_match.group(1).strip() if anio_match else "",
+        )
+
+    def parsear(self, text):
+        nro_poliza, nombre_cliente, rango_vigencia = self.cabecera(text)
+        rows = []
+        secciones = [(m.start(), m.group()) for m in self.SECCION.finditer(text)]
+        limites = [inicio for inicio, _ in secciones[1:]] + [len(text)]
+        buscar_montos = self.MONTOS.search
+        buscar_placa = self.PLACA.search
+        find = text.find
+
+        for (pos, sec), fin in zip(secciones, limites):
+            # Cada línea de la sección es text[pos:salto]; la última termina en `fin`
+            while True:
+                salto = find("\n", pos, fin)
+                linea = text[pos:fin if salto == -1 else salto].strip()
+
+                # Una línea con montos termina en "d.dd": descarta el resto sin regex
+                if len(linea) > 8 and linea[-3] == "." and linea[-1].isdigit():
+                    match = buscar_montos(linea)
+                    if match:
+                        item_texto = linea[:match.start()].strip()
+
+                        # Extraer placa si existe en la línea (SECCION: 006 VEHICULOS)
+                        placa_match = buscar_placa(item_texto)
+                        placa = placa_match.group(1).strip() if placa_match else ""
+
+                        # Si hay placa, la marca/modelo/año suelen estar en la línea siguiente
+                        marca = modelo = anio = ""
+                        if placa and salto != -1:
+                            otro_salto = find("\n", salto + 1, fin)
+                            siguiente = text[salto + 1:fin if otro_salto == -1 else otro_salto]
+                            marca, modelo, anio = self._vehiculo(siguiente)
+
+                        # Los montos (1,234.56) van como número
+                        rows.append([
+                            nro_poliza, nombre_cliente, rango_vigencia, sec, item_texto, placa, marca, modelo, anio,
+                            monto(match.group(1)), monto(match.group(2)),
+                        ])
+
+                if salto == -1:
+                    break
+                pos = salto + 1
+        return rows
+
+
+_PARSER = ParserPolidata()
+
+
+def parsear_texto(text):
+    return _PARSER.parsear(text)
+
+
+def procesar_pdf(datos, motor=None):
+    return parsear_texto("\n".join(extraer_textos(datos, motor=motor)))
+
+
+def comparar_motores(datos, motor="pdfium", referencia="pdfplumber"):
+    """Compara las filas de `motor` (descartando páginas) con las de `referencia` leyendo todas.
+
+    Devuelve (filas_motor, filas_referencia, diferencias), donde diferencias es
+    una lista de (motor, fila) con las filas que solo produjo uno de los dos.
+    """
+    filas = parsear_texto("\n".join(extraer_textos(datos, motor=motor)))
+    filas_ref = parsear_texto("\n".join(extraer_textos(datos, motor=referencia, descartar=False)))
+    conteo = Counter(map(tuple, filas))
+    conteo_ref = Counter(map(tuple, filas_ref))
+    diferencias = [(motor, list(f)) for f in (conteo - conteo_ref).elements()]
+    diferencias += [(referencia, list(f)) for f in (conteo_ref - conteo).elements()]
+    return filas, filas_ref, diferencias
+
+
+# ---------------------------------------------------------
+# LOTES DE PDFs (serie o en paralelo)
+# ---------------------------------------------------------
+def _parsear_paginas(nombre, paginas, metricas):
+    if metricas is None:
+        return parsear_texto("\n".join(paginas))
+    with metricas.etapa("parsear", unidad="filas", archivo=nombre) as medicion:
+        filas = parsear_texto("\n".join(paginas))
+        medicion["unidades"] = len(filas)
+    return filas
+
+
+def _procesar_serie(archivos, metricas=None, motor=None):
+    for i, (nombre, datos) in enumerate(archivos):
+        if metricas is None:
+            yield i, procesar_pdf(datos, motor)
+            continue
+        with metricas.etapa("extraer_texto", unidad="páginas", archivo=nombre) as medicion:
+            textos, medicion["unidades"] = _extraer(datos, motor=motor)
+        yield i, _parsear_paginas(nombre, textos, metricas)
+
+
+def _procesar_paralelo(archivos, workers, metricas=None, motor=None):
+    # Cada tarea es (archivo, bloque de páginas); los PDFs grandes se dividen
+    bloques = []
+    for i, (_, datos) in enumerate(archivos):
+        n_paginas = contar_paginas(datos)
+        if n_paginas > PAGINAS_POR_BLOQUE:
+            for inicio in range(0, n_paginas, PAGINAS_POR_BLOQUE):
+                bloques.append((i, inicio, inicio + PAGINAS_POR_BLOQUE))
+        else:
+            bloques.append((i, 0, None))
+
+    pendientes = [0] * len(archivos)
+    for i, _, _ in bloques:
+        pendientes[i] += 1
+    textos = [{} for _ in archivos]
+    segundos = [0.0] * len(archivos)
+    leidas = [0] * len(archivos)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_procesos()) as pool:
+        futuros = {
+            pool.submit(_extraer_con_tiempo, archivos[i][1], inicio, fin, motor): (i, inicio)
+            for i, inicio, fin in bloques
+        }
+        try:
+            for futuro in as_completed(futuros):
+                i, inicio = futuros[futuro]
+                textos[i][inicio], n_paginas, tiempo = futuro.result()
+                segundos[i] += tiempo
+                leidas[i] += n_paginas
+                pendientes[i] -= 1
+                if pendientes[i]:
+                    continue
+                # Todas las páginas del archivo listas: se une en orden y se parsea
+                paginas = [t for k in sorted(textos[i]) for t in textos[i][k]]
+                textos[i] = None
+                if metricas is not None:
+                    # Tiempo sumado de los bloques del archivo, medido en cada proceso
+                    metricas.registrar("extraer_texto", segundos[i], leidas[i], "páginas", archivos[i][0])
+                yield i, _parsear_paginas(archivos[i][0], paginas, metricas)
+        finally:
+            # Si se deja de consumir (p. ej. al cancelar) no se esperan los bloques en cola
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iterar_pdfs(archivos, workers=None, on_progress=None, cache=None, metricas=None, motor=None):
+    """Genera las filas de cada (nombre, bytes o ruta) en el orden de subida, en cuanto están listas.
+
+    workers <= 1 procesa en serie; si el pool de procesos no está disponible
+    en el entorno se sigue en serie. Con `cache` solo se parsean los archivos
+    cuyo contenido no se haya procesado antes. Con `metricas` se registran
+    la extracción de texto y el parseo de cada archivo. `motor` elige el
+    lector de texto (ver MOTORES_PDF); por defecto pdfium si está instalado.
+    """
+    archivos = list(archivos)
+    if workers is None:
+        workers = workers_por_defecto()
+    motor = motor or motor_pdf_por_defecto()
+
+    listos = {}
+    claves = [None] * len(archivos)
+    if cache is not None:
+        for i, (_, datos) in enumerate(archivos):
+            claves[i] = cache.clave("polidata", _contenido(datos), extra=motor)
+            filas = cache.obtener(claves[i])
+            if filas is not None:
+                listos[i] = filas
+    faltantes = [i for i in range(len(archivos)) if i not in listos]
+    hechos = len(listos)
+    if metricas is not None and hechos:
+        metricas.registrar("caché", 0.0, hechos, "archivos")
+    if on_progress and hechos:
+        on_progress(f"{hechos} archivo(s) desde caché", hechos, len(archivos))
+
+    siguiente = 0
+    pendientes = [archivos[i] for i in faltantes]
+    procesados = set()
+
+    def recibir(j, filas):
+        nonlocal hechos
+        i = faltantes[j]
+        procesados.add(j)
+        listos[i] = filas
+        if cache is not None:
+            cache.guardar(claves[i], filas)
+        hechos += 1
+        if on_progress:
+            on_progress(archivos[i][0], hechos, len(archivos))
+
+    def entregar():
+        nonlocal siguiente
+        while siguiente in listos:
+            yield listos.pop(siguiente)
+            siguiente += 1
+
+    yield from entregar()
+    if workers > 1 and pendientes:
+        try:
+            for j, filas in _procesar_paralelo(pendientes, workers, metricas, motor):
+                recibir(j, filas)
+                yield from entregar()
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            pass
+    restantes = [j for j in range(len(pendientes)) if j not in procesados]
+    for k, filas in _procesar_serie([pendientes[j] for j in restantes], metricas, motor):
+        recibir(restantes[k], filas)
+        yield from entregar()
+
+
+def procesar_pdfs(archivos, workers=None, on_progress=None, cache=None, metricas=None, motor=None):
+    """Como iterar_pdfs, pero devuelve todas las filas juntas."""
+    return [fila for filas in iterar_pdfs(archivos, workers, on_progress, cache, metricas, motor) for fila in filas]
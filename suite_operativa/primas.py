@@ -0,0 +1,304 @@
+import importlib.util
+import io
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from suite_operativa.montos import monto, parsear_montos
+from suite_operativa.salidas import ESTILO_ROJO, EscritorExcel
+from suite_operativa.trabajos import contexto_procesos
+
+TASAS_NETA = {"Sur": 0.00038, "Norte": 0.00036}
+V_D_E = 0.03
+V_IGV = 0.18
+
+ORDEN_COLUMNAS = [
+    "Archivo", "Poliza", "Usuario", "Zona", "Fecha_reporte",
+    "Cantidad_registros", "Total_capital",
+    "Total_origen_col_H", "Total_origen_col_J",
+    "prima_neta", "D_E", "IGV", "TOTAL"
+]
+
+# Únicas columnas del Excel que usa el cálculo
+COLUMNAS_USADAS = ["Tipo de Documento", "Número de Documento", "Nombre Completo", "Capital Asegurado", "Prima"]
+
+# Columna interna con el índice del archivo de origen de cada fila
+_ARCHIVO = "__archivo__"
+# Columna interna con el texto "TOTAL" de la última fila cuando estaba en una columna descartada
+_ETIQUETA_TOTAL = "__etiqueta_total__"
+
+COLUMNAS_NO_VALIDOS = [
+    "Tipo de Documento", "Número de Documento", "Nombre Completo",
+    "validación documento", "archivo_origen", "fila_en_excel"
+]
+
+
+# ---------------------------------------------------------
+# LECTURA DE EXCELS
+# ---------------------------------------------------------
+def motor_por_defecto():
+    # calamine (Rust) es bastante más rápido que openpyxl; pandas lo soporta desde 2.2
+    version = tuple(int(p) for p in re.findall(r"\d+", pd.__version__)[:2])
+    if version >= (2, 2) and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def _proyectar(df_p):
+    """Deja solo COLUMNAS_USADAS; si la fila TOTAL estaba rotulada en otra columna, conserva el rótulo."""
+    descartadas = [c for c in df_p.columns if c not in COLUMNAS_USADAS]
+    if not descartadas:
+        return df_p
+    proyectado = df_p[[c for c in df_p.columns if c in COLUMNAS_USADAS]].copy()
+    if not df_p.empty:
+        ultima = df_p[descartadas].iloc[-1].astype(str)
+        rotulos = ultima[ultima.str.contains("TOTAL", case=False, na=False).astype(bool)]
+        if len(rotulos):
+            proyectado[_ETIQUETA_TOTAL] = pd.Series([None] * (len(df_p) - 1) + [rotulos.iloc[0]], index=df_p.index, dtype=object)
+    return proyectado
+
+
+# `datos` puede ser el contenido del Excel o su ruta (lotes desde un ZIP o una carpeta)
+def _es_ruta(datos):
+    return isinstance(datos, (str, os.PathLike))
+
+
+def _contenido(datos):
+    if not _es_ruta(datos):
+        return datos
+    with open(datos, "rb") as f:
+        return f.read()
+
+
+def validar_excel(ruta):
+    """Lanza ValueError si `ruta` no es un libro .xlsx (chequeo barato, sin leer las hojas)."""
+    if not zipfile.is_zipfile(ruta):
+        raise ValueError("no es un archivo .xlsx")
+    with zipfile.ZipFile(ruta) as libro:
+        if "xl/workbook.xml" not in libro.namelist():
+            raise ValueError("no es un libro de Excel")
+
+
+def leer_excel_primas(datos, motor=None, proyectar=True):
+    """Lee el Excel de asegurados (bytes o ruta); con `proyectar` solo se conservan las columnas del cálculo.
+
+    Las filas vacías se descartan antes de proyectar, mirando todas las columnas.
+    """
+    fuente = datos if _es_ruta(datos) else io.BytesIO(datos)
+    df_p = pd.read_excel(fuente, dtype={"Número de Documento": str}, engine=motor or motor_por_defecto())
+    df_p.columns = df_p.columns.str.strip()
+    df_p = df_p.dropna(how="all")
+    return _proyectar(df_p) if proyectar else df_p
+
+
+def _leer_con_tiempo(datos, motor):
+    """(df, segundos, motivo); si el Excel no se puede leer, df es None y `motivo` dice por qué."""
+    inicio = time.perf_counter()
+    try:
+        df_p = leer_excel_primas(datos, motor)
+    except Exception as e:
+        # Cada motor lanza sus propias excepciones: cualquiera cuenta como archivo dañado
+        return None, time.perf_counter() - inicio, f"no se puede leer: {str(e) or type(e).__name__}"
+    return df_p, time.perf_counter() - inicio, None
+
+
+def leer_lote(archivos, workers=1, motor=None, cache=None, on_progress=None):
+    """Lee (nombre, bytes o ruta) de varios Excels; devuelve (leidos, errores).
+
+    `leidos` es [(nombre, df, segundos)] en el mismo orden y `errores`
+    [(nombre, motivo)] de los que no se pudieron leer (no cortan el lote).
+    Con workers > 1 los archivos se leen en paralelo en un pool de procesos.
+    Los que vienen de `cache` figuran con 0 segundos.
+    """
+    archivos = list(archivos)
+    motor = motor or motor_por_defecto()
+    resultados = [None] * len(archivos)
+    claves = [None] * len(archivos)
+    errores = []
+    if cache is not None:
+        for i, (nombre, datos) in enumerate(archivos):
+            # La lectura depende del motor: calamine y openpyxl no devuelven los mismos tipos
+            claves[i] = cache.clave("primas", _contenido(datos), extra=motor)
+            df_p = cache.obtener(claves[i])
+            if df_p is not None:
+                resultados[i] = (nombre, df_p, 0.0)
+    faltantes = [i for i, r in enumerate(resultados) if r is None]
+    hechos = len(archivos) - len(faltantes)
+
+    def recibir(i, df_p, segundos, motivo):
+        nonlocal hechos
+        if motivo is None:
+            resultados[i] = (archivos[i][0], df_p, segundos)
+            if cache is not None:
+                cache.guardar(claves[i], df_p)
+        else:
+            resultados[i] = False
+            errores.append((archivos[i][0], motivo))
+        hechos += 1
+        if on_progress:
+            on_progress(archivos[i][0], hechos, len(archivos))
+
+    if workers > 1 and len(faltantes) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_procesos()) as pool:
+                futuros = [(i, pool.submit(_leer_con_tiempo, archivos[i][1], motor)) for i in faltantes]
+                try:
+                    for i, futuro in futuros:
+                        recibir(i, *futuro.result())
+                finally:
+                    # Si on_progress corta el lote (p. ej. al cancelar) no se esperan las lecturas en cola
+                    pool.shutdown(wait=True, cancel_futures=True)
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            pass
+    for i in faltantes:
+        if resultados[i] is None:
+            recibir(i, *_leer_con_tiempo(archivos[i][1], motor))
+    return [r for r in resultados if r], errores
+
+
+def validar_documentos(df):
+    """Validación de documento de todas las filas a la vez (DNI = 8 dígitos)."""
+    tipo = df["Tipo de Documento"].astype(str).str.strip().str.upper()
+    num = df["Número de Documento"].astype(str).str.strip()
+    es_dni = tipo.eq("DNI")
+    num_valido = num.str.isdigit().fillna(False).astype(bool) & num.str.len().eq(8)
+    return (pd.Series("No es DNI", index=df.index)
+            .mask(es_dni, "DNI inválido")
+            .mask(es_dni & num_valido, "DNI válido"))
+
+
+def red2(x):
+    return float(round(x, 2)) if pd.notna(x) else "no declara"
+
+
+def _origen(valor):
+    # Los totales escritos como texto ("S/ 1.234,56") pasan a número; lo demás queda como está
+    if isinstance(valor, str):
+        leido = monto(valor)
+        return valor if leido is None else leido
+    return valor
+
+
+def _filas_total(df, grupo):
+    """Marca la última fila de cada archivo si alguna de sus celdas contiene "TOTAL"."""
+    ultimas = ~grupo.duplicated(keep="last")
+    datos = df.loc[ultimas, [c for c in df.columns if c != _ARCHIVO]]
+    contiene = pd.Series(False, index=datos.index)
+    for col in datos.columns:
+        contiene |= datos[col].astype(str).str.contains("TOTAL", case=False, na=False).astype(bool)
+    tamanos = grupo.map(grupo.value_counts())
+    return contiene.reindex(df.index, fill_value=False) & tamanos.gt(1)
+
+
+def calcular_primas(tablas, zona, usuario, fecha_reporte):
+    """Procesa pares (nombre, DataFrame leído con leer_excel_primas); devuelve (df_resumen, df_no_validos).
+
+    Todos los archivos se unen en un solo DataFrame etiquetado por archivo: la
+    validación, la detección de la fila TOTAL y las sumas se hacen de una vez.
+    df_resumen.attrs["capital_no_leido"] cuenta las celdas de Capital Asegurado
+    con algo escrito que no es un monto (quedan fuera de las sumas).
+    """
+    neta = TASAS_NETA[zona]
+    nombres = []
+    marcos = {}
+    for k, (nombre_archivo, df_p) in enumerate(tablas):
+        nombres.append(nombre_archivo)
+        if df_p.empty:
+            continue
+        df_p = df_p.copy()
+        df_p["fila_en_excel"] = df_p.index + 2
+        for col in ["Tipo de Documento", "Número de Documento", "Capital Asegurado", "Prima", "Nombre Completo"]:
+            if col not in df_p.columns:
+                df_p[col] = pd.NA
+        df_p[_ARCHIVO] = k
+        marcos[k] = df_p
+
+    if not marcos:
+        # Ningún archivo con filas (o ninguno): las mismas columnas que el resumen normal
+        df_resumen = pd.DataFrame([{"Archivo": n, "Poliza": "no declara"} for n in nombres]).reindex(columns=ORDEN_COLUMNAS)
+        df_resumen.attrs["capital_no_leido"] = 0
+        return df_resumen, pd.DataFrame(columns=COLUMNAS_NO_VALIDOS)
+
+    df = pd.concat(marcos.values(), ignore_index=True)
+    grupo = df[_ARCHIVO]
+    df["validación documento"] = validar_documentos(df)
+
+    # NO VÁLIDOS
+    df_no_validos = df[df["validación documento"] == "No es DNI"].copy()
+    df_no_validos["archivo_origen"] = [nombres[k] for k in df_no_validos[_ARCHIVO]]
+    df_no_validos = df_no_validos[COLUMNAS_NO_VALIDOS]
+    df_no_validos = df_no_validos[
+        df_no_validos["Número de Documento"].notna() &
+        df_no_validos["Número de Documento"].astype(str).str.strip().ne("") &
+        df_no_validos["Nombre Completo"].notna() &
+        df_no_validos["Nombre Completo"].astype(str).str.strip().ne("")
+    ].reset_index(drop=True).infer_objects()
+
+    # TOTALES: la fila TOTAL de cada archivo queda fuera de las sumas
+    es_total = _filas_total(df, grupo)
+    con_subtotal = set(grupo[es_total])
+
+    # Capital con "S/", espacios o coma decimal se lee igual que el numérico
+    capital_num, capital_no_leido = parsear_montos(df.loc[~es_total, "Capital Asegurado"])
+    prima_neta_reg = capital_num * neta
+    d_e_reg = prima_neta_reg * V_D_E
+    igv_reg = (prima_neta_reg + d_e_reg) * V_IGV
+    calculo = pd.DataFrame({
+        _ARCHIVO: grupo[~es_total],
+        "Cantidad_registros": 1,
+        "capital": capital_num,
+        "prima_neta": prima_neta_reg,
+        "D_E": d_e_reg,
+        "IGV": igv_reg,
+        "TOTAL": prima_neta_reg + d_e_reg + igv_reg,
+    })
+    sumas = calculo.groupby(_ARCHIVO, sort=False).sum(min_count=1)
+
+    resumen = []
+    for k, nombre_archivo in enumerate(nombres):
+        if k not in sumas.index:
+            resumen.append({"Archivo": nombre_archivo, "Poliza": "no declara"})
+            continue
+        df_p = marcos[k]
+        capital = df_p["Capital Asegurado"]
+        if k in con_subtotal:
+            sub_capital = _origen(df_p["Capital Asegurado"].iat[-1])
+            sub_prima = _origen(df_p["Prima"].iat[-1])
+            capital = capital.iloc[:-1]
+        else:
+            sub_capital = sub_prima = "no declara"
+
+        match = re.search(r'\d{10,}', nombre_archivo)
+        resumen.append({
+            "Archivo": nombre_archivo,
+            "Poliza": match.group(0) if match else "no declara",
+            "Usuario": usuario,
+            "Zona": zona,
+            "Fecha_reporte": fecha_reporte,
+            "Cantidad_registros": int(sumas.at[k, "Cantidad_registros"]),
+            # Una columna numérica se suma con su propio tipo; una de texto, ya leída como monto
+            "Total_capital": capital.sum(min_count=1) if is_numeric_dtype(capital) else sumas.at[k, "capital"],
+            "Total_origen_col_H": sub_capital,
+            "Total_origen_col_J": sub_prima,
+            "prima_neta": red2(sumas.at[k, "prima_neta"]),
+            "D_E": red2(sumas.at[k, "D_E"]),
+            "IGV": red2(sumas.at[k, "IGV"]),
+            "TOTAL": red2(sumas.at[k, "TOTAL"])
+        })
+
+    df_resumen = pd.DataFrame(resumen).reindex(columns=ORDEN_COLUMNAS)
+    df_resumen.attrs["capital_no_leido"] = capital_no_leido
+    return df_resumen, df_no_validos
+
+
+def escribir_reporte(df_resumen, df_no_validos, destino):
+    """Escribe el reporte de primas con cabeceras en rojo; `destino` es una ruta o un buffer."""
+    with EscritorExcel(destino) as libro:
+        libro.hoja("Totales por archivo", list(df_resumen.columns), ESTILO_ROJO).agregar_df(df_resumen)
+        libro.hoja("No válidos", list(df_no_validos.columns), ESTILO_ROJO).agregar_df(df_no_validos)
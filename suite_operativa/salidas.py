@@ -0,0 +1,278 @@
+"""Escritores de tablas por lotes: las filas se agregan a medida que llegan.
+
+El Excel se genera con openpyxl en modo write-only (memoria constante), el CSV
+con el módulo csv y el Parquet por grupos de filas con pyarrow.
+"""
+import csv
+import importlib.util
+import io
+import os
+import sys
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+FORMATOS = (".xlsx", ".csv", ".parquet")
+MIMES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".csv": "text/csv",
+    ".parquet": "application/vnd.apache.parquet",
+}
+
+# Cabecera roja del reporte de primas
+ESTILO_ROJO = {
+    "fill": PatternFill(start_color="D53032", end_color="D53032", fill_type="solid"),
+    "font": Font(color="FFFFFF", bold=True),
+}
+# Cabecera como la escribe pandas.to_excel
+ESTILO_SIMPLE = {
+    "font": Font(bold=True),
+    "alignment": Alignment(horizontal="center", vertical="top"),
+}
+
+FILAS_POR_GRUPO_PARQUET = 50_000
+
+
+# pd.NA y pd.NaT; mientras pandas no esté cargado no pueden llegar en las filas
+_NA = _NAT = object()
+
+
+def _enlazar_pandas():
+    # Se llama por lote: este módulo no importa pandas por su cuenta
+    global _NA, _NAT
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        _NA, _NAT = pd.NA, pd.NaT
+
+
+def _valor(v):
+    if v is None or v is _NA or v is _NAT or (isinstance(v, float) and v != v):
+        return None
+    return v
+
+
+def formatos_disponibles():
+    # Parquet solo si pyarrow está instalado (dependencia opcional)
+    if importlib.util.find_spec("pyarrow") is None:
+        return FORMATOS[:2]
+    return FORMATOS
+
+
+def formato_de(destino, formato=None):
+    if formato:
+        formato = formato if formato.startswith(".") else "." + formato
+    elif isinstance(destino, (str, os.PathLike)):
+        formato = os.path.splitext(destino)[1]
+    formato = (formato or "").lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de salida no soportado: {formato} (usa .xlsx, .csv o .parquet)")
+    return formato
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+class _Escritor:
+    def agregar_df(self, df):
+        self.agregar(df.itertuples(index=False, name=None))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        # Si el bloque falló (error de parseo, cancelación) no queda una salida truncada
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.descartar()
+
+    def descartar(self):
+        pass
+
+
+# ---------------------------------------------------------
+# EXCEL
+# ---------------------------------------------------------
+class HojaExcel(_Escritor):
+    def __init__(self, ws, columnas, estilo):
+        self._ws = ws
+        cabecera = []
+        for nombre in columnas:
+            celda = WriteOnlyCell(ws, value=nombre)
+            for atributo, valor in (estilo or {}).items():
+                setattr(celda, atributo, valor)
+            cabecera.append(celda)
+        ws.append(cabecera)
+
+    def agregar(self, filas):
+        _enlazar_pandas()
+        for fila in filas:
+            self._ws.append([_valor(v) for v in fila])
+
+    def cerrar(self):
+        pass
+
+
+class EscritorExcel:
+    """Libro write-only con una o varias hojas; se guarda en `destino` al cerrar."""
+
+    def __init__(self, destino):
+        self.destino = destino
+        self._wb = Workbook(write_only=True)
+
+    def hoja(self, nombre, columnas, estilo=ESTILO_SIMPLE):
+        return HojaExcel(self._wb.create_sheet(title=nombre), columnas, estilo)
+
+    def cerrar(self):
+        self._wb.save(self.destino)
+
+    def descartar(self):
+        # El libro recién se escribe al cerrar; solo quedan los temporales de cada hoja
+        # (se cierran y borran como lo hace openpyxl al guardar)
+        for ws in self._wb.worksheets:
+            ws.close()
+            ws._writer.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.descartar()
+
+
+class _TablaExcel(_Escritor):
+    def __init__(self, destino, columnas, hoja, estilo):
+        self._libro = EscritorExcel(destino)
+        self._hoja = self._libro.hoja(hoja, columnas, estilo)
+
+    def agregar(self, filas):
+        self._hoja.agregar(filas)
+
+    def cerrar(self):
+        self._libro.cerrar()
+
+    def descartar(self):
+        self._libro.descartar()
+
+
+# ---------------------------------------------------------
+# CSV
+# ---------------------------------------------------------
+class EscritorCSV(_Escritor):
+    def __init__(self, destino, columnas):
+        self.destino = destino
+        if isinstance(destino, (str, os.PathLike)):
+            self._archivo = open(destino, "w", encoding="utf-8", newline="")
+            self._propio = True
+        else:
+            self._archivo = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+            self._propio = False
+        self._csv = csv.writer(self._archivo, lineterminator="\n")
+        self._csv.writerow(columnas)
+
+    def agregar(self, filas):
+        _enlazar_pandas()
+        self._csv.writerows([_valor(v) for v in fila] for fila in filas)
+
+    def cerrar(self):
+        if self._propio:
+            self._archivo.close()
+        else:
+            # El buffer es del llamador: se vacía sin cerrarlo
+            self._archivo.flush()
+            self._archivo.detach()
+
+    def descartar(self):
+        if self._propio:
+            self._archivo.close()
+            _borrar(self.destino)
+        else:
+            self._archivo.detach()
+
+
+# ---------------------------------------------------------
+# PARQUET
+# ---------------------------------------------------------
+class EscritorParquet(_Escritor):
+    """Escribe grupos de filas; el esquema se toma del primer grupo.
+
+    Las columnas con tipos mezclados ("no declara" junto a números) se guardan como texto.
+    """
+
+    def __init__(self, destino, columnas, filas_por_grupo=FILAS_POR_GRUPO_PARQUET):
+        self.destino = destino
+        self.columnas = list(columnas)
+        self.filas_por_grupo = filas_por_grupo
+        self._pendientes = []
+        self._writer = None
+        self._esquema = None
+
+    def _tabla(self, filas):
+        import pandas as pd
+        import pyarrow as pa
+
+        df = pd.DataFrame(filas, columns=self.columnas)
+        objetos = df.select_dtypes(include=["object", "string"]).columns
+        df = df.assign(**{c: df[c].where(df[c].isna(), df[c].astype(str)) for c in objetos})
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        if self._esquema is None:
+            campos = [
+                pa.field(campo.name, pa.string()) if pa.types.is_null(campo.type) else campo
+                for campo in tabla.schema
+            ]
+            self._esquema = pa.schema(campos)
+        return tabla.cast(self._esquema)
+
+    def _volcar(self):
+        import pyarrow.parquet as pq
+
+        if not self._pendientes and self._writer is not None:
+            return
+        tabla = self._tabla(self._pendientes)
+        self._pendientes = []
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.destino, self._esquema)
+        self._writer.write_table(tabla)
+
+    def agregar(self, filas):
+        for fila in filas:
+            self._pendientes.append(fila)
+            if len(self._pendientes) >= self.filas_por_grupo:
+                self._volcar()
+
+    def cerrar(self):
+        self._volcar()
+        self._writer.close()
+
+    def descartar(self):
+        self._pendientes = []
+        if self._writer is not None:
+            self._writer.close()
+            if isinstance(self.destino, (str, os.PathLike)):
+                _borrar(self.destino)
+
+
+# ---------------------------------------------------------
+# FÁBRICA
+# ---------------------------------------------------------
+def abrir_escritor(destino, columnas, formato=None, hoja="Sheet1", estilo=ESTILO_SIMPLE):
+    """Escritor de una tabla según la extensión de `destino` (o `formato` si es un buffer)."""
+    formato = formato_de(destino, formato)
+    if formato == ".xlsx":
+        return _TablaExcel(destino, columnas, hoja, estilo)
+    if formato == ".csv":
+        return EscritorCSV(destino, columnas)
+    return EscritorParquet(destino, columnas)
+
+
+def guardar_tabla(df, destino, formato=None, hoja="Sheet1", estilo=ESTILO_SIMPLE):
+    with abrir_escritor(destino, list(df.columns), formato, hoja, estilo) as escritor:
+        escritor.agregar_df(df)
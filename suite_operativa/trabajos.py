@@ -0,0 +1,136 @@
+"""Trabajos en segundo plano con avance, cancelación y resultado.
+
+Un Trabajo ejecuta `funcion(trabajo)` en un hilo del ejecutor compartido. La
+función informa su avance con `trabajo.avance` (compatible con los
+`on_progress` de la suite), que además la corta si se pidió cancelar. El
+cálculo pesado sigue yendo a los pools de procesos de cada herramienta.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+
+# Trabajos simultáneos en todo el servidor; los demás esperan en cola
+MAX_TRABAJOS = 4
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en curso"
+TERMINADO = "terminado"
+CANCELADO = "cancelado"
+ERROR = "error"
+
+_EJECUTOR = None
+_LOCK = threading.Lock()
+
+
+def ejecutor():
+    global _EJECUTOR
+    with _LOCK:
+        if _EJECUTOR is None:
+            _EJECUTOR = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix="trabajo")
+        return _EJECUTOR
+
+
+def contexto_procesos():
+    """Contexto para los pools de procesos de las herramientas: nunca fork.
+
+    Los trabajos corren en hilos; un fork mientras otro hilo tiene tomado un
+    lock (p. ej. el de pdfium) copia el lock tomado y el proceso hijo se cuelga.
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+class TrabajoCancelado(Exception):
+    """Lanzada dentro del trabajo cuando se pidió cancelarlo."""
+
+
+class Trabajo:
+    """Un proceso de una herramienta corriendo fuera del script de Streamlit.
+
+    `firma` identifica las entradas (archivos y opciones): si cambian, el
+    trabajo guardado ya no corresponde y se lanza otro.
+    """
+
+    def __init__(self, funcion, firma=None):
+        self.funcion = funcion
+        self.firma = firma
+        self.estado = PENDIENTE
+        self.mensaje = ""
+        self.hechos = 0
+        self.total = 0
+        self.resultado = None
+        self.error = None
+        self.inicio = None
+        self.fin = None
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    def iniciar(self):
+        self._futuro = ejecutor().submit(self._ejecutar)
+        return self
+
+    def _ejecutar(self):
+        if self._cancelar.is_set():
+            self.estado = CANCELADO
+            return
+        self.estado = EN_CURSO
+        self.inicio = time.perf_counter()
+        try:
+            self.resultado = self.funcion(self)
+            self.estado = TERMINADO
+        except TrabajoCancelado:
+            self.estado = CANCELADO
+        except Exception as e:
+            self.error = e
+            self.estado = ERROR
+        finally:
+            self.fin = time.perf_counter()
+
+    # -----------------------------------------------------
+    # DESDE EL TRABAJO
+    # -----------------------------------------------------
+    def avance(self, mensaje, hechos, total):
+        """Registra el avance; lanza TrabajoCancelado si se pidió cancelar."""
+        self.mensaje, self.hechos, self.total = mensaje, hechos, total
+        self.revisar()
+
+    def revisar(self):
+        if self._cancelar.is_set():
+            raise TrabajoCancelado()
+
+    # -----------------------------------------------------
+    # DESDE LA INTERFAZ
+    # -----------------------------------------------------
+    def cancelar(self):
+        self._cancelar.set()
+        # Si todavía está en cola no llega a empezar
+        if self._futuro is not None and self._futuro.cancel():
+            self.estado = CANCELADO
+
+    @property
+    def cancelando(self):
+        return self._cancelar.is_set() and self.activo
+
+    @property
+    def activo(self):
+        return self.estado in (PENDIENTE, EN_CURSO)
+
+    @property
+    def fraccion(self):
+        return min(1.0, self.hechos / self.total) if self.total else 0.0
+
+    @property
+    def segundos(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def esperar(self, timeout=None):
+        """Espera a que termine (útil fuera de Streamlit); devuelve si terminó."""
+        if self._futuro is not None:
+            try:
+                self._futuro.result(timeout)
+            except (CancelledError, TimeoutError):
+                pass
+        return not self.activo
@@ -0,0 +1,57 @@
+"""Compilación y relleno de plantillas de la combinación de correspondencia."""
+import io
+import zipfile
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from suite_operativa.combinador import DOCUMENTO, compilar_plantilla
+
+
+def _plantilla(*parrafos):
+    doc = Document()
+    cuerpo = doc.element.body
+    for xml in parrafos:
+        cuerpo.insert(len(cuerpo) - 1, parse_xml(f"<w:p {nsdecls('w', 'r')}>{xml}</w:p>"))
+    salida = io.BytesIO()
+    doc.save(salida)
+    return salida.getvalue()
+
+
+def _parrafos(docx):
+    with zipfile.ZipFile(io.BytesIO(docx)) as zf:
+        # Si el relleno dejó XML inválido, Document no lo abre
+        doc = Document(io.BytesIO(docx))
+        xml = zf.read(DOCUMENTO).decode("utf-8")
+    return [p.text for p in doc.paragraphs], xml
+
+
+def test_tags_partidos_dentro_de_hipervinculos_y_controles():
+    datos = _plantilla(
+        '<w:hyperlink r:id="rId99"><w:r><w:t xml:space="preserve">Señor {{Nom</w:t></w:r>'
+        '<w:r><w:rPr><w:b/></w:rPr><w:t>bre}}</w:t></w:r></w:hyperlink>',
+        '<w:sdt><w:sdtContent><w:r><w:t>{{</w:t></w:r><w:r><w:t>poliza}}</w:t></w:r></w:sdtContent></w:sdt>',
+        '<w:ins w:id="1" w:author="x"><w:r><w:t>{{ciu</w:t></w:r></w:ins><w:r><w:t>dad}}</w:t></w:r>',
+    )
+    plantilla = compilar_plantilla(datos)
+    assert plantilla.tags == ["ciudad", "nombre", "poliza"]
+    _, xml = _parrafos(plantilla.renderizar({"nombre": "ANA", "poliza": "123", "ciudad": "LIMA"}))
+    assert "Señor ANA" in xml and ">123<" in xml and ">LIMA<" in xml
+    assert "{{" not in xml
+
+
+def test_tabulaciones_y_saltos_se_conservan():
+    datos = _plantilla('<w:r><w:tab/><w:t>{{no</w:t><w:br/></w:r><w:r><w:t>mbre}} fin</w:t></w:r>')
+    _, xml = _parrafos(compilar_plantilla(datos).renderizar({"nombre": "ANA"}))
+    assert xml.count("<w:tab/>") == 1 and xml.count("<w:br/>") == 1
+    assert ">ANA<" in xml and " fin" in xml
+
+
+def test_valores_con_comillas_en_atributos():
+    datos = _plantilla('<w:hyperlink r:id="rId99" w:tooltip="{{nombre}}"><w:r><w:t>{{nombre}}</w:t></w:r></w:hyperlink>')
+    docx = compilar_plantilla(datos).renderizar({"nombre": 'ANA "LA" O\'NEIL <&>'})
+    textos, _ = _parrafos(docx)
+    hipervinculo = Document(io.BytesIO(docx)).element.body.find(f".//{qn('w:hyperlink')}")
+    assert hipervinculo.get(qn("w:tooltip")) == 'ANA "LA" O\'NEIL <&>'
+    assert 'ANA "LA" O\'NEIL <&>' in textos
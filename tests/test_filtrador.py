@@ -0,0 +1,45 @@
+"""Filtrado de TXT por prefijo, en serie y en paralelo."""
+import io
+import os
+
+import pytest
+
+from suite_operativa import filtrador
+
+
+def _txt(tmp_path, nombre, contenido):
+    ruta = os.path.join(tmp_path, nombre)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    return nombre, ruta
+
+
+def test_saltos_de_linea_y_bloques():
+    datos = b"121 a\r\n999 b\r101 c\n301 d"
+    # Bloques de 3 bytes: las líneas y los \r\n quedan partidos entre lecturas
+    lineas = [linea for bloque in filtrador.iterar_bloques(io.BytesIO(datos), tamano_bloque=3) for linea in bloque]
+    assert lineas == ["121 a", "101 c", "301 d"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_filtrar_archivos_en_orden_y_con_errores(tmp_path, workers):
+    archivos = [
+        _txt(tmp_path, "a.txt", b"121 uno\n555 no\n101 dos\n"),
+        ("falta.txt", os.path.join(tmp_path, "falta.txt")),
+        _txt(tmp_path, "b.txt", b"999 no\n"),
+        _txt(tmp_path, "c.txt", b"260 tres\r\n"),
+    ]
+    errores = []
+    avance = []
+    salida = list(filtrador.filtrar_archivos(
+        archivos, workers=workers, errores=errores, on_progress=lambda nombre, hechos, total: avance.append(hechos)))
+    assert [(nombre, linea) for nombre, lineas in salida for linea in lineas] == [
+        ("a.txt", "121 uno"), ("a.txt", "101 dos"), ("c.txt", "260 tres"),
+    ]
+    assert [nombre for nombre, _ in errores] == ["falta.txt"]
+    assert avance == [1, 2, 3, 4]
+
+
+def test_sin_lista_de_errores_el_error_corta(tmp_path):
+    with pytest.raises(OSError):
+        list(filtrador.filtrar_archivos([("falta.txt", os.path.join(tmp_path, "falta.txt"))]))
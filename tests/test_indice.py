@@ -0,0 +1,42 @@
+"""Índice de pólizas: una póliza en varios PDFs y exportación incremental."""
+from suite_operativa.indice import IndicePolizas
+
+
+def _fila(poliza, item, placa, prima):
+    return [poliza, "ANA PEREZ", "01/01/2024 - 01/01/2025", "VEHICULOS", item, placa, "TOYOTA", "YARIS", "2020", 20000.0, prima]
+
+
+def test_poliza_en_dos_pdfs(tmp_path):
+    indice = IndicePolizas(str(tmp_path / "indice.sqlite"))
+    original = [_fila("123", "1", "ABC123", 500.0)]
+    endoso = [_fila("123", "2", "XYZ789", 650.0), _fila("456", "1", "QWE456", 300.0)]
+    assert indice.agregar("original.pdf", "a" * 64, original) == ["123"]
+    assert indice.agregar("endoso.pdf", "b" * 64, endoso) == ["123", "456"]
+
+    filas, total = indice.buscar(poliza="123")
+    assert total == 2
+    assert [fila[5] for fila in filas] == ["ABC123", "XYZ789"]
+    assert indice.resumen() == {"archivos": 2, "polizas": 2, "filas": 3}
+
+    # Volver a indexar el primero no duplica sus filas ni borra las del segundo
+    assert indice.agregar("original.pdf", "a" * 64, original) == []
+    assert indice.buscar(poliza="123")[1] == 2
+    # El primero con filas distintas reemplaza solo las suyas
+    assert indice.agregar("original.pdf", "a" * 64, [_fila("123", "1", "ABC123", 550.0)]) == ["123"]
+    filas, total = indice.buscar(poliza="123")
+    assert total == 2
+    assert sorted(fila[10] for fila in filas) == [550.0, 650.0]
+
+
+def test_exportacion_incluye_cada_pdf(tmp_path):
+    indice = IndicePolizas(str(tmp_path / "indice.sqlite"))
+    indice.agregar("original.pdf", "a" * 64, [_fila("123", "1", "ABC123", 500.0)])
+    indice.marcar("prueba", indice.secuencia())
+    indice.agregar("endoso.pdf", "b" * 64, [_fila("123", "2", "XYZ789", 650.0)])
+    # El mismo contenido reimpreso (otro hash) no cuenta como cambio
+    indice.agregar("reimpreso.pdf", "c" * 64, [_fila("123", "2", "XYZ789", 650.0)])
+
+    desde = indice.marca("prueba")
+    assert indice.cambiadas(desde) == 1
+    assert [fila[5] for filas in indice.filas_desde(desde) for fila in filas] == ["XYZ789"]
+    assert indice.buscar(poliza="123")[1] == 2
@@ -0,0 +1,43 @@
+"""Lectura de montos: la columna en bloque (pyarrow) y la celda suelta dan lo mismo."""
+import math
+
+import pandas as pd
+import pytest
+
+from suite_operativa.montos import monto, parsear_montos
+
+TEXTOS = [
+    "S/ 1.234,56", "S/. 1,234.56", "1 234,56", "1\u00a0234,56", "1\u202f234.5", "-5,5", "0.125", "1.234",
+    "1,234", "12,345,678.9", "0,005", "7", "", "   ", "abc", "1.2.3", "1,23,456",
+    # Dígitos y espacios que no son ASCII: ninguno de los dos caminos los acepta
+    "١٢٣", "１２", "²", "\v12", "12\f", "1\u2003234", "1\u3000234",
+]
+
+
+def _iguales(a, b):
+    if a is None or (isinstance(a, float) and math.isnan(a)) or a is pd.NA:
+        return b is None or b is pd.NA or (isinstance(b, float) and math.isnan(b))
+    return a == b
+
+
+@pytest.mark.parametrize("centavos", [False, True])
+def test_columna_igual_que_celda_por_celda(centavos):
+    resultado, no_leidas = parsear_montos(pd.Series(TEXTOS, dtype=object), centavos=centavos)
+    esperados = [monto(texto, centavos) for texto in TEXTOS]
+    for texto, obtenido, esperado in zip(TEXTOS, resultado.tolist(), esperados):
+        assert _iguales(obtenido, esperado), repr(texto)
+    assert no_leidas == sum(valor is None and texto.strip() != "" for texto, valor in zip(TEXTOS, esperados))
+
+
+def test_columna_mixta():
+    resultado, no_leidas = parsear_montos(pd.Series([1500, "S/ 1.234,56", None, "\v12", 2.5], dtype=object))
+    assert resultado.tolist()[:2] == [1500.0, 1234.56]
+    assert math.isnan(resultado[2]) and math.isnan(resultado[3])
+    assert resultado[4] == 2.5
+    assert no_leidas == 1
+
+
+def test_no_ascii_no_es_monto():
+    assert monto("١٢٣") is None
+    assert monto("12\f") is None
+    assert monto("1\u00a0234,56") == 1234.56
@@ -0,0 +1,70 @@
+"""Corpus de regresión del parser de POLIDATA.
+
+Cada `.txt` de fixtures/polidata tiene al lado las filas esperadas (`.json`),
+obtenidas con el parser línea por línea anterior a ParserPolidata, con los
+montos ya como número. Los `.pdf` son esos mismos textos en páginas cortas
+(la placa y su marca quedan en páginas distintas) más páginas de condiciones
+generales, generados con `benchmarks.generadores.pdf_desde_lineas(lineas, 12)`.
+`triaje.pdf` (8 líneas por página) tiene una página por cada motivo para no
+descartarla: solo ítems con montos, solo la cabecera de una sección y una sin
+datos que sigue a una placa.
+"""
+import json
+import os
+
+import pytest
+
+from suite_operativa import polidata
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "polidata")
+TEXTOS = ["flota_006", "varias_secciones", "triaje", "bordes"]
+PDFS = ["flota_006", "varias_secciones", "triaje"]
+
+
+def _leer(nombre, extension):
+    with open(os.path.join(FIXTURES, nombre + extension), "rb") as f:
+        return f.read()
+
+
+def _esperadas(nombre):
+    return json.loads(_leer(nombre, ".json").decode("utf-8"))
+
+
+def _motores():
+    motores = [pytest.param("pdfplumber")]
+    motores.append(pytest.param("pdfium", marks=pytest.mark.skipif(
+        not polidata.pdfium_disponible(), reason="pypdfium2 no está instalado")))
+    return motores
+
+
+@pytest.mark.parametrize("nombre", TEXTOS)
+def test_parsear_texto(nombre):
+    # Sin normalizar saltos de línea: el corpus incluye \r y tabulaciones
+    texto = _leer(nombre, ".txt").decode("utf-8")
+    assert polidata.parsear_texto(texto) == _esperadas(nombre)
+
+
+@pytest.mark.parametrize("motor", _motores())
+@pytest.mark.parametrize("nombre", PDFS)
+def test_procesar_pdf(nombre, motor):
+    datos = _leer(nombre, ".pdf")
+    assert polidata.procesar_pdf(datos, motor=motor) == _esperadas(nombre)
+
+
+@pytest.mark.parametrize("motor", _motores())
+@pytest.mark.parametrize("nombre", PDFS)
+def test_descartar_no_pierde_filas(nombre, motor):
+    datos = _leer(nombre, ".pdf")
+    todas = polidata.extraer_textos(datos, motor=motor, descartar=False)
+    utiles = polidata.extraer_textos(datos, motor=motor)
+    # Las condiciones generales se descartan y las páginas que quedan dan todas las filas
+    assert len(utiles) < len(todas)
+    assert polidata.parsear_texto("\n".join(utiles)) == _esperadas(nombre)
+    assert polidata.parsear_texto("\n".join(todas)) == _esperadas(nombre)
+
+
+@pytest.mark.parametrize("nombre", PDFS)
+def test_pdf_desde_ruta(nombre):
+    ruta = os.path.join(FIXTURES, nombre + ".pdf")
+    assert polidata.contar_paginas(ruta) == polidata.contar_paginas(_leer(nombre, ".pdf"))
+    assert polidata.procesar_pdf(ruta) == _esperadas(nombre)
@@ -0,0 +1,35 @@
+"""Lectura por lotes de los Excels de Cálculo de Primas."""
+import io
+
+import pandas as pd
+import pytest
+
+from suite_operativa import primas
+from suite_operativa.cache import CacheResultados
+
+
+def _excel(filas):
+    salida = io.BytesIO()
+    pd.DataFrame(filas, columns=primas.COLUMNAS_USADAS).to_excel(salida, index=False)
+    return salida.getvalue()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_excel_danado_no_corta_el_lote(workers):
+    bueno = _excel([["DNI", "12345678", "ANA PEREZ", 1000, 1]])
+    archivos = [("a.xlsx", bueno), ("roto.xlsx", b"no es un excel"), ("b.xlsx", bueno)]
+    leidos, errores = primas.leer_lote(archivos, workers=workers, motor="openpyxl")
+    assert [nombre for nombre, _, _ in leidos] == ["a.xlsx", "b.xlsx"]
+    assert [nombre for nombre, _ in errores] == ["roto.xlsx"]
+
+
+def test_cache_por_motor():
+    cache = CacheResultados()
+    datos = _excel([["DNI", "12345678", "ANA PEREZ", 1000, 1]])
+    primas.leer_lote([("a.xlsx", datos)], motor="openpyxl", cache=cache)
+    leidos, _ = primas.leer_lote([("a.xlsx", datos)], motor="openpyxl", cache=cache)
+    assert leidos[0][2] == 0.0
+    # Otro motor no reutiliza lo leído con openpyxl: vuelve a leer el archivo
+    assert cache.obtener(cache.clave("primas", datos, extra="calamine")) is None
+    leidos, errores = primas.leer_lote([("a.xlsx", datos)], motor="calamine", cache=cache)
+    assert not leidos or leidos[0][2] > 0.0
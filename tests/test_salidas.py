@@ -0,0 +1,24 @@
+"""Los escritores de salidas.py no dejan un archivo truncado si el bloque falla."""
+import os
+
+import pytest
+
+from suite_operativa import salidas
+
+
+@pytest.mark.parametrize("formato", salidas.formatos_disponibles())
+def test_error_no_deja_salida(tmp_path, formato):
+    destino = os.path.join(tmp_path, "salida" + formato)
+    with pytest.raises(RuntimeError):
+        with salidas.abrir_escritor(destino, ["a", "b"]) as escritor:
+            escritor.agregar([(1, "x"), (2, "y")])
+            raise RuntimeError("parseo")
+    assert not os.path.exists(destino)
+
+
+@pytest.mark.parametrize("formato", salidas.formatos_disponibles())
+def test_cierre_normal(tmp_path, formato):
+    destino = os.path.join(tmp_path, "salida" + formato)
+    with salidas.abrir_escritor(destino, ["a", "b"]) as escritor:
+        escritor.agregar([(1, "x"), (2, "y")])
+    assert os.path.getsize(destino) > 0